@@ -0,0 +1,132 @@
+"""
+Admission control for chat requests and summary jobs.
+
+Each controller caps how many jobs run at once and how many may wait for a
+slot, so a burst is queued for a bounded time or rejected fast instead of
+exhausting threads, sockets and the gateway rate limit. Controllers live in
+memory, so the caps apply per worker process.
+"""
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+# All limits below are per process. Under gunicorn every worker has its own
+# controllers, so the server as a whole admits GUNICORN_WORKERS times as many.
+MAX_CONCURRENT_CHATS = int(os.getenv("MAX_CONCURRENT_CHATS", "16"))
+CHAT_QUEUE_SIZE = int(os.getenv("CHAT_QUEUE_SIZE", "32"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "5"))
+MAX_CONCURRENT_SUMMARIES = int(os.getenv("MAX_CONCURRENT_SUMMARIES", "8"))
+# Summary jobs running or waiting on the shared executor; extra docs go without
+MAX_PENDING_SUMMARIES = int(os.getenv("MAX_PENDING_SUMMARIES", "32"))
+
+
+class AdmissionController:
+    """
+    Bounded concurrency limiter with a bounded wait queue.
+
+    Args:
+        name: Label used in metrics
+        max_concurrent: Jobs allowed to hold a slot at once
+        max_queue: Callers allowed to wait for a slot; 0 rejects immediately when full
+        max_wait: Seconds a queued caller waits before being rejected
+    """
+
+    def __init__(self, name, max_concurrent, max_queue=0, max_wait=0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_wait = 0.0
+        self._max_observed_wait = 0.0
+
+    def acquire(self, timeout=None):
+        """
+        Take a slot, waiting up to `timeout` (default `max_wait`) seconds.
+
+        Returns:
+            True if admitted, False if the queue was full or the wait timed out
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        start = time.perf_counter()
+        with self._condition:
+            if self._in_flight < self.max_concurrent and self._waiting == 0:
+                self._admit(0.0)
+                return True
+
+            if self._waiting >= self.max_queue or timeout <= 0:
+                self._rejected += 1
+                return False
+
+            self._waiting += 1
+            try:
+                deadline = start + timeout
+                while self._in_flight >= self.max_concurrent:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._rejected += 1
+                        self._timed_out += 1
+                        # Pass on a wakeup we may have consumed without using it
+                        if self._in_flight < self.max_concurrent:
+                            self._condition.notify()
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            self._admit(time.perf_counter() - start)
+            return True
+
+    def _admit(self, waited):
+        self._in_flight += 1
+        self._admitted += 1
+        self._total_wait += waited
+        self._max_observed_wait = max(self._max_observed_wait, waited)
+
+    def release(self):
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Context manager yielding whether a slot was acquired."""
+        admitted = self.acquire(timeout)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "avg_wait_ms": round(self._total_wait / self._admitted * 1000, 1) if self._admitted else 0.0,
+                "max_wait_ms": round(self._max_observed_wait * 1000, 1),
+            }
+
+
+chat_admission = AdmissionController(
+    "chat", MAX_CONCURRENT_CHATS, max_queue=CHAT_QUEUE_SIZE, max_wait=CHAT_QUEUE_TIMEOUT
+)
+summary_admission = AdmissionController("summary", MAX_PENDING_SUMMARIES)
+
+
+def admission_stats():
+    return {
+        "chat": chat_admission.stats(),
+        "summary": summary_admission.stats(),
+    }
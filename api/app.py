@@ -1,12 +1,31 @@
 from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
+import click
 from uuid import uuid4
-from chat import ask_question
+from chat import (
+    answer_usage_stats,
+    ask_question,
+    busy_response,
+    get_or_create_summary,
+    get_prompt_template,
+    summary_usage_stats,
+)
+from admission import chat_admission, admission_stats
+from hedging import hedge_budget
+from feedback import feedback_pipeline, record_feedback
+from prompt_builder import passage_cache
+from router import router_stats
+from search import CursorExpired, search_documents
+from suggest import SUGGEST_ENABLED, suggestion_service
+from llm_integrations import check_llm_health, warm_up_llms
+from elasticsearch_client import get_elasticsearch_client
+from serving import draining, is_ready, ready
 import os
 import sys
 import jwt
 import datetime
-import requests
+import hashlib
+import threading
 
 app = Flask(__name__, static_folder="../frontend/build", static_url_path="/")
 CORS(app)
@@ -14,6 +33,35 @@ CORS(app)
 SECRET_KEY = os.environ.get('SECRET_KEY')
 AUTH_USERNAME = os.environ.get('AUTH_USERNAME')
 AUTH_PASSWORD = os.environ.get('AUTH_PASSWORD')
+LLM_PREWARM = os.getenv("LLM_PREWARM", "false").lower() == "true"
+# Browser cache lifetime for summaries; the ETag makes revalidation after that cheap
+SUMMARY_MAX_AGE = int(os.getenv("SUMMARY_MAX_AGE", "3600"))
+
+
+def warm_up():
+    """Compile templates and open Elasticsearch and LLM connections ahead of the first request."""
+    for name in (
+        "condense_question_template",
+        "summary_template",
+        "batch_summary_template",
+        "summary_chunk_template",
+        "summary_reduce_template",
+    ):
+        get_prompt_template(name)
+    try:
+        get_elasticsearch_client().info()
+    except Exception as e:
+        app.logger.warning(f"Elasticsearch warm-up failed: {e}")
+    if LLM_PREWARM:
+        warm_up_llms()
+
+
+# Under gunicorn the post_worker_init hook warms each worker before it takes traffic
+if os.getenv("APP_SERVER") != "gunicorn":
+    if LLM_PREWARM:
+        # Open gateway connections in the background so the first chat doesn't pay for them
+        threading.Thread(target=warm_up_llms, daemon=True).start()
+    ready.set()
 
 @app.route("/")
 def api_index():
@@ -42,7 +90,24 @@ def api_chat():
         return jsonify({"msg": "Missing question from request JSON"}), 400
 
     session_id = request.args.get("session_id", str(uuid4()))
-    return Response(ask_question(question, session_id), mimetype="text/event-stream")
+
+    if not chat_admission.acquire():
+        app.logger.warning("Chat capacity saturated, sending busy response")
+        retry_after = max(1, int(chat_admission.max_wait))
+        return Response(
+            busy_response(session_id, retry_after),
+            mimetype="text/event-stream",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    try:
+        response = Response(ask_question(question, session_id), mimetype="text/event-stream")
+    except Exception:
+        chat_admission.release()
+        raise
+    # Runs when the WSGI server closes the stream, even if it was never iterated
+    response.call_on_close(chat_admission.release)
+    return response
 
 @app.route("/api/feedback", methods=["POST"])
 def api_feedback():
@@ -53,43 +118,178 @@ def api_feedback():
     if not trace_id or value is None:
         return jsonify({"success": False, "error": "Missing trace_id or value"}), 400
     
-    # Log feedback locally first
     app.logger.info(f"User feedback: trace_id={trace_id}, value={value} ({'positive' if value > 0 else 'negative'})")
+    # Stored and forwarded to Portkey in the background so a slow gateway can't hold this worker
+    if not record_feedback(trace_id, value):
+        app.logger.warning(f"Feedback queue full, dropped feedback for trace_id={trace_id}")
     
-    # Try to send to Portkey
+    return jsonify({"success": True})
+
+
+@app.route("/api/summary/<path:doc_id>", methods=["GET"])
+def api_summary(doc_id):
+    summary, status = get_or_create_summary(doc_id, request.args.get("trace_id"))
+    if status == "not_found":
+        return jsonify({"error": "Document not found"}), 404
+    if status in ("busy", "timeout"):
+        response = jsonify({"error": "Summary is not ready yet, try again shortly"})
+        response.status_code = 503
+        response.headers["Retry-After"] = "5"
+        return response
+    if status == "failed":
+        return jsonify({"error": "Summary generation failed"}), 502
+
+    response = jsonify({"id": doc_id, "summary": summary, "source": status})
+    response.set_etag(hashlib.sha256(summary.encode("utf-8")).hexdigest()[:32])
+    response.cache_control.private = True
+    response.cache_control.max_age = SUMMARY_MAX_AGE
+    return response.make_conditional(request)
+
+
+@app.route("/api/search", methods=["GET"])
+def api_search():
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"msg": "Missing q query parameter"}), 400
     try:
-        response = requests.post(
-            'https://api.portkey.ai/v1/feedback',
-            headers={
-                'x-portkey-api-key': os.getenv("PORTKEY_API_KEY"),
-                'Content-Type': 'application/json'
-            },
-            json={
-                'trace_id': trace_id,
-                'value': value
-            },
-            timeout=5
-        )
-        
-        if response.status_code == 200:
-            app.logger.info(f"Feedback sent to Portkey successfully: trace_id={trace_id}")
-        else:
-            app.logger.warning(f"Portkey feedback API returned {response.status_code}: {response.text}")
+        page = search_documents(query, request.args.get("size", type=int), request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
     except Exception as e:
-        app.logger.warning(f"Failed to send feedback to Portkey: {str(e)}")
-    
-    return jsonify({"success": True})
+        app.logger.error(f"Search failed: {e}")
+        return jsonify({"error": "Search failed"}), 502
+    return jsonify(page)
+
+
+@app.route("/api/suggest", methods=["GET"])
+def api_suggest():
+    if not SUGGEST_ENABLED:
+        return jsonify({"error": "Suggestions are disabled"}), 404
+    try:
+        suggestions, source = suggestion_service.suggest(request.args.get("q", ""), request.args.get("size", type=int))
+    except Exception as e:
+        app.logger.error(f"Suggestions failed: {e}")
+        return jsonify({"suggestions": [], "source": "error"}), 502
+    return jsonify({
+        "suggestions": [{key: entry[key] for key in ("id", "text", "url")} for entry in suggestions],
+        "source": source,
+    })
+
+
+@app.route("/api/ready", methods=["GET"])
+def api_ready():
+    if not is_ready():
+        return jsonify({"ready": False, "draining": draining.is_set()}), 503
+    return jsonify({"ready": True, "draining": False}), 200
+
+
+@app.route("/api/metrics", methods=["GET"])
+def api_metrics():
+    return jsonify({
+        "admission": admission_stats(),
+        "hedging": hedge_budget.stats(),
+        "feedback": feedback_pipeline.stats(),
+        "summaries": summary_usage_stats(),
+        "answers": answer_usage_stats(),
+        "prompt_passages": passage_cache.stats(),
+        "router": router_stats(),
+        "suggest": suggestion_service.stats(),
+    })
+
+
+@app.route("/api/health/llm", methods=["GET"])
+def api_llm_health():
+    results = check_llm_health()
+    healthy = all(result["ok"] for result in results.values())
+    return jsonify({"healthy": healthy, "roles": results}), 200 if healthy else 503
+
+
+@app.cli.command()
+@click.option("--source", help="JSONL/JSON file or directory to index (default: INDEX_SOURCE).")
+@click.option("--connector", help="Connector as 'package.module:callable' (default: INDEX_CONNECTOR).")
+@click.option("--chunk-size", type=int, help="Documents per bulk request (default: INDEX_CHUNK_SIZE).")
+@click.option("--threads", type=int, help="Parallel bulk threads (default: INDEX_THREAD_COUNT).")
+@click.option(
+    "--replace-concrete-index",
+    is_flag=True,
+    help="Migrate a plain index named ES_INDEX to versioned indices behind an alias.",
+)
+def create_index(source, connector, chunk_size, threads, replace_concrete_index):
+    """Build a new index version and atomically point the ES_INDEX alias at it."""
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    sys.path.append(f"{basedir}/../")
+
+    from data import index_data
+
+    index_data.main(
+        source=source,
+        connector=connector,
+        chunk_size=chunk_size,
+        thread_count=threads,
+        replace_concrete=replace_concrete_index,
+    )
+
+
+@app.cli.command()
+@click.option("--source", help="JSONL/JSON file or directory to sync from (default: INDEX_SOURCE).")
+@click.option("--connector", help="Connector as 'package.module:callable' (default: INDEX_CONNECTOR).")
+@click.option("--chunk-size", type=int, help="Documents per bulk request (default: INDEX_CHUNK_SIZE).")
+@click.option("--threads", type=int, help="Parallel bulk threads (default: INDEX_THREAD_COUNT).")
+@click.option("--no-delete", is_flag=True, help="Don't delete indexed documents missing from the source.")
+def sync_index(source, connector, chunk_size, threads, no_delete):
+    """Index only documents changed since the last sync and remove deleted ones."""
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    sys.path.append(f"{basedir}/../")
+
+    from data import index_data
+
+    index_data.sync_main(
+        source=source,
+        connector=connector,
+        delete_missing=not no_delete,
+        chunk_size=chunk_size,
+        thread_count=threads,
+    )
 
 
 @app.cli.command()
-def create_index():
-    """Create or re-create the Elasticsearch index."""
+def rollback_index():
+    """Point the ES_INDEX alias back at the previous index version."""
     basedir = os.path.abspath(os.path.dirname(__file__))
     sys.path.append(f"{basedir}/../")
 
     from data import index_data
 
-    index_data.main()
+    index_data.rollback_index()
+
+
+@app.cli.command()
+@click.option("--feedback", "feedback_path", required=True, help="JSONL of hit scores with a label or feedback value.")
+@click.option("--method", type=click.Choice(["isotonic", "platt"]), default="isotonic", show_default=True)
+@click.option("--output", help="Calibration file to write (default: CONFIDENCE_CALIBRATION_FILE).")
+def fit_confidence(feedback_path, method, output):
+    """Fit a confidence calibrator for retrieval scores from feedback logs."""
+    import json
+    from scoring import CONFIDENCE_CALIBRATION_FILE, fit_calibrator, load_feedback_samples
+
+    output = output or CONFIDENCE_CALIBRATION_FILE
+    if not output:
+        raise click.UsageError("Pass --output or set CONFIDENCE_CALIBRATION_FILE.")
+    scores, labels = load_feedback_samples(feedback_path)
+    calibrator = fit_calibrator(scores, labels, method)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(calibrator.to_dict(), handle, indent=2)
+    print(f"Fitted {method} calibration on {len(scores)} samples ({int(labels.sum())} positive) -> {output}")
+
+
+@app.cli.command()
+def local_llm():
+    """Run the OpenAI-compatible local stand-in LLM server."""
+    from local_llm import serve
+
+    serve()
 
 
 # if __name__ == "__main__":
@@ -1,49 +1,117 @@
-from langchain_elasticsearch import ElasticsearchStore, BM25Strategy
-from langchain_elasticsearch import ElasticsearchRetriever
-from llm_integrations import get_llm, get_llm_with_trace_id, init_openai_config_chat
+from llm_integrations import get_llm, get_llm_with_trace_id
 from elasticsearch_client import (
-    elasticsearch_client,
+    get_elasticsearch_client,
     get_elasticsearch_chat_message_history,
     update_document_summary,
-    get_document_summary,
     ensure_summary_field_exists,
+    get_cached_summaries,
+    get_document,
+    store_cached_summary,
 )
-from langchain_core.documents import Document
+from hits import Hit, HIT_SOURCE_FIELDS
+from dedup import apply_search_options, select_hits
+from feedback import record_retrieval
+from sse import FrameCoalescer, data_frame, framed_length
+from tokens import count_tokens, split_tokens, truncate_tokens
+from extractive import extractive_summary
+from prompt_builder import BuiltPrompt, build_rag_prompt
+from scoring import PRUNE_ENABLED, get_confidence_scorer, heuristic_confidences, prune_hits
+from router import route_navigational
+from hedging import HEDGE_ENABLED, HEDGE_STREAM_TIMEOUT, hedged_stream
+from admission import MAX_CONCURRENT_SUMMARIES, summary_admission
 from typing import Dict, Any, AsyncGenerator
 from flask import stream_with_context, current_app
-from jinja2.nativetypes import NativeEnvironment
 from templates import prompt
+from functools import lru_cache
 import json
 import logging
 import os
+import time
 import asyncio
 import threading
 import math
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from urllib.parse import quote
 
+# Alias over the live versioned index (see data/index_data.py)
 INDEX = os.getenv("ES_INDEX", "ccc-db")
 INDEX_CHAT_HISTORY = os.getenv(
     "ES_INDEX_CHAT_HISTORY", "ccc-db-chat-history"
 )
+# Summaries keyed by content hash, shared by duplicate documents and kept across reindexing
+INDEX_SUMMARY_CACHE = os.getenv(
+    "ES_INDEX_SUMMARY_CACHE", "ccc-db-summary-cache"
+)
 ELSER_MODEL = os.getenv("ELSER_MODEL", ".elser_model_2_linux-x86_64")
 SESSION_ID_TAG = "[SESSION_ID]"
 SOURCE_TAG = "[SOURCE]"
 DONE_TAG = "[DONE]"
 TRACE_ID_TAG = "[TRACE_ID]"
+RESUMED_TAG = "[RESUMED]"
+BUSY_TAG = "[BUSY]"
+SUMMARY_FAILED = "Summary generation failed"
+# Generate summaries for every source during chat; otherwise they're fetched on demand
+EAGER_SUMMARIES = os.getenv("EAGER_SUMMARIES", "false").lower() == "true"
+# Seconds GET /api/summary waits for a generated summary
+SUMMARY_TIMEOUT = float(os.getenv("SUMMARY_TIMEOUT", "30"))
+# Summarize missing documents in one LLM call instead of one call each
+SUMMARY_BATCH_ENABLED = os.getenv("SUMMARY_BATCH_ENABLED", "true").lower() == "true"
+# Tokens of each document's text sent in a batch summary request
+SUMMARY_BATCH_DOC_TOKENS = int(os.getenv("SUMMARY_BATCH_DOC_TOKENS", "1500"))
+# Documents over this many tokens are summarized chunk by chunk (map-reduce)
+SUMMARY_MAX_INPUT_TOKENS = int(os.getenv("SUMMARY_MAX_INPUT_TOKENS", "8000"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "4000"))
+SUMMARY_CHUNK_OVERLAP = int(os.getenv("SUMMARY_CHUNK_OVERLAP", "200"))
+# Chunks summarized per document at most, and how many run at once
+SUMMARY_MAX_CHUNKS = int(os.getenv("SUMMARY_MAX_CHUNKS", "8"))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+# Seconds a single summary LLM call may take
+SUMMARY_CALL_TIMEOUT = float(os.getenv("SUMMARY_CALL_TIMEOUT", "60"))
+# Seconds one document summary may take in total, map and reduce calls included,
+# so it is ready before GET /api/summary and eager summaries stop waiting
+SUMMARY_DEADLINE = float(os.getenv("SUMMARY_DEADLINE", str(SUMMARY_TIMEOUT)))
+# Share of SUMMARY_DEADLINE given to the map calls; the rest is left for the reduce
+SUMMARY_MAP_SHARE = 2 / 3
+# Order the answer prompt for provider-side prefix caching (see rag_cached_template)
+PROMPT_CACHE_LAYOUT = os.getenv("PROMPT_CACHE_LAYOUT", "true").lower() == "true"
 
 text_field = "body"
 
-env = NativeEnvironment()
+# Shared across requests so summary threads (and their event loops) are capped globally
+summary_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_SUMMARIES, thread_name_prefix="summary"
+)
+
 
-rags_prompt_template = env.from_string(prompt.rag_template)
-condense_question_template = env.from_string(prompt.condense_question_template)
-summary_template = env.from_string(prompt.summary_template)
+@lru_cache(maxsize=None)
+def get_prompt_template(name: str):
+    """Compile a template from templates.prompt on first use."""
+    # Plain Environment: prompts are text, and NativeEnvironment would literal_eval them
+    from jinja2 import Environment
+
+    return Environment().from_string(getattr(prompt, name))
+
+
+def render_qa_prompt(question: str, docs, chat_history) -> BuiltPrompt:
+    """
+    Build the answer prompt from cached passage blocks (see prompt_builder).
+
+    With PROMPT_CACHE_LAYOUT the question goes last and passages are sorted by
+    document ID, so the prompt prefix only changes when the documents do.
+
+    Args:
+        question: The user's question
+        docs: Retrieved hits in rank order
+        chat_history: Previous messages of the session
+
+    Returns:
+        BuiltPrompt: Prompt text and token count
+    """
+    if PROMPT_CACHE_LAYOUT:
+        docs = sorted(docs, key=lambda doc: doc.id)
+    return build_rag_prompt(question, docs, chat_history, cache_layout=PROMPT_CACHE_LAYOUT)
 
-store = ElasticsearchStore(
-    es_connection=elasticsearch_client,
-    index_name=INDEX,
-    strategy=BM25Strategy(),
-)
 
 def bm25_query(search_query: str) -> Dict:
     return {
@@ -263,35 +331,542 @@ def bm25_query(search_query: str) -> Dict:
         }
     }
 
-async def generate_doc_summary(page_content: str, trace_id: str) -> str:
-    from langchain_openai import ChatOpenAI
-    from portkey_ai import createHeaders, PORTKEY_GATEWAY_URL
-    
-    # Create a specific ChatOpenAI instance for summarization using gpt-4o-mini
-    portkey_headers = createHeaders(
-        api_key=os.getenv("PORTKEY_API_KEY"),
-        provider="openai",
-        metadata={"_user": "mx2-ccc"},
-        config={
-            "cache": {"mode": "semantic"},
-            "retry": {"attempts": 3}
-        },
-        trace_id=trace_id,
-        span_name="Document Summary"
+# Summary LLM calls and tokens since startup, reported by /api/metrics
+_summary_usage_totals = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+_summary_usage_lock = threading.Lock()
+
+
+def new_summary_usage() -> Dict[str, int]:
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+
+
+def record_summary_usage(usage, summary_prompt: str, response) -> None:
+    """Count a call's tokens, estimating them if the provider didn't report any."""
+    metadata = getattr(response, "usage_metadata", None) or {}
+    call = {
+        "calls": 1,
+        "input_tokens": metadata.get("input_tokens") or count_tokens(summary_prompt),
+        "output_tokens": metadata.get("output_tokens") or count_tokens(response.content),
+    }
+    with _summary_usage_lock:
+        for key, value in call.items():
+            _summary_usage_totals[key] += value
+    if usage is not None:
+        for key, value in call.items():
+            usage[key] += value
+
+
+def summary_usage_stats() -> Dict[str, int]:
+    with _summary_usage_lock:
+        return dict(_summary_usage_totals)
+
+
+# Answer LLM calls and tokens since startup, including prompt tokens served from the provider cache
+_answer_usage_totals = {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+_answer_usage_lock = threading.Lock()
+
+
+def record_answer_usage(metadata) -> Dict[str, int]:
+    """Count the usage a provider reported for an answer call (the final chunk with stream_usage)."""
+    call = {
+        "calls": 1,
+        "input_tokens": metadata.get("input_tokens") or 0,
+        "cached_tokens": (metadata.get("input_token_details") or {}).get("cache_read") or 0,
+        "output_tokens": metadata.get("output_tokens") or 0,
+    }
+    with _answer_usage_lock:
+        for key, value in call.items():
+            _answer_usage_totals[key] += value
+    return call
+
+
+def answer_usage_stats() -> Dict[str, int]:
+    with _answer_usage_lock:
+        return dict(_answer_usage_totals)
+
+
+async def invoke_summary(summary_llm, summary_prompt: str, usage=None, timeout: float = None) -> str:
+    # The call gets SUMMARY_CALL_TIMEOUT or whatever is left of a shorter deadline
+    timeout = SUMMARY_CALL_TIMEOUT if timeout is None else min(SUMMARY_CALL_TIMEOUT, max(timeout, 0))
+    response = await asyncio.wait_for(summary_llm.ainvoke(summary_prompt), timeout=timeout)
+    record_summary_usage(usage, summary_prompt, response)
+    return response.content
+
+
+def select_chunks(chunks: list, limit: int) -> list:
+    """At most `limit` chunks, evenly spaced so the whole document stays represented."""
+    if len(chunks) <= limit:
+        return chunks
+    step = len(chunks) / limit
+    return [chunks[int(i * step)] for i in range(limit)]
+
+
+async def generate_doc_summary(page_content: str, trace_id: str, usage=None) -> str:
+    """
+    Summarize a document, using map-reduce when it's over SUMMARY_MAX_INPUT_TOKENS.
+
+    Args:
+        page_content: Document text
+        trace_id: Trace the LLM calls are attributed to
+        usage: Optional dict from new_summary_usage() that collects call and token counts
+    """
+    if count_tokens(page_content) <= SUMMARY_MAX_INPUT_TOKENS:
+        summary_llm = get_llm(role="summary", trace_id=trace_id, span_name="Document Summary")
+        summary_prompt = get_prompt_template("summary_template").render(page_content=page_content)
+        return await invoke_summary(summary_llm, summary_prompt, usage, timeout=SUMMARY_DEADLINE)
+    return await map_reduce_summary(page_content, trace_id, usage)
+
+
+async def map_reduce_summary(page_content: str, trace_id: str, usage=None) -> str:
+    """
+    Summarize a long document chunk by chunk, then combine the chunk summaries.
+
+    At most SUMMARY_MAX_CHUNKS chunks are summarized, SUMMARY_MAP_CONCURRENCY at a
+    time. The whole summary must finish within SUMMARY_DEADLINE: chunks still
+    running after SUMMARY_MAP_SHARE of it are cancelled, and the reduce call gets
+    what is left. Failed and cancelled chunks are left out of the reduce.
+    """
+    logger = logging.getLogger(__name__)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SUMMARY_DEADLINE
+    chunks = select_chunks(
+        split_tokens(page_content, SUMMARY_CHUNK_TOKENS, SUMMARY_CHUNK_OVERLAP), SUMMARY_MAX_CHUNKS
     )
-    
-    summary_llm = ChatOpenAI(
-        openai_api_key=os.getenv("OPENAI_API_KEY"),
-        streaming=False,
-        temperature=0,
-        model='gpt-4.1-mini',
-        base_url=PORTKEY_GATEWAY_URL,
-        default_headers=portkey_headers
+    map_llm = get_llm(role="summary", trace_id=trace_id, span_name="Document Summary Map")
+    chunk_template = get_prompt_template("summary_chunk_template")
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+
+    async def summarize_chunk(part, chunk):
+        async with semaphore:
+            chunk_prompt = chunk_template.render(page_content=chunk, part=part, parts=len(chunks))
+            return await invoke_summary(map_llm, chunk_prompt, usage, timeout=deadline - loop.time())
+
+    tasks = [asyncio.ensure_future(summarize_chunk(part, chunk)) for part, chunk in enumerate(chunks, start=1)]
+    _, pending = await asyncio.wait(tasks, timeout=SUMMARY_DEADLINE * SUMMARY_MAP_SHARE)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    finished = [task for task in tasks if not task.cancelled()]
+    partials = [task.result() for task in finished if task.exception() is None and task.result().strip()]
+    if not partials:
+        reason = finished[0].exception() if finished else "summary deadline reached"
+        raise RuntimeError(f"All {len(chunks)} chunk summaries failed: {reason}")
+    if len(partials) < len(chunks):
+        logger.warning(
+            f"{len(chunks) - len(partials)} of {len(chunks)} chunk summaries failed"
+            f" ({len(pending)} cut off by the summary deadline)"
+        )
+    if len(partials) == 1:
+        return partials[0]
+
+    reduce_llm = get_llm(role="summary", trace_id=trace_id, span_name="Document Summary Reduce")
+    reduce_prompt = get_prompt_template("summary_reduce_template").render(summaries=partials)
+    return await invoke_summary(reduce_llm, reduce_prompt, usage, timeout=deadline - loop.time())
+
+
+def run_coroutine(coro):
+    """Run a coroutine to completion on a fresh event loop in the calling thread."""
+    # Runs on executor threads, where current_app.logger isn't available
+    logger = logging.getLogger(__name__)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        # Proper async cleanup to prevent "Event loop is closed" errors
+        try:
+            # Get all remaining tasks
+            pending_tasks = asyncio.all_tasks(loop)
+
+            if pending_tasks:
+                # Cancel all pending tasks
+                for task in pending_tasks:
+                    if not task.done():
+                        task.cancel()
+
+                # Wait for cancellations to complete with timeout
+                try:
+                    loop.run_until_complete(
+                        asyncio.wait_for(
+                            asyncio.gather(*pending_tasks, return_exceptions=True),
+                            timeout=2.0
+                        )
+                    )
+                except asyncio.TimeoutError:
+                    logger.debug("Timeout waiting for task cancellation")
+                except Exception:
+                    pass  # Ignore cleanup errors
+
+            # Additional cleanup for httpx connections
+            try:
+                # Give the loop one more chance to process any final cleanup
+                loop.run_until_complete(asyncio.sleep(0.1))
+            except Exception:
+                pass
+
+        except Exception as cleanup_error:
+            logger.debug(f"Loop cleanup warning (non-critical): {cleanup_error}")
+        finally:
+            # Close the loop
+            if not loop.is_closed():
+                loop.close()
+
+
+def store_summary(doc, summary, usage=None):
+    """Save a generated summary on the document and in the content-hash cache, with its token cost."""
+    logger = logging.getLogger(__name__)
+    if usage:
+        logger.info(
+            f"Summary cost for document {doc.id}: {usage['calls']} calls, "
+            f"{usage['input_tokens']} input / {usage['output_tokens']} output tokens"
+        )
+    if not doc.id or not summary or summary == SUMMARY_FAILED:
+        return
+    store_cached_summary(INDEX_SUMMARY_CACHE, doc.content_hash, summary, usage)
+    if update_document_summary(INDEX, doc.id, summary):
+        logger.debug(f"Saved summary for document {doc.id}")
+    else:
+        logger.warning(f"Failed to save summary for document {doc.id}")
+
+
+def generate_and_store_summary(doc, trace_id):
+    """Generate a summary for a hit and store it on the document and in the content-hash cache."""
+    usage = new_summary_usage()
+    try:
+        result = run_coroutine(generate_doc_summary(doc.page_content, trace_id, usage))
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Summary generation error: {e}")
+        return SUMMARY_FAILED
+    store_summary(doc, result, usage)
+    return result
+
+
+def parse_batch_summaries(text: str, doc_ids) -> Dict[str, str]:
+    """
+    Summaries by doc ID from a batch summary response.
+
+    Tolerates a fenced code block around the JSON. Returns an empty dict when the
+    response isn't a JSON object; IDs the model left out are simply missing.
+    """
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("{"):] if "{" in text else text
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        return {}
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    wanted = set(doc_ids)
+    return {
+        str(doc_id): summary.strip()
+        for doc_id, summary in parsed.items()
+        if str(doc_id) in wanted and isinstance(summary, str) and summary.strip()
+    }
+
+
+async def generate_batch_summaries(docs, trace_id: str, usages=None) -> Dict[str, str]:
+    """
+    Summarize several documents in one LLM call, keyed by doc ID.
+
+    Each document is capped at SUMMARY_BATCH_DOC_TOKENS. Documents missing from the
+    response, or all of them if it isn't valid JSON, are summarized one by one.
+    `usages` maps doc IDs to new_summary_usage() dicts; the batch call's tokens are
+    shared evenly between its documents.
+    """
+    usages = usages if usages is not None else {doc.id: new_summary_usage() for doc in docs}
+    logger = logging.getLogger(__name__)
+    summaries = {}
+    if len(docs) > 1:
+        batch_prompt = get_prompt_template("batch_summary_template").render(docs=[
+            {"id": doc.id, "page_content": truncate_tokens(doc.page_content, SUMMARY_BATCH_DOC_TOKENS)}
+            for doc in docs
+        ])
+        summary_llm = get_llm(role="summary", trace_id=trace_id, span_name="Batch Document Summary")
+        batch_usage = new_summary_usage()
+        try:
+            response = await asyncio.wait_for(summary_llm.ainvoke(batch_prompt), timeout=SUMMARY_CALL_TIMEOUT)
+            record_summary_usage(batch_usage, batch_prompt, response)
+            for doc in docs:
+                for key, value in batch_usage.items():
+                    usages[doc.id][key] += value // len(docs) if key != "calls" else value
+            summaries = parse_batch_summaries(response.content, [doc.id for doc in docs])
+        except Exception as e:
+            logger.warning(f"Batch summary failed, summarizing documents one by one: {e}")
+
+    missing = [doc for doc in docs if doc.id not in summaries]
+    if missing and len(docs) > 1:
+        logger.info(f"Batch summary missed {len(missing)} of {len(docs)} documents, summarizing them one by one")
+    results = await asyncio.gather(
+        *(generate_doc_summary(doc.page_content, trace_id, usages[doc.id]) for doc in missing),
+        return_exceptions=True,
     )
-    
-    summary_prompt = summary_template.render(page_content=page_content)
-    response = await summary_llm.ainvoke(summary_prompt)
-    return response.content
+    for doc, result in zip(missing, results):
+        if isinstance(result, Exception):
+            logger.error(f"Summary generation error: {result}")
+            summaries[doc.id] = SUMMARY_FAILED
+        else:
+            summaries[doc.id] = result
+    return summaries
+
+
+def generate_and_store_batch(docs, trace_id):
+    """Batch counterpart of generate_and_store_summary; returns summaries by doc ID."""
+    usages = {doc.id: new_summary_usage() for doc in docs}
+    try:
+        summaries = run_coroutine(generate_batch_summaries(docs, trace_id, usages))
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Batch summary generation error: {e}")
+        return {doc.id: SUMMARY_FAILED for doc in docs}
+    for doc in docs:
+        store_summary(doc, summaries.get(doc.id), usages[doc.id])
+    return summaries
+
+
+# Summary jobs in flight by content hash, so concurrent requests for one document share a job
+_summary_jobs = {}
+_summary_jobs_lock = threading.Lock()
+
+
+def _summary_job(doc, trace_id):
+    with _summary_jobs_lock:
+        future = _summary_jobs.get(doc.content_hash)
+        if future is not None:
+            return future
+        if not summary_admission.acquire():
+            return None
+        future = summary_executor.submit(generate_and_store_summary, doc, trace_id)
+        _summary_jobs[doc.content_hash] = future
+
+    def done(_):
+        summary_admission.release()
+        with _summary_jobs_lock:
+            _summary_jobs.pop(doc.content_hash, None)
+
+    future.add_done_callback(done)
+    return future
+
+
+def get_or_create_summary(doc_id: str, trace_id: str = None):
+    """
+    Summary for a document, generated and stored on first request.
+
+    Args:
+        doc_id: Document ID in INDEX
+        trace_id: Trace to attribute the summary LLM call to; a new one when None
+
+    Returns:
+        Tuple of (summary or None, status) where status is one of "document",
+        "cache", "generated", "not_found", "busy", "timeout" or "failed"
+    """
+    source = get_document(INDEX, doc_id, HIT_SOURCE_FIELDS)
+    if source is None:
+        return None, "not_found"
+    doc = Hit.from_es_hit(source)
+    if doc.summary:
+        return doc.summary, "document"
+
+    cached = get_cached_summaries(INDEX_SUMMARY_CACHE, [doc.content_hash]).get(doc.content_hash)
+    if cached:
+        # Backfill the document so search can match on its summary too
+        summary_executor.submit(update_document_summary, INDEX, doc.id, cached)
+        return cached, "cache"
+
+    future = _summary_job(doc, trace_id or str(uuid.uuid4()))
+    if future is None:
+        return None, "busy"
+    try:
+        summary = future.result(timeout=SUMMARY_TIMEOUT)
+    except FutureTimeoutError:
+        return None, "timeout"
+    if not summary or summary == SUMMARY_FAILED:
+        return None, "failed"
+    return summary, "generated"
+
+
+def summary_url(doc_id: str) -> str:
+    return f"/api/summary/{quote(doc_id, safe='')}"
+
+
+def lazy_source(doc, summary, confidence, snippet: str = "", loading: bool = False) -> Dict[str, Any]:
+    """
+    Source event sent before the answer.
+
+    Args:
+        doc: Retrieved hit
+        summary: Stored LLM summary, or None
+        confidence: Confidence percentage
+        snippet: Extractive snippet shown until an LLM summary replaces it
+        loading: Whether a summary job is already running for the source
+
+    Returns:
+        Dict[str, Any]: SOURCE event payload
+    """
+    extractive = not summary and bool(snippet)
+    return {
+        "id": doc.id,
+        "name": doc.display_name,
+        "summary": summary or snippet or None,
+        "page_content": summary or snippet or None,
+        "summary_url": summary_url(doc.id),
+        "url": doc.url,
+        "category": doc.category,
+        "confidence": confidence,
+        "updated_at": doc.updated_at,
+        "loading": loading,
+        "enhanced": bool(summary),
+        "extractive": extractive,
+        "error": False,
+    }
+
+
+def busy_response(session_id: str, retry_after: int):
+    """Fast SSE reply for when chat capacity is saturated."""
+    yield f"data: {SESSION_ID_TAG} {session_id}\n\n"
+    yield f"data: {BUSY_TAG} {retry_after}\n\n"
+    yield "data: I'm handling a lot of questions right now. Please try again in a few seconds.\n\n"
+    yield f"data: {DONE_TAG}\n\n"
+
+def navigational_response(question: str, docs, chat_history):
+    """
+    Reply to a navigational query with its documents only, skipping the LLM.
+
+    Uses the same SSE events as a generated answer: SOURCE events, a short answer
+    listing the documents with a SOURCES: line, then DONE.
+    """
+    confidences = heuristic_confidences([doc.score for doc in docs])
+    for doc, confidence in zip(docs, confidences):
+        snippet = "" if doc.summary else extractive_summary(doc.page_content, question)
+        yield f"data: {SOURCE_TAG} {json.dumps(lazy_source(doc, doc.summary, int(confidence), snippet))}\n\n"
+
+    names = [doc.display_name for doc in docs]
+    answer = "\n".join(
+        [f"These documents match \"{question}\":", ""]
+        + [f"- {name}" for name in names]
+        + ["", f"SOURCES: {', '.join(names)}"]
+    )
+    yield data_frame(answer)
+    yield f"data: {DONE_TAG}\n\n"
+
+    chat_history.add_user_message(question)
+    chat_history.add_ai_message(answer)
+
+
+def build_answer_input(qa_prompt: str, partial_answer: str):
+    """
+    Build the LLM input for an answer attempt.
+
+    A fresh attempt sends the RAG prompt as-is. A retry after a partial stream sends
+    the text already delivered back as an assistant turn so the model continues from
+    that offset instead of regenerating the whole answer.
+    """
+    if not partial_answer:
+        return qa_prompt
+
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    return [
+        HumanMessage(content=qa_prompt),
+        AIMessage(content=partial_answer),
+        HumanMessage(content=prompt.continue_answer_template),
+    ]
+
+
+def stream_answer(llm, qa_prompt: str, coalescer: FrameCoalescer, max_retries: int = 3):
+    """
+    Stream the answer as SSE frames, resuming after dropped connections.
+
+    A retry continues from the text already sent (see `build_answer_input`) after a
+    `[RESUMED]` frame carrying its length in client characters. Once retries run
+    out, the rest comes from one non-streaming call; if that fails too, an error
+    message is appended to whatever was already sent.
+
+    Returns:
+        str: The answer exactly as the client received it, newlines kept
+    """
+    answer = ""
+    retry_count = 0
+
+    while retry_count <= max_retries:
+        try:
+            # Try streaming the response, continuing from any partial answer
+            llm_input = build_answer_input(qa_prompt, answer)
+            if answer:
+                yield f"data: {RESUMED_TAG} {framed_length(answer)}\n\n"
+            if HEDGE_ENABLED:
+                # Passed to the OpenAI client, so a losing stream blocked in a read is abandoned
+                stream = hedged_stream(lambda: llm.stream(llm_input, timeout=HEDGE_STREAM_TIMEOUT))
+            else:
+                stream = llm.stream(llm_input)
+            for chunk in stream:
+                if getattr(chunk, "usage_metadata", None):
+                    usage = record_answer_usage(chunk.usage_metadata)
+                    current_app.logger.info(
+                        f"Answer prompt: {usage['input_tokens']} input tokens, {usage['cached_tokens']} cached"
+                    )
+                answer += chunk.content
+                frame = coalescer.add(chunk.content)
+                if frame:
+                    yield frame
+
+            # If we get here, streaming was successful
+            frame = coalescer.flush()
+            if frame:
+                yield frame
+            break
+
+        except Exception as e:
+            # Send what was already generated so the client matches `answer` before resuming
+            frame = coalescer.flush()
+            if frame:
+                yield frame
+            retry_count += 1
+            current_app.logger.warning(f"Streaming attempt {retry_count} failed: {e}")
+
+            # Check if it's a connection error that we should retry
+            error_msg = str(e).lower()
+            is_connection_error = any(keyword in error_msg for keyword in [
+                'connection', 'timeout', 'protocol', 'chunked', 'incomplete'
+            ])
+
+            if retry_count <= max_retries and is_connection_error:
+                current_app.logger.info(
+                    f"Retrying streaming (attempt {retry_count}/{max_retries}), "
+                    f"resuming after {len(answer)} characters"
+                )
+                # Exponential backoff: 1s, 2s, 4s
+                time.sleep(2 ** (retry_count - 1))
+                continue
+            else:
+                # Max retries reached or non-retryable error - fall back to non-streaming
+                current_app.logger.error(f"Streaming failed after {retry_count} attempts, falling back to non-streaming: {e}")
+                try:
+                    # Try non-streaming as fallback, only asking for what's missing
+                    if answer:
+                        yield f"data: {RESUMED_TAG} {framed_length(answer)}\n\n"
+                    response = llm.invoke(build_answer_input(qa_prompt, answer))
+                    if getattr(response, "usage_metadata", None):
+                        record_answer_usage(response.usage_metadata)
+                    answer += response.content
+                    # Send the rest of the answer at once
+                    yield data_frame(response.content)
+                    break
+                except Exception as fallback_error:
+                    current_app.logger.error(f"Non-streaming fallback also failed: {fallback_error}")
+                    # Keep the partial answer the user already saw, so the chat history matches it
+                    error_message = "I'm sorry, I'm experiencing connection issues. Please try your question again in a moment."
+                    if answer:
+                        error_message = f"\n\n{error_message}"
+                    yield data_frame(error_message)
+                    answer += error_message
+                    break
+    return answer
+
 
 @stream_with_context
 def ask_question(question, session_id):
@@ -305,13 +880,24 @@ def ask_question(question, session_id):
         INDEX_CHAT_HISTORY, session_id
     )
 
+    # File-name and title lookups are answered with their documents, without the LLM
+    try:
+        navigational_docs = route_navigational(INDEX, question)
+    except Exception as e:
+        current_app.logger.warning(f"Intent routing failed, answering with the LLM: {e}")
+        navigational_docs = []
+    if navigational_docs:
+        current_app.logger.info(f"Navigational query, returning {len(navigational_docs)} documents without the LLM")
+        yield from navigational_response(question, navigational_docs, chat_history)
+        return
+
     if len(chat_history.messages) > 0:
         # create a condensed question
-        condense_question_prompt = condense_question_template.render(
+        condense_question_prompt = get_prompt_template("condense_question_template").render(
             question=question,
             chat_history=chat_history.messages,
         )
-        condensed_question = get_llm().invoke(condense_question_prompt).content
+        condensed_question = get_llm(role="condense").invoke(condense_question_prompt).content
     else:
         condensed_question = question
 
@@ -320,11 +906,11 @@ def ask_question(question, session_id):
 
     # Custom search function to handle multiple content fields
     def custom_search(query: str):
-        search_body = bm25_query(query)
-        search_body["_source"] = True
+        search_body = apply_search_options(bm25_query(query))
+        search_body["_source"] = HIT_SOURCE_FIELDS
         
         try:
-            response = elasticsearch_client.search(
+            response = get_elasticsearch_client().search(
                 index=INDEX,
                 body=search_body
             )
@@ -339,28 +925,10 @@ def ask_question(question, session_id):
                     continue
                 seen_ids.add(doc_id)
                 
-                source = hit["_source"]
-                
-                # Extract content from the first available field (simplified approach)
-                page_content = (
-                    source.get("body") or 
-                    source.get("CanvasContent1") or 
-                    source.get("Description") or 
-                    source.get("name", "No content available")
-                )
-                
-                doc = Document(
-                    page_content=page_content,
-                    metadata={
-                        "_score": hit["_score"],
-                        "_id": hit["_id"],
-                        "_source": source,
-                        "name": source.get("name", "Unknown Document")
-                    }
-                )
-                docs.append(doc)
+                docs.append(Hit.from_es_hit(hit))
             
-            return docs
+            # Over-fetched candidates: drop near-duplicate copies before taking the top results
+            return select_hits(docs)
         except Exception as e:
             current_app.logger.error(f"Custom search failed: {e}")
             raise e
@@ -375,278 +943,143 @@ def ask_question(question, session_id):
         yield f"data: {DONE_TAG}\n\n"
         return
 
-    # Calculate improved confidence scores based on absolute relevance
-    def calculate_confidence_scores(docs):
-        if not docs:
-            return []
-        
-        # Define relevance thresholds based on typical Elasticsearch scores
-        HIGH_RELEVANCE_THRESHOLD = 10.0   # Very relevant
-        MED_RELEVANCE_THRESHOLD = 5.0     # Somewhat relevant  
-        LOW_RELEVANCE_THRESHOLD = 2.0     # Minimally relevant
-        
-        scores = [doc.metadata.get("_score", 0) for doc in docs]
-        max_score = scores[0] if scores else 1
-        
-        confidences = []
-        for i, doc in enumerate(docs):
-            raw_score = doc.metadata.get("_score", 0)
-            
-            # Base confidence on absolute score first
-            if raw_score >= HIGH_RELEVANCE_THRESHOLD:
-                base_confidence = 0.8  # 80-100% range for highly relevant
-                confidence_range = 20
-            elif raw_score >= MED_RELEVANCE_THRESHOLD:
-                base_confidence = 0.5  # 50-80% range for moderately relevant
-                confidence_range = 30
-            elif raw_score >= LOW_RELEVANCE_THRESHOLD:
-                base_confidence = 0.3  # 30-50% range for minimally relevant
-                confidence_range = 20
-            else:
-                base_confidence = 0.1  # 10-30% range for very low relevance
-                confidence_range = 20
-            
-            # Apply relative scoring within the determined range
-            if max_score > 0 and raw_score > 0:
-                relative_score = (raw_score / max_score) ** 0.5
-            else:
-                relative_score = 0
-            
-            # Position decay (less aggressive for already lower confidence)
-            position_factor = 1.0 - (i * 0.08)  # Reduced from 0.1 to 0.08
-            
-            # Final confidence combines absolute relevance with relative positioning
-            confidence = int(base_confidence * 100 + 
-                           relative_score * position_factor * confidence_range)
-            
-            # Ensure confidence stays within reasonable bounds
-            confidences.append(min(100, max(10, confidence)))
-        
-        return confidences
-    
-    confidence_scores = calculate_confidence_scores(docs)
+    scorer = get_confidence_scorer()
+    scores = [doc.score for doc in docs]
+    confidence_by_id = dict(zip((doc.id for doc in docs), scorer.confidences(scores)))
+
+    if PRUNE_ENABLED:
+        # Weak hits would only cost a summary call and prompt tokens
+        docs, pruned = prune_hits(docs, scorer.probabilities(scores))
+        for doc, reason in pruned:
+            current_app.logger.info(f"Pruned document {doc.id} ({doc.name}, score {doc.score:.2f}): {reason}")
+    confidence_scores = [confidence_by_id[doc.id] for doc in docs]
     
     # Log retrieved documents for debugging
-    for i, doc in enumerate(docs):
-        doc_name = doc.metadata.get("_source", {}).get("name", "Unknown")
-        current_app.logger.debug(f'Retrieved document passage from: {doc_name}')
+    for doc in docs:
+        current_app.logger.debug(f'Retrieved document passage from: {doc.name}')
 
     # Get LLM with trace ID for feedback tracking
     llm_with_trace, trace_id = get_llm_with_trace_id()
     current_app.logger.debug(f"Generated trace ID: {trace_id}")
+    record_retrieval(trace_id, docs, confidence_scores)
     
-    # Check for existing summaries and prepare summary generation
-    def generate_single_summary(doc, doc_index, trace_id):
-        """Wrapper function to check for existing summary or generate new one"""
-        import asyncio
-        import logging
-        
-        # Set up logging for the thread (can't use current_app.logger in threads)
-        logger = logging.getLogger(__name__)
-        
-        # First check if summary already exists
-        doc_id = doc.metadata.get("_id")
-        if doc_id:
-            existing_summary = get_document_summary(INDEX, doc_id)
-            if existing_summary:
-                logger.debug(f"Using existing summary for document {doc_id}")
-                return existing_summary
-        
-        # Generate new summary if none exists
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            # Run the async function
-            result = loop.run_until_complete(generate_doc_summary(doc.page_content, trace_id))
-            
-            # Save the summary back to Elasticsearch if we have a doc_id
-            if doc_id and result and result != "Summary generation failed":
-                success = update_document_summary(INDEX, doc_id, result)
-                if success:
-                    logger.debug(f"Saved summary for document {doc_id}")
-                else:
-                    logger.warning(f"Failed to save summary for document {doc_id}")
-            
-            return result
-        except Exception as e:
-            logger.error(f"Summary generation error: {e}")
-            return "Summary generation failed"
-        finally:
-            # Proper async cleanup to prevent "Event loop is closed" errors
-            try:
-                # Get all remaining tasks
-                pending_tasks = asyncio.all_tasks(loop)
-                
-                if pending_tasks:
-                    # Cancel all pending tasks
-                    for task in pending_tasks:
-                        if not task.done():
-                            task.cancel()
-                    
-                    # Wait for cancellations to complete with timeout
-                    try:
-                        loop.run_until_complete(
-                            asyncio.wait_for(
-                                asyncio.gather(*pending_tasks, return_exceptions=True),
-                                timeout=2.0
-                            )
-                        )
-                    except asyncio.TimeoutError:
-                        logger.debug("Timeout waiting for task cancellation")
-                    except Exception:
-                        pass  # Ignore cleanup errors
-                
-                # Additional cleanup for httpx connections
-                try:
-                    # Give the loop one more chance to process any final cleanup
-                    loop.run_until_complete(asyncio.sleep(0.1))
-                except Exception:
-                    pass
-                    
-            except Exception as cleanup_error:
-                logger.debug(f"Loop cleanup warning (non-critical): {cleanup_error}")
-            finally:
-                # Close the loop
-                if not loop.is_closed():
-                    loop.close()
-
-    # Start summary generation in parallel threads
-    executor = ThreadPoolExecutor(max_workers=min(len(docs), 5))
-    summary_futures = {
-        executor.submit(generate_single_summary, doc, i, trace_id): i 
-        for i, doc in enumerate(docs)
-    }
-
-    qa_prompt = rags_prompt_template.render(
-        question=question,
-        docs=docs,
-        chat_history=chat_history.messages,
+    # Docs that already have a summary (on the hit or in the content-hash cache)
+    # don't need a job. Others are summarized on demand via GET /api/summary, or
+    # with EAGER_SUMMARIES on the shared executor, skipping jobs beyond the global cap.
+    summaries = [doc.summary for doc in docs]
+    cached_summaries = get_cached_summaries(
+        INDEX_SUMMARY_CACHE, [doc.content_hash for doc, summary in zip(docs, summaries) if not summary]
     )
+    # Maps each summary job to the indices of the docs it covers
+    summary_futures = {}
+    pending = []
+    for i, doc in enumerate(docs):
+        if summaries[i]:
+            current_app.logger.debug(f"Using existing summary for document {doc.id}")
+            continue
+        if doc.content_hash in cached_summaries:
+            current_app.logger.debug(f"Using cached summary for document {doc.id}")
+            summaries[i] = cached_summaries[doc.content_hash]
+            # Backfill the document so search can match on its summary too
+            summary_executor.submit(update_document_summary, INDEX, doc.id, summaries[i])
+            continue
+        if EAGER_SUMMARIES:
+            pending.append((i, doc))
+
+    if SUMMARY_BATCH_ENABLED and len(pending) > 1 and summary_admission.acquire():
+        # One request for all missing summaries instead of one per document
+        future = summary_executor.submit(generate_and_store_batch, [doc for _, doc in pending], trace_id)
+        future.add_done_callback(lambda _: summary_admission.release())
+        summary_futures[future] = [i for i, _ in pending]
+        pending = []
+    for i, doc in pending:
+        if not summary_admission.acquire():
+            current_app.logger.warning(f"Summary capacity reached, skipping summary for document {doc.id}")
+            continue
+        future = summary_executor.submit(generate_and_store_summary, doc, trace_id)
+        future.add_done_callback(lambda _: summary_admission.release())
+        summary_futures[future] = [i]
+
+    built_prompt = render_qa_prompt(question, docs, chat_history.messages)
+    qa_prompt = built_prompt.text
+    current_app.logger.debug(f"Answer prompt: {built_prompt.tokens} tokens in {built_prompt.segments} segments")
     
     # Send trace ID for feedback tracking
     yield f"data: {TRACE_ID_TAG} {trace_id}\n\n"
 
+    # Sources go out before the answer. Those without a summary carry a local extractive
+    # snippet until the LLM summary replaces it (eager job or fetched when opened).
+    snippets = [
+        "" if summary else extractive_summary(doc.page_content, condensed_question)
+        for doc, summary in zip(docs, summaries)
+    ]
+    summarizing = {i for doc_indices in summary_futures.values() for i in doc_indices}
+    for i, (doc, summary, confidence) in enumerate(zip(docs, summaries, confidence_scores)):
+        source = lazy_source(doc, summary, confidence, snippets[i], loading=i in summarizing)
+        yield f"data: {SOURCE_TAG} {json.dumps(source)}\n\n"
+
     # Stream the answer while summaries are being generated with retry logic
-    answer = ""
-    max_retries = 3
-    retry_count = 0
-    
-    while retry_count <= max_retries:
-        try:
-            # Try streaming the response
-            for chunk in llm_with_trace.stream(qa_prompt):
-                content = chunk.content.replace(
-                    "\n", "  "
-                )
-                yield f"data: {content}\n\n"
-                answer += chunk.content
-            
-            # If we get here, streaming was successful
-            break
-            
-        except Exception as e:
-            retry_count += 1
-            current_app.logger.warning(f"Streaming attempt {retry_count} failed: {e}")
-            
-            # Check if it's a connection error that we should retry
-            error_msg = str(e).lower()
-            is_connection_error = any(keyword in error_msg for keyword in [
-                'connection', 'timeout', 'protocol', 'chunked', 'incomplete'
-            ])
-            
-            if retry_count <= max_retries and is_connection_error:
-                current_app.logger.info(f"Retrying streaming (attempt {retry_count}/{max_retries})")
-                # Reset answer for retry
-                if retry_count > 1:
-                    answer = ""
-                # Exponential backoff: 1s, 2s, 4s
-                import time
-                time.sleep(2 ** (retry_count - 1))
-                continue
-            else:
-                # Max retries reached or non-retryable error - fall back to non-streaming
-                current_app.logger.error(f"Streaming failed after {retry_count} attempts, falling back to non-streaming: {e}")
-                try:
-                    # Try non-streaming as fallback
-                    response = llm_with_trace.invoke(qa_prompt)
-                    answer = response.content
-                    # Send the complete answer at once
-                    content = answer.replace("\n", "  ")
-                    yield f"data: {content}\n\n"
-                    break
-                except Exception as fallback_error:
-                    current_app.logger.error(f"Non-streaming fallback also failed: {fallback_error}")
-                    # Send error message to user
-                    error_message = "I'm sorry, I'm experiencing connection issues. Please try your question again in a moment."
-                    yield f"data: {error_message}\n\n"
-                    answer = error_message
-                    break
-    
+    coalescer = FrameCoalescer()
+    answer = yield from stream_answer(llm_with_trace, qa_prompt, coalescer)
+
+    current_app.logger.debug(f"Streamed {coalescer.chunks} chunks in {coalescer.frames} frames")
     yield f"data: {DONE_TAG}\n\n"
 
     # Wait for summaries to complete and send enhanced source information
-    try:
-        # Initialize summaries array to maintain order
-        summaries = [None] * len(docs)
-        
-        # Collect results as they complete
-        for future in as_completed(summary_futures.keys(), timeout=30):
-            try:
-                doc_index = summary_futures[future]
-                summary = future.result()
-                summaries[doc_index] = summary
-            except Exception as e:
-                current_app.logger.error(f"Summary generation failed for doc {summary_futures[future]}: {e}")
-                summaries[summary_futures[future]] = "Summary generation failed"
+    if EAGER_SUMMARIES:
+        try:
+            # Collect results as they complete
+            for future in as_completed(summary_futures.keys(), timeout=SUMMARY_TIMEOUT):
+                doc_indices = summary_futures[future]
+                try:
+                    result = future.result()
+                    for doc_index in doc_indices:
+                        # Batch jobs return summaries by doc ID
+                        summaries[doc_index] = (
+                            result.get(docs[doc_index].id, SUMMARY_FAILED) if isinstance(result, dict) else result
+                        )
+                except Exception as e:
+                    current_app.logger.error(f"Summary generation failed for docs {doc_indices}: {e}")
+                    for doc_index in doc_indices:
+                        summaries[doc_index] = SUMMARY_FAILED
         
-        # Send enhanced source information with summaries
-        current_app.logger.debug(f"Sending {len(docs)} enhanced source results")
-        for i, (doc, summary) in enumerate(zip(docs, summaries)):
-            # Get proper document name (prefer Title for SharePoint pages, then name)
-            source_data = doc.metadata.get("_source", {})
-            doc_name = (
-                source_data.get("Title") or 
-                source_data.get("name") or 
-                "Unknown Document"
-            )
-            doc_id = doc.metadata.get("_id")
-            doc_url = source_data.get("webUrl", "")
-            
+            # Send enhanced source information with summaries
+            current_app.logger.debug(f"Sending {len(docs)} enhanced source results")
+            for i, (doc, summary) in enumerate(zip(docs, summaries)):
+                failed = not summary or summary == SUMMARY_FAILED
+                enhanced_source = {
+                    "name": doc.display_name,
+                    # Failed summaries keep the extractive snippet
+                    "summary": snippets[i] or SUMMARY_FAILED if failed else summary,
+                    "page_content": snippets[i] or SUMMARY_FAILED if failed else summary,
+                    "url": doc.url,
+                    "category": doc.category,
+                    "confidence": confidence_scores[i] if i < len(confidence_scores) else 30,
+                    "updated_at": doc.updated_at,
+                    "loading": False,  # Summary is ready
+                    "enhanced": True,   # Indicate this is the final version
+                    "extractive": failed and bool(snippets[i]),
+                    "error": failed
+                }
 
+                yield f"data: {SOURCE_TAG} {json.dumps(enhanced_source)}\n\n"
             
-            enhanced_source = {
-                "name": doc_name,
-                "summary": summary if summary else "Summary generation failed",  # AI summary
-                "page_content": summary if summary else "Summary generation failed",
-                "url": doc_url,
-                "category": source_data.get("category", "sharepoint"),
-                "confidence": confidence_scores[i] if i < len(confidence_scores) else 30,
-                "updated_at": source_data.get("lastModifiedDateTime", None),
-                "loading": False,  # Summary is ready
-                "enhanced": True,   # Indicate this is an enhanced version
-                "error": summary == "Summary generation failed" if summary else True
-            }
-
-            yield f"data: {SOURCE_TAG} {json.dumps(enhanced_source)}\n\n"
-            
-    except Exception as e:
-        current_app.logger.error(f"Summary processing failed: {e}")
-        # Send error state for sources
-        for i, doc in enumerate(docs):
-            error_source = {
-                "name": doc.metadata.get("_source", {}).get("name", "Unknown"),
-                "summary": doc.page_content[:100] + "...",
-                "page_content": "Summary generation failed",
-                "url": doc.metadata.get("_source", {}).get("webUrl", ""),
-                "category": doc.metadata.get("_source", {}).get("category", "sharepoint"),
-                "confidence": confidence_scores[i] if i < len(confidence_scores) else 30,
-                "updated_at": doc.metadata.get("_source", {}).get("lastModifiedDateTime", None),
-                "loading": False,
-                "error": True
-            }
-            yield f"data: {SOURCE_TAG} {json.dumps(error_source)}\n\n"
-    finally:
-        executor.shutdown(wait=False)
+        except Exception as e:
+            current_app.logger.error(f"Summary processing failed: {e}")
+            # Send error state for sources
+            for i, doc in enumerate(docs):
+                error_source = {
+                    "name": doc.name,
+                    "summary": snippets[i] or doc.page_content[:100] + "...",
+                    "page_content": snippets[i] or SUMMARY_FAILED,
+                    "url": doc.url,
+                    "category": doc.category,
+                    "confidence": confidence_scores[i] if i < len(confidence_scores) else 30,
+                    "updated_at": doc.updated_at,
+                    "loading": False,
+                    "error": True
+                }
+                yield f"data: {SOURCE_TAG} {json.dumps(error_source)}\n\n"
 
     current_app.logger.debug("Answer: %s", answer)
 
@@ -0,0 +1,62 @@
+from typing import Any, Dict
+import hashlib
+import re
+
+# Fields a document's text is taken from, in order of preference
+CONTENT_FIELDS = ["body", "CanvasContent1", "Description"]
+
+_whitespace = re.compile(r"\s+")
+
+
+def page_content(source: Dict[str, Any]) -> str:
+    """Extract content from the first available field (simplified approach)."""
+    for field in CONTENT_FIELDS:
+        if source.get(field):
+            return source[field]
+    return source.get("name", "No content available")
+
+
+def normalize_content(text: str) -> str:
+    """Collapse whitespace and case so formatting-only edits hash the same."""
+    return _whitespace.sub(" ", text or "").strip().lower()
+
+
+def text_hash(text: str) -> str:
+    """Stable hash of normalized text."""
+    return hashlib.sha256(normalize_content(text).encode("utf-8")).hexdigest()
+
+
+def content_hash(source: Dict[str, Any]) -> str:
+    """Stable hash of a document's summarizable content."""
+    return text_hash(page_content(source))
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash over word shingles of the normalized text.
+
+    Near-identical documents get signatures a few bits apart, so copies with small
+    edits (headers, dates, footers) can be found by Hamming distance.
+    """
+    words = normalize_content(text).split()
+    if not words:
+        return 0
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    # Column-wise bit counts over fixed-width binary strings keep the work in C
+    bits = [
+        format(int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for s in shingles
+    ]
+    half = len(bits) / 2
+    signature = 0
+    for column in zip(*bits):
+        signature = signature << 1 | (column.count("1") > half)
+    return signature
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
@@ -0,0 +1,146 @@
+"""
+Near-duplicate collapsing and diversity-aware selection for retrieval results.
+
+Copies of one document (re-uploads, "v2" files, pages with a different footer)
+score almost identically, so without collapsing they can fill every slot and
+each one costs a summary and prompt space. Hits are over-fetched, then exact
+copies (same content hash) and near copies (SimHash within a few bits) are
+dropped before the top results are taken. SimHash signatures come from the
+index; hits indexed without one are only compared by content hash, since hashing
+a long body at query time costs far more than the comparison saves.
+"""
+import os
+
+from content import hamming_distance
+
+RETRIEVAL_SIZE = int(os.getenv("RETRIEVAL_SIZE", "5"))
+# Candidates fetched from ES so collapsing still leaves RETRIEVAL_SIZE results
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "15"))
+# client: collapse in-process after BM25 + rescore
+# collapse: also ask ES to collapse on content_hash (ES can't rescore collapsed searches)
+# off: no collapsing beyond exact _id duplicates
+DEDUP_MODE = os.getenv("DEDUP_MODE", "client").lower()
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "3"))
+# Unset disables MMR; 1.0 is pure relevance, lower values favour diversity
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA")) if os.getenv("RETRIEVAL_MMR_LAMBDA") else None
+
+
+def collapse_near_duplicates(hits, max_distance=None):
+    """
+    Keep the best-scoring hit of each group of duplicates.
+
+    Args:
+        hits: Hit records in descending score order
+        max_distance: Largest SimHash Hamming distance treated as a duplicate
+
+    Returns:
+        list: Hits with exact and near duplicates removed, order preserved
+    """
+    max_distance = SIMHASH_MAX_DISTANCE if max_distance is None else max_distance
+    kept = []
+    seen_ids = set()
+    seen_hashes = set()
+    for hit in hits:
+        if hit.id in seen_ids or hit.content_hash in seen_hashes:
+            continue
+        if max_distance >= 0 and hit.has_simhash and any(
+            other.has_simhash and hamming_distance(hit.simhash, other.simhash) <= max_distance for other in kept
+        ):
+            continue
+        seen_ids.add(hit.id)
+        seen_hashes.add(hit.content_hash)
+        kept.append(hit)
+    return kept
+
+
+def similarity(a, b):
+    """Content similarity in [0, 1] from the SimHash Hamming distance; 0 without indexed signatures."""
+    if not (a.has_simhash and b.has_simhash):
+        return 0.0
+    return 1.0 - hamming_distance(a.simhash, b.simhash) / 64.0
+
+
+def mmr_select(hits, k, mmr_lambda):
+    """
+    Maximal Marginal Relevance selection.
+
+    Each step picks the hit maximising
+    `mmr_lambda * relevance - (1 - mmr_lambda) * max similarity to already picked`,
+    with relevance being the score normalised by the top score.
+
+    Args:
+        hits: Candidate Hit records
+        k: Number of hits to select
+        mmr_lambda: Trade-off between relevance (1.0) and diversity (0.0)
+
+    Returns:
+        list: Selected hits in pick order
+    """
+    if not hits:
+        return []
+    top_score = max(hit.score for hit in hits) or 1.0
+    remaining = list(hits)
+    selected = []
+    while remaining and len(selected) < k:
+        best = max(
+            remaining,
+            key=lambda hit: mmr_lambda * hit.score / top_score
+            - (1 - mmr_lambda) * max((similarity(hit, other) for other in selected), default=0.0),
+        )
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+def select_hits(hits, size=None, mode=None, max_distance=None, mmr_lambda=None):
+    """
+    Reduce over-fetched candidates to the final retrieval results.
+
+    Args:
+        hits: Hit records in descending score order
+        size: Number of results to return
+        mode: DEDUP_MODE override
+        max_distance: SIMHASH_MAX_DISTANCE override
+        mmr_lambda: RETRIEVAL_MMR_LAMBDA override
+
+    Returns:
+        list: At most `size` hits
+    """
+    size = RETRIEVAL_SIZE if size is None else size
+    mode = DEDUP_MODE if mode is None else mode
+    mmr_lambda = RETRIEVAL_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+
+    if mode != "off":
+        # Runs in collapse mode too: ES only folds exact content_hash matches
+        hits = collapse_near_duplicates(hits, max_distance)
+    if mmr_lambda is not None:
+        return mmr_select(hits, size, mmr_lambda)
+    return hits[:size]
+
+
+def apply_search_options(search_body, mode=None):
+    """
+    Size the ES request for collapsing and add server-side collapse when enabled.
+
+    Args:
+        search_body: ES search body, modified in place
+        mode: DEDUP_MODE override
+
+    Returns:
+        dict: The same search body
+    """
+    mode = DEDUP_MODE if mode is None else mode
+    if mode == "off":
+        search_body["size"] = RETRIEVAL_SIZE
+        return search_body
+
+    search_body["size"] = max(RETRIEVAL_CANDIDATES, RETRIEVAL_SIZE)
+    if mode == "collapse":
+        # ES rejects rescore together with collapse
+        search_body.pop("rescore", None)
+        search_body["collapse"] = {"field": "content_hash"}
+    elif "rescore" in search_body:
+        search_body["rescore"]["window_size"] = max(
+            search_body["rescore"].get("window_size", 0), search_body["size"]
+        )
+    return search_body
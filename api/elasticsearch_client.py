@@ -1,36 +1,225 @@
-from elasticsearch import Elasticsearch
-from langchain_elasticsearch import ElasticsearchChatMessageHistory
-
+import datetime
 import os
+import threading
 
 ELASTIC_CLOUD_ID = os.getenv("ELASTIC_CLOUD_ID")
 ELASTICSEARCH_URL = os.getenv("ELASTICSEARCH_URL")
 ELASTIC_API_KEY = os.getenv("ELASTIC_API_KEY")
 
-if ELASTICSEARCH_URL:
-    elasticsearch_client = Elasticsearch(
-        hosts=[ELASTICSEARCH_URL],
-        timeout=30,  # 30 second timeout
-        max_retries=3,
-        retry_on_timeout=True
-    )
-elif ELASTIC_CLOUD_ID:
-    elasticsearch_client = Elasticsearch(
-        cloud_id=ELASTIC_CLOUD_ID, 
-        api_key=ELASTIC_API_KEY,
-        timeout=30,  # 30 second timeout
-        max_retries=3,
-        retry_on_timeout=True
-    )
-else:
-    raise ValueError(
-        "Please provide either ELASTICSEARCH_URL or ELASTIC_CLOUD_ID and ELASTIC_API_KEY"
-    )
+_elasticsearch_client = None
+_elasticsearch_client_lock = threading.Lock()
+
+
+def _create_elasticsearch_client():
+    from elasticsearch import Elasticsearch
+
+    if ELASTICSEARCH_URL:
+        return Elasticsearch(
+            hosts=[ELASTICSEARCH_URL],
+            timeout=30,  # 30 second timeout
+            max_retries=3,
+            retry_on_timeout=True
+        )
+    elif ELASTIC_CLOUD_ID:
+        return Elasticsearch(
+            cloud_id=ELASTIC_CLOUD_ID, 
+            api_key=ELASTIC_API_KEY,
+            timeout=30,  # 30 second timeout
+            max_retries=3,
+            retry_on_timeout=True
+        )
+    else:
+        raise ValueError(
+            "Please provide either ELASTICSEARCH_URL or ELASTIC_CLOUD_ID and ELASTIC_API_KEY"
+        )
+
+
+def get_elasticsearch_client():
+    """Return the shared Elasticsearch client, creating it on first use."""
+    global _elasticsearch_client
+    if _elasticsearch_client is None:
+        with _elasticsearch_client_lock:
+            if _elasticsearch_client is None:
+                _elasticsearch_client = _create_elasticsearch_client()
+    return _elasticsearch_client
+
+
+def __getattr__(name):
+    # Keeps `from elasticsearch_client import elasticsearch_client` working
+    # while deferring the connection until something actually asks for it
+    if name == "elasticsearch_client":
+        return get_elasticsearch_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Analyzers referenced by TEXT_FIELD_MAPPING (same conventions as Elastic's
+# search connectors), created with the index template
+ANALYSIS_SETTINGS = {
+    "analyzer": {
+        "i_prefix": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": ["cjk_width", "lowercase", "asciifolding", "front_ngram"]
+        },
+        "q_prefix": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": ["cjk_width", "lowercase", "asciifolding"]
+        },
+        "iq_text_base": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": ["cjk_width", "lowercase", "asciifolding", "en-stop-words-filter"]
+        },
+        "iq_text_stem": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": ["cjk_width", "lowercase", "asciifolding", "en-stop-words-filter", "en-stem-filter"]
+        },
+        "iq_text_delimiter": {
+            "type": "custom",
+            "tokenizer": "whitespace",
+            "filter": [
+                "delimiter", "cjk_width", "lowercase", "asciifolding",
+                "en-stop-words-filter", "en-stem-filter"
+            ]
+        },
+        "i_text_bigram": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": [
+                "cjk_width", "lowercase", "asciifolding", "en-stem-filter",
+                "bigram_joiner", "bigram_max_size"
+            ]
+        },
+        "q_text_bigram": {
+            "type": "custom",
+            "tokenizer": "standard",
+            "filter": [
+                "cjk_width", "lowercase", "asciifolding", "en-stem-filter",
+                "bigram_joiner_unigrams", "bigram_max_size"
+            ]
+        }
+    },
+    "filter": {
+        "front_ngram": {"type": "edge_ngram", "min_gram": 1, "max_gram": 12},
+        "bigram_joiner": {
+            "type": "shingle",
+            "token_separator": "",
+            "max_shingle_size": 2,
+            "output_unigrams": False
+        },
+        "bigram_joiner_unigrams": {
+            "type": "shingle",
+            "token_separator": "",
+            "max_shingle_size": 2,
+            "output_unigrams": True
+        },
+        "bigram_max_size": {"type": "length", "min": 0, "max": 16},
+        "en-stem-filter": {"type": "stemmer", "name": "light_english"},
+        "en-stop-words-filter": {"type": "stop", "stopwords": "_english_"},
+        "delimiter": {
+            "type": "word_delimiter_graph",
+            "generate_word_parts": True,
+            "generate_number_parts": True,
+            "catenate_words": True,
+            "catenate_numbers": True,
+            "catenate_all": True,
+            "preserve_original": False,
+            "split_on_case_change": True,
+            "split_on_numerics": True,
+            "stem_english_possessive": True
+        }
+    }
+}
+
+# Full-text field with the subfields the search queries rely on (.stem, .prefix, ...)
+TEXT_FIELD_MAPPING = {
+    "type": "text",
+    "analyzer": "iq_text_base",
+    "fields": {
+        "delimiter": {
+            "type": "text",
+            "index_options": "freqs",
+            "analyzer": "iq_text_delimiter"
+        },
+        "enum": {
+            "type": "keyword",
+            "ignore_above": 2048
+        },
+        "joined": {
+            "type": "text",
+            "index_options": "freqs",
+            "analyzer": "i_text_bigram",
+            "search_analyzer": "q_text_bigram"
+        },
+        "prefix": {
+            "type": "text",
+            "index_options": "docs",
+            "analyzer": "i_prefix",
+            "search_analyzer": "q_prefix"
+        },
+        "stem": {
+            "type": "text",
+            "analyzer": "iq_text_stem"
+        }
+    }
+}
+
+DOCUMENT_MAPPINGS = {
+    "properties": {
+        "name": TEXT_FIELD_MAPPING,
+        "Title": TEXT_FIELD_MAPPING,
+        "body": TEXT_FIELD_MAPPING,
+        "Description": TEXT_FIELD_MAPPING,
+        "CanvasContent1": TEXT_FIELD_MAPPING,
+        "summary": TEXT_FIELD_MAPPING,
+        "parentReference": {
+            "properties": {
+                "path": TEXT_FIELD_MAPPING
+            }
+        },
+        "webUrl": {"type": "keyword"},
+        "category": {"type": "keyword"},
+        "lastModifiedDateTime": {"type": "date"},
+        "content_hash": {"type": "keyword"},
+        # Hex SimHash for near-duplicate collapsing; only ever read back, never searched
+        "simhash": {"type": "keyword", "index": False}
+    }
+}
+
+
+def ensure_index_template(index: str) -> bool:
+    """
+    Create or update the index template carrying the analyzers and document mapping.
+    
+    Args:
+        index: Elasticsearch index name; the template matches it and its versioned copies
+    
+    Returns:
+        True if the template was stored successfully, False otherwise
+    """
+    try:
+        get_elasticsearch_client().indices.put_index_template(
+            name=f"{index}-template",
+            body={
+                "index_patterns": [index, f"{index}-v*"],
+                "priority": 100,
+                "template": {
+                    "settings": {"analysis": ANALYSIS_SETTINGS},
+                    "mappings": DOCUMENT_MAPPINGS
+                }
+            }
+        )
+        return True
+    except Exception as e:
+        print(f"Error creating index template for {index}: {str(e)}")
+        return False
 
 
 def get_elasticsearch_chat_message_history(index, session_id):
     # Check if the index exists
-    if not elasticsearch_client.indices.exists(index=index):
+    if not get_elasticsearch_client().indices.exists(index=index):
         # Create the index with proper mapping for chat history
         # Including the 'created_at' field that's causing the error
         mapping = {
@@ -43,13 +232,15 @@ def get_elasticsearch_chat_message_history(index, session_id):
             }
         }
         try:
-            elasticsearch_client.indices.create(index=index, body=mapping)
+            get_elasticsearch_client().indices.create(index=index, body=mapping)
         except Exception as e:
             raise RuntimeError(f"Failed to create index: {e}")
     
     # Return the chat history object
+    from langchain_elasticsearch import ElasticsearchChatMessageHistory
+
     return ElasticsearchChatMessageHistory(
-        es_connection=elasticsearch_client, index=index, session_id=session_id
+        es_connection=get_elasticsearch_client(), index=index, session_id=session_id
     )
 
 
@@ -68,7 +259,7 @@ def update_document_summary(index: str, doc_id: str, summary: str) -> bool:
     try:
         if summary is None:
             # Remove the summary field
-            response = elasticsearch_client.update(
+            response = get_elasticsearch_client().update(
                 index=index,
                 id=doc_id,
                 body={
@@ -80,7 +271,7 @@ def update_document_summary(index: str, doc_id: str, summary: str) -> bool:
             )
         else:
             # Update with new summary
-            response = elasticsearch_client.update(
+            response = get_elasticsearch_client().update(
                 index=index,
                 id=doc_id,
                 body={
@@ -95,6 +286,130 @@ def update_document_summary(index: str, doc_id: str, summary: str) -> bool:
         return False
 
 
+_summary_cache_ready = set()
+
+
+def ensure_summary_cache_index(index: str) -> bool:
+    """
+    Create the content-hash keyed summary cache index if it doesn't exist.
+    
+    Args:
+        index: Summary cache index name
+    
+    Returns:
+        True if the index exists or was created successfully
+    """
+    if index in _summary_cache_ready:
+        return True
+    try:
+        es = get_elasticsearch_client()
+        if not es.indices.exists(index=index):
+            es.indices.create(index=index, body={
+                "mappings": {
+                    "properties": {
+                        "summary": {"type": "text", "index": False},
+                        "created_at": {"type": "date"},
+                        "calls": {"type": "integer"},
+                        "input_tokens": {"type": "integer"},
+                        "output_tokens": {"type": "integer"}
+                    }
+                }
+            })
+        _summary_cache_ready.add(index)
+        return True
+    except Exception as e:
+        print(f"Error creating summary cache index {index}: {str(e)}")
+        return False
+
+
+def get_cached_summaries(index: str, content_hashes: list) -> dict:
+    """
+    Look up summaries by content hash in one request.
+    
+    Args:
+        index: Summary cache index name
+        content_hashes: Content hashes to look up
+    
+    Returns:
+        Dict mapping content hash to summary for the hashes found
+    """
+    if not content_hashes:
+        return {}
+    try:
+        response = get_elasticsearch_client().mget(
+            index=index,
+            body={"ids": list(set(content_hashes))},
+            _source=["summary"]
+        )
+        return {
+            doc["_id"]: doc["_source"]["summary"]
+            for doc in response["docs"]
+            if doc.get("found") and doc["_source"].get("summary")
+        }
+    except Exception:
+        return {}
+
+
+def store_cached_summary(index: str, content_hash: str, summary: str, usage: dict = None) -> bool:
+    """
+    Store a summary under its content hash so identical documents can share it.
+    
+    Args:
+        index: Summary cache index name
+        content_hash: Normalized content hash of the summarized text
+        summary: Generated summary
+        usage: Optional LLM calls and input/output tokens spent on the summary
+    
+    Returns:
+        True if the summary was stored successfully, False otherwise
+    """
+    if not ensure_summary_cache_index(index):
+        return False
+    try:
+        get_elasticsearch_client().index(
+            index=index,
+            id=content_hash,
+            body={
+                "summary": summary,
+                "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                **(usage or {})
+            }
+        )
+        return True
+    except Exception as e:
+        print(f"Error caching summary {content_hash}: {str(e)}")
+        return False
+
+
+def store_feedback_records(index: str, records: list) -> bool:
+    """
+    Append feedback and retrieval records to the feedback index in one bulk request.
+    
+    Args:
+        index: Feedback index name
+        records: Records to store; each becomes its own document
+    
+    Returns:
+        True if every record was stored, False otherwise
+    """
+    if not records:
+        return True
+    from elasticsearch import helpers
+
+    try:
+        _, errors = helpers.bulk(
+            get_elasticsearch_client(),
+            ({"_index": index, "_source": record} for record in records),
+            raise_on_error=False,
+        )
+        if errors:
+            print(f"Error storing {len(errors)} feedback records: {errors[0]}")
+        return not errors
+    except Exception as e:
+        print(f"Error storing feedback records: {str(e)}")
+        return False
+
+
 def get_document_summary(index: str, doc_id: str) -> str:
     """
     Get the existing summary for a document if it exists.
@@ -107,7 +422,7 @@ def get_document_summary(index: str, doc_id: str) -> str:
         Existing summary or None if not found
     """
     try:
-        response = elasticsearch_client.get(
+        response = get_elasticsearch_client().get(
             index=index,
             id=doc_id,
             _source=["summary"]
@@ -117,6 +432,29 @@ def get_document_summary(index: str, doc_id: str) -> str:
         return None
 
 
+def get_document(index: str, doc_id: str, source_fields: list = None) -> dict:
+    """
+    Get a single document as a raw hit.
+    
+    Args:
+        index: Elasticsearch index or alias name
+        doc_id: Document ID to fetch
+        source_fields: `_source` fields to return, all when None
+    
+    Returns:
+        Hit dict with `_id` and `_source`, or None if not found
+    """
+    try:
+        response = get_elasticsearch_client().get(
+            index=index,
+            id=doc_id,
+            _source=source_fields if source_fields is not None else True
+        )
+        return {"_id": response["_id"], "_score": None, "_source": response["_source"]}
+    except Exception:
+        return None
+
+
 def add_summary_field_to_mapping(index: str) -> bool:
     """
     Add the summary field to the existing index mapping.
@@ -131,42 +469,12 @@ def add_summary_field_to_mapping(index: str) -> bool:
         # Define the summary field mapping that matches your existing pattern
         summary_mapping = {
             "properties": {
-                "summary": {
-                    "type": "text",
-                    "analyzer": "iq_text_base",
-                    "fields": {
-                        "delimiter": {
-                            "type": "text",
-                            "index_options": "freqs",
-                            "analyzer": "iq_text_delimiter"
-                        },
-                        "enum": {
-                            "type": "keyword",
-                            "ignore_above": 2048
-                        },
-                        "joined": {
-                            "type": "text",
-                            "index_options": "freqs",
-                            "analyzer": "i_text_bigram",
-                            "search_analyzer": "q_text_bigram"
-                        },
-                        "prefix": {
-                            "type": "text",
-                            "index_options": "docs",
-                            "analyzer": "i_prefix",
-                            "search_analyzer": "q_prefix"
-                        },
-                        "stem": {
-                            "type": "text",
-                            "analyzer": "iq_text_stem"
-                        }
-                    }
-                }
+                "summary": TEXT_FIELD_MAPPING
             }
         }
         
         # Update the mapping
-        response = elasticsearch_client.indices.put_mapping(
+        response = get_elasticsearch_client().indices.put_mapping(
             index=index,
             body=summary_mapping
         )
@@ -191,10 +499,12 @@ def ensure_summary_field_exists(index: str) -> bool:
     """
     try:
         # Get current mapping
-        mapping = elasticsearch_client.indices.get_mapping(index=index)
+        mapping = get_elasticsearch_client().indices.get_mapping(index=index)
         
-        # Check if summary field exists
-        properties = mapping[index]['mappings'].get('properties', {})
+        # Check if summary field exists (keys are concrete index names when `index` is an alias)
+        properties = {}
+        for index_mapping in mapping.values():
+            properties.update(index_mapping['mappings'].get('properties', {}))
         
         if 'summary' not in properties:
             print(f"Summary field not found in {index}, adding it...")
@@ -206,3 +516,75 @@ def ensure_summary_field_exists(index: str) -> bool:
     except Exception as e:
         print(f"Error checking summary field existence: {str(e)}")
         return False
+
+
+def get_alias_indices(alias: str) -> list:
+    """
+    Get the concrete indices an alias currently points to.
+    
+    Args:
+        alias: Alias name
+    
+    Returns:
+        Sorted list of index names, empty if the alias doesn't exist
+    """
+    es = get_elasticsearch_client()
+    if not es.indices.exists_alias(name=alias):
+        return []
+    return sorted(es.indices.get_alias(name=alias).keys())
+
+
+def is_concrete_index(name: str) -> bool:
+    """True if `name` is a real index rather than an alias."""
+    es = get_elasticsearch_client()
+    return bool(es.indices.exists(index=name)) and not es.indices.exists_alias(name=name)
+
+
+def list_index_versions(alias: str) -> list:
+    """
+    List the versioned indices (`{alias}-v{n}`) built for an alias.
+    
+    Args:
+        alias: Alias name
+    
+    Returns:
+        Sorted list of (version, index name) tuples
+    """
+    prefix = f"{alias}-v"
+    indices = get_elasticsearch_client().indices.get(index=f"{prefix}*")
+    versions = []
+    for name in indices.keys():
+        suffix = name[len(prefix):]
+        if suffix.isdigit():
+            versions.append((int(suffix), name))
+    return sorted(versions)
+
+
+def swap_alias(alias: str, new_index: str, remove_index: str = None) -> bool:
+    """
+    Atomically point an alias at `new_index`, detaching it from every other index.
+    
+    Args:
+        alias: Alias name
+        new_index: Index the alias should point to
+        remove_index: Concrete index to delete in the same atomic step (used when
+            replacing a plain index that has the alias's name)
+    
+    Returns:
+        True if the alias was swapped successfully, False otherwise
+    """
+    actions = [
+        {"remove": {"index": index, "alias": alias}}
+        for index in get_alias_indices(alias)
+        if index != new_index
+    ]
+    if remove_index:
+        actions.append({"remove_index": {"index": remove_index}})
+    actions.append({"add": {"index": new_index, "alias": alias, "is_write_index": True}})
+    try:
+        get_elasticsearch_client().indices.update_aliases(body={"actions": actions})
+        print(f"Alias {alias} now points to {new_index}")
+        return True
+    except Exception as e:
+        print(f"Error swapping alias {alias} to {new_index}: {str(e)}")
+        return False
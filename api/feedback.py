@@ -0,0 +1,305 @@
+"""
+Feedback capture and delivery off the request path.
+
+`/api/feedback` only enqueues. A background thread drains the queue in batches,
+appends each batch to the local store (a JSONL log or an Elasticsearch index)
+and then forwards the batch's thumbs events to the Portkey feedback API in one
+request over a pooled, retrying HTTP session. Events the gateway couldn't take
+are kept, up to the queue size, and sent again with a later batch. Retrieval
+records (hit ids and scores per trace) go to the same store so confidence
+calibration can be fitted from them offline.
+"""
+import atexit
+import datetime
+import json
+from collections import deque
+import logging
+import os
+import queue
+import threading
+import time
+
+from elasticsearch_client import store_feedback_records
+
+logger = logging.getLogger(__name__)
+
+# file: append-only JSONL log; elasticsearch: feedback index; none: forward only
+FEEDBACK_STORE = os.getenv("FEEDBACK_STORE", "file").lower()
+FEEDBACK_LOG_FILE = os.getenv(
+    "FEEDBACK_LOG_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "feedback.jsonl"),
+)
+INDEX_FEEDBACK = os.getenv("ES_INDEX_FEEDBACK", "ccc-db-feedback")
+PORTKEY_FEEDBACK_URL = os.getenv("PORTKEY_FEEDBACK_URL", "https://api.portkey.ai/v1/feedback")
+FEEDBACK_FORWARD_ENABLED = os.getenv(
+    "FEEDBACK_FORWARD_ENABLED", "true" if os.getenv("PORTKEY_API_KEY") else "false"
+).lower() == "true"
+FEEDBACK_QUEUE_SIZE = int(os.getenv("FEEDBACK_QUEUE_SIZE", "1000"))
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "50"))
+# Seconds the forwarder waits to fill a batch before flushing what it has
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "1.0"))
+FEEDBACK_MAX_RETRIES = int(os.getenv("FEEDBACK_MAX_RETRIES", "3"))
+FEEDBACK_TIMEOUT = float(os.getenv("FEEDBACK_TIMEOUT", "5"))
+# Seconds before events the gateway didn't accept are sent again
+FEEDBACK_RETRY_INTERVAL = float(os.getenv("FEEDBACK_RETRY_INTERVAL", "30"))
+# Statuses meaning the gateway takes one event per request, not a list
+_BATCH_UNSUPPORTED = {400, 404, 405, 413, 422}
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def append_to_log(path, records):
+    """Append records as JSON lines in a single write."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+    return True
+
+
+def create_store(kind=None):
+    """Callable that persists a batch of records, or None when nothing is stored."""
+    kind = FEEDBACK_STORE if kind is None else kind
+    if kind == "file":
+        return lambda records: append_to_log(FEEDBACK_LOG_FILE, records)
+    if kind == "elasticsearch":
+        return lambda records: store_feedback_records(INDEX_FEEDBACK, records)
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown FEEDBACK_STORE: {kind}")
+
+
+def create_session(pool_size=4, max_retries=None):
+    """Keep-alive session that retries connection errors, 429 and 5xx with backoff."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retries = Retry(
+        total=FEEDBACK_MAX_RETRIES if max_retries is None else max_retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "x-portkey-api-key": os.getenv("PORTKEY_API_KEY") or "",
+        "Content-Type": "application/json",
+    })
+    return session
+
+
+class FeedbackPipeline:
+    """
+    Bounded queue drained by one background thread.
+
+    Args:
+        store: Callable persisting a list of records, or None
+        forward: Whether feedback events are sent to the gateway
+        queue_size: Records held before new ones are dropped, and unsent events kept at most
+        batch_size: Records handled per drain
+        flush_interval: Seconds to wait for a batch to fill
+        session_factory: Builds the HTTP session used for forwarding
+        retry_interval: Seconds before unsent events are forwarded again
+    """
+
+    def __init__(
+        self,
+        store=None,
+        forward=False,
+        queue_size=FEEDBACK_QUEUE_SIZE,
+        batch_size=FEEDBACK_BATCH_SIZE,
+        flush_interval=FEEDBACK_FLUSH_INTERVAL,
+        session_factory=create_session,
+        url=PORTKEY_FEEDBACK_URL,
+        retry_interval=FEEDBACK_RETRY_INTERVAL,
+    ):
+        self.store = store
+        self.forward = forward
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self.url = url
+        self.retry_interval = retry_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        # Feedback events still to forward; only the forwarder thread touches it
+        self._unsent = deque(maxlen=queue_size or None)
+        self._retry_at = 0.0
+        self._batch_forward = True
+        self._session = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counts = {
+            "queued": 0, "dropped": 0, "stored": 0, "store_failed": 0,
+            "forwarded": 0, "forward_failed": 0, "forward_rejected": 0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._counts[name] += amount
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="feedback-forwarder", daemon=True)
+                self._thread.start()
+
+    def submit(self, record) -> bool:
+        """Enqueue a record without blocking; False when the queue is full."""
+        record.setdefault("timestamp", _now())
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+            logger.warning("Feedback queue full, dropping %s record", record.get("type"))
+            return False
+        self._count("queued")
+        return True
+
+    def flush(self, timeout=5.0) -> bool:
+        """Wait until everything queued so far has been handled."""
+        if self._thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _next_batch(self, timeout=None):
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Wake up for unsent events even when nothing new arrives
+            timeout = max(0.0, self._retry_at - time.monotonic()) if self._unsent else None
+            batch = self._next_batch(timeout)
+            try:
+                self.process(batch)
+            except Exception:
+                logger.exception("Feedback batch failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def process(self, batch):
+        """Store a batch, then forward its feedback events with any unsent ones."""
+        if batch and self.store is not None:
+            try:
+                stored = self.store(batch)
+            except Exception as e:
+                logger.warning("Failed to store feedback: %s", e)
+                stored = False
+            self._count("stored" if stored else "store_failed", len(batch))
+
+        if not self.forward:
+            return
+        events = [record for record in batch if record.get("type") == "feedback"]
+        if self._unsent and time.monotonic() >= self._retry_at:
+            events = list(self._unsent) + events
+            self._unsent.clear()
+        if not events:
+            return
+        unsent = self._send(events)
+        self._count("forwarded", len(events) - len(unsent))
+        if unsent:
+            self._count("forward_failed", len(unsent))
+            if self._unsent.maxlen is not None:
+                overflow = len(self._unsent) + len(unsent) - self._unsent.maxlen
+                if overflow > 0:
+                    self._count("dropped", overflow)
+            # Oldest events fall out first once the deque is full
+            self._unsent.extend(unsent)
+            self._retry_at = time.monotonic() + self.retry_interval
+            logger.warning("Kept %s feedback events for retry in %.0fs", len(unsent), self.retry_interval)
+
+    def _send(self, records) -> list:
+        """Forward records, returning the ones to try again later."""
+        if self._batch_forward and len(records) > 1:
+            status = self._post([self._payload(record) for record in records])
+            if status == 200:
+                return []
+            if status not in _BATCH_UNSUPPORTED:
+                return records
+            logger.info("Portkey feedback API rejected a batch (%s), sending events one by one", status)
+            self._batch_forward = False
+
+        for position, record in enumerate(records):
+            status = self._post(self._payload(record))
+            if status == 200:
+                continue
+            if status is None or status == 429 or status >= 500:
+                # The gateway is unavailable; keep this event and the rest for later
+                return records[position:]
+            self._count("forward_rejected")
+        return []
+
+    @staticmethod
+    def _payload(record):
+        return {"trace_id": record["trace_id"], "value": record["value"]}
+
+    def _post(self, body):
+        """Response status, or None when the request itself failed."""
+        if self._session is None:
+            self._session = self.session_factory()
+        try:
+            # Retries with backoff happen inside the session adapter
+            response = self._session.post(self.url, json=body, timeout=FEEDBACK_TIMEOUT)
+        except Exception as e:
+            logger.warning("Failed to send feedback to Portkey: %s", e)
+            return None
+        if response.status_code != 200:
+            logger.warning("Portkey feedback API returned %s: %s", response.status_code, response.text)
+        return response.status_code
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._counts)
+        stats["pending"] = self._queue.qsize()
+        stats["unsent"] = len(self._unsent)
+        return stats
+
+
+feedback_pipeline = FeedbackPipeline(store=create_store(), forward=FEEDBACK_FORWARD_ENABLED)
+atexit.register(feedback_pipeline.flush)
+
+
+def record_feedback(trace_id, value) -> bool:
+    return feedback_pipeline.submit({"type": "feedback", "trace_id": trace_id, "value": value})
+
+
+def record_retrieval(trace_id, hits, confidences) -> bool:
+    """Keep hit scores per trace so feedback can be joined back to them offline."""
+    return feedback_pipeline.submit({
+        "type": "retrieval",
+        "trace_id": trace_id,
+        "hits": [
+            {"id": hit.id, "score": hit.score, "confidence": confidence}
+            for hit, confidence in zip(hits, confidences)
+        ],
+    })
@@ -0,0 +1,48 @@
+"""
+Production serving profile for the API.
+
+Run from the api directory with:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Worker model is picked with GUNICORN_WORKER_CLASS: "gthread" (default) gives each
+worker a pool of threads for long-lived SSE streams, "gevent" serves streams on
+greenlets for much higher connection counts.
+"""
+import multiprocessing
+import os
+
+# Lets the app skip its dev-server warm-up thread; the hooks below handle it per worker
+os.environ.setdefault("APP_SERVER", "gunicorn")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '4000')}"
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("GUNICORN_WORKERS", str(min(4, multiprocessing.cpu_count() * 2 + 1))))
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# The ES and LLM clients are built on first use, so preloading would be fork-safe,
+# but it wouldn't save anything: importing the app is cheap and the heavy client
+# libraries load after the fork in each worker anyway. Importing per worker also
+# lets a HUP reload pick up new code, and warm_up() runs in post_worker_init below.
+preload_app = False
+
+# SSE answers can stream for a while; don't kill workers mid-answer
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# On SIGTERM workers stop accepting and get this long to drain open streams
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    from serving import install_drain_handler, ready
+    from app import warm_up
+
+    # Gunicorn has installed its own SIGTERM handler by now; chain ours in front
+    install_drain_handler()
+    warm_up()
+    ready.set()
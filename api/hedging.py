@@ -0,0 +1,240 @@
+"""
+Hedged LLM streaming to cut time-to-first-token tail latency.
+
+If the first chunk hasn't arrived within the hedge threshold, an identical second
+stream is started and whichever produces a chunk first is used. The other one is
+closed right away. Hedges are limited by a budget so they stay under a set
+percentage of traffic.
+"""
+from collections import deque
+import logging
+import os
+import queue
+import threading
+import time
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+# Fixed threshold in ms; when unset the observed p95 time-to-first-token is used
+HEDGE_TTFT_MS = os.getenv("HEDGE_TTFT_MS")
+HEDGE_DEFAULT_TTFT_MS = float(os.getenv("HEDGE_DEFAULT_TTFT_MS", "3000"))
+HEDGE_BUDGET_PERCENT = float(os.getenv("HEDGE_BUDGET_PERCENT", "5"))
+HEDGE_MIN_SAMPLES = 20
+# Seconds a hedged request may wait for data before its HTTP client gives up. This
+# bounds a losing stream that can't be closed while it is blocked in a read.
+HEDGE_STREAM_TIMEOUT = float(os.getenv("HEDGE_STREAM_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class TTFTTracker:
+    """Rolling window of time-to-first-token samples."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+
+class HedgeBudget:
+    """
+    Token-bucket budget: every request deposits `percent / 100` tokens and every
+    hedge withdraws one, so hedges stay below `percent` of requests over time.
+    """
+
+    def __init__(self, percent, min_tokens=1.0, max_tokens=10.0):
+        self.ratio = percent / 100
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+
+    def deposit(self):
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self):
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            self.hedges += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+                "tokens": round(self._tokens, 3),
+            }
+
+
+ttft_tracker = TTFTTracker()
+hedge_budget = HedgeBudget(HEDGE_BUDGET_PERCENT)
+
+
+def hedge_threshold():
+    """Seconds to wait for a first chunk before hedging."""
+    if HEDGE_TTFT_MS:
+        return float(HEDGE_TTFT_MS) / 1000
+    if len(ttft_tracker) >= HEDGE_MIN_SAMPLES:
+        return ttft_tracker.percentile(95)
+    return HEDGE_DEFAULT_TTFT_MS / 1000
+
+
+class _StreamRunner:
+    """Drains one stream on a background thread into a shared queue."""
+
+    def __init__(self, name, make_stream, events):
+        self.name = name
+        self.make_stream = make_stream
+        self.events = events
+        self.chunks = queue.Queue()
+        self.cancelled = threading.Event()
+        self.error = None
+        self.stream = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        """
+        Stop the stream and release its HTTP response.
+
+        Stream objects are closed from here. A generator can't be closed while it is
+        blocked waiting for its next chunk, so that one is closed by the runner as
+        soon as the chunk (or the client's read timeout) arrives.
+        """
+        self.cancelled.set()
+        self._close()
+
+    def _close(self):
+        # Closing the generator releases the underlying HTTP response
+        close = getattr(self.stream, "close", None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass  # Still executing on the runner thread, which closes it
+
+    def _run(self):
+        first = True
+        try:
+            self.stream = iter(self.make_stream())
+            if self.cancelled.is_set():
+                return
+            for chunk in self.stream:
+                if self.cancelled.is_set():
+                    break
+                # Role/usage chunks carry no content and don't count as a first token
+                if first and getattr(chunk, "content", chunk):
+                    self.events.put(("first", self))
+                    first = False
+                self.chunks.put(chunk)
+            self.chunks.put(_DONE)
+            if first:
+                self.events.put(("first", self))
+        except Exception as e:
+            self.error = e
+            self.chunks.put(e)
+            if first:
+                self.events.put(("error", self))
+        finally:
+            self._close()
+
+
+def hedged_stream(make_stream, threshold=None, budget=None, tracker=None):
+    """
+    Yield chunks from `make_stream()`, hedging with a second identical stream
+    when the first chunk is slower than `threshold` seconds.
+
+    Args:
+        make_stream: Zero-argument callable returning a fresh chunk iterator
+        threshold: Seconds to wait before hedging, defaults to hedge_threshold()
+        budget: HedgeBudget limiting how often hedges are issued
+        tracker: TTFTTracker that records the primary stream's time-to-first-token.
+            When the hedge wins, the primary's wait until then is recorded: a lower
+            bound of its real TTFT, which keeps slow primaries in the p95 instead
+            of the faster hedges that replaced them.
+
+    Raises:
+        The first stream's exception if every started stream fails before
+        producing a chunk, or the winner's exception if it fails mid-stream.
+    """
+    budget = hedge_budget if budget is None else budget
+    tracker = ttft_tracker if tracker is None else tracker
+    threshold = hedge_threshold() if threshold is None else threshold
+
+    budget.deposit()
+    start = time.perf_counter()
+    events = queue.Queue()
+    runners = [_StreamRunner("primary", make_stream, events)]
+    runners[0].start()
+
+    winner = None
+    failed = []
+    hedged = False
+    while winner is None:
+        timeout = None
+        if not hedged:
+            timeout = max(0.0, threshold - (time.perf_counter() - start))
+        try:
+            kind, runner = events.get(timeout=timeout)
+        except queue.Empty:
+            hedged = True
+            if budget.try_withdraw():
+                logger.info(f"No first token after {threshold:.2f}s, starting hedged stream")
+                hedge = _StreamRunner("hedge", make_stream, events)
+                runners.append(hedge)
+                hedge.start()
+            continue
+
+        if kind == "first":
+            winner = runner
+        else:
+            # Keep waiting while another stream is still in flight
+            failed.append(runner)
+            if len(failed) == len(runners):
+                break
+
+    if winner is None:
+        raise failed[0].error
+
+    # Measured from the primary's start whichever stream won (see `tracker` above)
+    tracker.record(time.perf_counter() - start)
+    for runner in runners:
+        if runner is not winner:
+            logger.debug(f"Cancelling losing {runner.name} stream")
+            runner.cancel()
+
+    try:
+        while True:
+            chunk = winner.chunks.get()
+            if chunk is _DONE:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        winner.cancel()
@@ -0,0 +1,117 @@
+from typing import Any, Dict, Optional
+from content import page_content, simhash, text_hash
+
+# Only the _source fields that downstream code reads; everything else stays in ES
+HIT_SOURCE_FIELDS = [
+    "body",
+    "CanvasContent1",
+    "Description",
+    "name",
+    "Title",
+    "webUrl",
+    "category",
+    "lastModifiedDateTime",
+    "summary",
+    "content_hash",
+    "simhash",
+]
+
+
+class Hit:
+    """
+    Compact record for a retrieved search hit.
+
+    Holds only the fields used by summarization, prompt rendering and source
+    emission instead of the full `_source` dict a langchain `Document` carries.
+    """
+
+    __slots__ = (
+        "id",
+        "score",
+        "name",
+        "title",
+        "url",
+        "category",
+        "updated_at",
+        "summary",
+        "page_content",
+        "_content_hash",
+        "_simhash",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        score: float,
+        name: str,
+        page_content: str,
+        title: Optional[str] = None,
+        url: str = "",
+        category: str = "sharepoint",
+        updated_at: Optional[str] = None,
+        summary: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        simhash: Optional[int] = None,
+    ):
+        self.id = id
+        self.score = score
+        self.name = name
+        self.title = title
+        self.url = url
+        self.category = category
+        self.updated_at = updated_at
+        self.summary = summary
+        self.page_content = page_content
+        self._content_hash = content_hash
+        self._simhash = simhash
+
+    @classmethod
+    def from_es_hit(cls, hit: Dict[str, Any]) -> "Hit":
+        source = hit.get("_source", {})
+
+        return cls(
+            id=hit["_id"],
+            score=hit.get("_score") or 0,
+            name=source.get("name", "Unknown Document"),
+            page_content=page_content(source),
+            title=source.get("Title"),
+            url=source.get("webUrl", ""),
+            category=source.get("category", "sharepoint"),
+            updated_at=source.get("lastModifiedDateTime"),
+            summary=source.get("summary"),
+            content_hash=source.get("content_hash"),
+            # Stored as hex since ES has no unsigned 64-bit keyword-friendly type
+            simhash=int(source["simhash"], 16) if source.get("simhash") else None,
+        )
+
+    @property
+    def display_name(self) -> str:
+        """Prefer Title for SharePoint pages, then the file name."""
+        return self.title or self.name or "Unknown Document"
+
+    @property
+    def content_hash(self) -> str:
+        """Hash of the normalized content; indexed value when present, else computed once."""
+        if self._content_hash is None:
+            self._content_hash = text_hash(self.page_content)
+        return self._content_hash
+
+    @property
+    def has_simhash(self) -> bool:
+        """Whether a signature is already known (indexed), so reading `simhash` is free."""
+        return self._simhash is not None
+
+    @property
+    def simhash(self) -> int:
+        """64-bit SimHash of the content; indexed value when present, else computed once."""
+        if self._simhash is None:
+            self._simhash = simhash(self.page_content)
+        return self._simhash
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Document-style metadata so prompt templates can keep using doc.metadata.name."""
+        return {"_id": self.id, "_score": self.score, "name": self.name}
+
+    def __repr__(self) -> str:
+        return f"Hit(id={self.id!r}, score={self.score!r}, name={self.name!r})"
@@ -1,9 +1,32 @@
-from langchain_openai import ChatOpenAI
-from portkey_ai import createHeaders, PORTKEY_GATEWAY_URL
 import os
+import time
 import uuid
+import threading
 
 LLM_TYPE = os.getenv("LLM_TYPE", "openai")
+LOCAL_LLM_URL = os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8001/v1")
+# Seconds a health check result is reused before the providers are asked again
+LLM_HEALTH_TTL = float(os.getenv("LLM_HEALTH_TTL", "60"))
+
+# Per-role model settings. Each role can point at its own provider and model so
+# cheap fast models can serve condense/summary while the large model answers.
+LLM_ROLES = {
+    "condense": {
+        "type": os.getenv("LLM_CONDENSE_TYPE", LLM_TYPE),
+        "model": os.getenv("LLM_CONDENSE_MODEL", "gpt-4.1"),
+        "streaming": True,
+    },
+    "answer": {
+        "type": os.getenv("LLM_ANSWER_TYPE", LLM_TYPE),
+        "model": os.getenv("LLM_ANSWER_MODEL", "gpt-4.1"),
+        "streaming": True,
+    },
+    "summary": {
+        "type": os.getenv("LLM_SUMMARY_TYPE", LLM_TYPE),
+        "model": os.getenv("LLM_SUMMARY_MODEL", "gpt-4.1-mini"),
+        "streaming": False,
+    },
+}
 
 config = {
     "cache": {
@@ -14,65 +37,158 @@ config = {
 	},
 }
 
-portkey_headers = createHeaders(api_key= os.getenv("PORTKEY_API_KEY"),
-                                provider="openai",
-                                metadata={"_user": "mx2-ccc"},
-                                config=config
-                                )
+def init_openai_chat(temperature, model='gpt-4.1', streaming=True):
+    # Imported here so the API process only pays for langchain/portkey on first use
+    from langchain_openai import ChatOpenAI
+    from portkey_ai import createHeaders, PORTKEY_GATEWAY_URL
 
-def init_openai_chat(temperature):
+    portkey_headers = createHeaders(api_key= os.getenv("PORTKEY_API_KEY"),
+                                    provider="openai",
+                                    metadata={"_user": "mx2-ccc"},
+                                    config=config
+                                    )
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     return ChatOpenAI(
-        openai_api_key=OPENAI_API_KEY, streaming=True, temperature=temperature, model='gpt-4.1',
-        base_url=PORTKEY_GATEWAY_URL, default_headers=portkey_headers, stream_usage=True
+        openai_api_key=OPENAI_API_KEY, streaming=streaming, temperature=temperature, model=model,
+        base_url=PORTKEY_GATEWAY_URL, default_headers=portkey_headers, stream_usage=streaming
     )
 
-def init_openai_config_chat(temperature):
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+def init_local_chat(temperature, model='local', streaming=True):
+    """OpenAI-compatible stand-in (see local_llm.py) for tests and offline development."""
+    from langchain_openai import ChatOpenAI
+
     return ChatOpenAI(
-        openai_api_key=OPENAI_API_KEY, streaming=False, temperature=temperature, model='gpt-4.1',
-        base_url=PORTKEY_GATEWAY_URL, default_headers=portkey_headers
+        openai_api_key="local", streaming=streaming, temperature=temperature, model=model,
+        base_url=LOCAL_LLM_URL, stream_usage=streaming
     )
 
 MAP_LLM_TYPE_TO_CHAT_MODEL = {
     "openai": init_openai_chat,
+    "local": init_local_chat,
 }
 
+# Clients are built once per (role, temperature, streaming) and reused so their
+# HTTP connection pools stay warm between requests
+_llm_cache = {}
+_llm_cache_lock = threading.Lock()
+
+
+def register_llm_provider(llm_type, factory):
+    """Register a chat model factory taking (temperature, model, streaming)."""
+    MAP_LLM_TYPE_TO_CHAT_MODEL[llm_type] = factory
+    with _llm_cache_lock:
+        _llm_cache.clear()
+
+
+def trace_headers(trace_id, span_name):
+    """Per-request Portkey tracing headers, sent alongside the shared client's defaults."""
+    return {
+        "x-portkey-trace-id": trace_id,
+        "x-portkey-span-name": span_name,
+    }
 
-def get_llm(temperature=0):
-    if not LLM_TYPE in MAP_LLM_TYPE_TO_CHAT_MODEL:
+
+def get_llm(temperature=0, role="answer", streaming=None, trace_id=None, span_name=None):
+    if role not in LLM_ROLES:
+        raise Exception(
+            "LLM role not found. Please use one of: "
+            + ", ".join(LLM_ROLES.keys())
+            + "."
+        )
+
+    llm_type = LLM_ROLES[role]["type"]
+    if not llm_type in MAP_LLM_TYPE_TO_CHAT_MODEL:
         raise Exception(
             "LLM type not found. Please set LLM_TYPE to one of: "
             + ", ".join(MAP_LLM_TYPE_TO_CHAT_MODEL.keys())
             + "."
         )
 
-    return MAP_LLM_TYPE_TO_CHAT_MODEL[LLM_TYPE](temperature=temperature)
+    if streaming is None:
+        streaming = LLM_ROLES[role]["streaming"]
+
+    key = (role, llm_type, temperature, streaming)
+    with _llm_cache_lock:
+        llm = _llm_cache.get(key)
+        if llm is None:
+            llm = MAP_LLM_TYPE_TO_CHAT_MODEL[llm_type](
+                temperature=temperature,
+                model=LLM_ROLES[role]["model"],
+                streaming=streaming,
+            )
+            _llm_cache[key] = llm
+
+    if trace_id and llm_type == "openai":
+        return llm.bind(extra_headers=trace_headers(trace_id, span_name or "LLM Generation"))
+    return llm
 
 def get_llm_with_trace_id(temperature=0):
     """Get LLM with custom trace ID for feedback tracking"""
     # Generate our own trace ID
     trace_id = str(uuid.uuid4())
-    
-    # Create headers with trace_id included
-    headers_with_trace = createHeaders(
-        api_key=os.getenv("PORTKEY_API_KEY"),
-        provider="openai",
-        metadata={"_user": "mx2-ccc"},
-        config=config,
+    llm = get_llm(
+        temperature=temperature,
+        role="answer",
         trace_id=trace_id,
         span_name="LLM Generation",
     )
-    
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    llm = ChatOpenAI(
-        openai_api_key=OPENAI_API_KEY,
-        streaming=True,
-        temperature=temperature,
-        model='gpt-4.1',
-        base_url=PORTKEY_GATEWAY_URL,
-        default_headers=headers_with_trace,
-        stream_usage=True
-    )
-    
     return llm, trace_id
+
+
+_health_cache = {}
+_health_cache_lock = threading.Lock()
+
+
+def ping_llm(role):
+    """
+    Build a role's client and list the provider's models over its connection pool.
+
+    Listing models checks reachability and credentials without paying for a
+    completion. Providers whose client has no OpenAI root client are only built.
+    """
+    llm = get_llm(role=role)
+    root_client = getattr(llm, "root_client", None)
+    if root_client is not None:
+        root_client.models.list()
+
+
+def check_llm_health(roles=None, max_age=None):
+    """
+    Check that the provider behind each role is reachable.
+
+    Args:
+        roles: Roles to check, defaults to all configured roles
+        max_age: Seconds a previous result may be reused, LLM_HEALTH_TTL by default
+
+    Returns:
+        Dict keyed by role with ok/type/model/latency_ms/error entries
+    """
+    max_age = LLM_HEALTH_TTL if max_age is None else max_age
+    results = {}
+    for role in roles or LLM_ROLES.keys():
+        with _health_cache_lock:
+            cached = _health_cache.get(role)
+        if cached and time.monotonic() - cached[0] < max_age:
+            results[role] = cached[1]
+            continue
+        settings = LLM_ROLES[role]
+        start = time.perf_counter()
+        try:
+            ping_llm(role)
+            result = {"ok": True, "error": None}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        result.update({
+            "type": settings["type"],
+            "model": settings["model"],
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        })
+        with _health_cache_lock:
+            _health_cache[role] = (time.monotonic(), result)
+        results[role] = result
+    return results
+
+
+def warm_up_llms():
+    """Build every role's client and open its connections ahead of the first request."""
+    return check_llm_health(max_age=0)
@@ -0,0 +1,149 @@
+"""
+OpenAI-compatible stand-in chat completion server for tests and offline development.
+
+Point a role at it with LLM_TYPE=local (or LLM_<ROLE>_TYPE=local) and LOCAL_LLM_URL.
+Latency can be shaped with LOCAL_LLM_TTFT_MS and LOCAL_LLM_TOKEN_MS.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import time
+import uuid
+
+LOCAL_LLM_HOST = os.getenv("LOCAL_LLM_HOST", "127.0.0.1")
+LOCAL_LLM_PORT = int(os.getenv("LOCAL_LLM_PORT", "8001"))
+LOCAL_LLM_RESPONSE = os.getenv(
+    "LOCAL_LLM_RESPONSE",
+    "This is a response from the local stand-in model.\n\nSOURCES: Local Stand-in",
+)
+LOCAL_LLM_TTFT_MS = float(os.getenv("LOCAL_LLM_TTFT_MS", "0"))
+LOCAL_LLM_TOKEN_MS = float(os.getenv("LOCAL_LLM_TOKEN_MS", "0"))
+
+
+def split_tokens(text):
+    """Split text into word-sized chunks that keep their trailing whitespace."""
+    tokens = []
+    current = ""
+    for char in text:
+        current += char
+        if char.isspace():
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+def usage_for(messages, completion):
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    completion_tokens = len(completion.split())
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class LocalLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "local", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        messages = request.get("messages", [])
+        model = request.get("model", "local")
+        completion = LOCAL_LLM_RESPONSE
+        if request.get("max_tokens"):
+            completion = " ".join(completion.split()[:request["max_tokens"]])
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        time.sleep(LOCAL_LLM_TTFT_MS / 1000)
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": completion},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage_for(messages, completion),
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send_chunk(payload):
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        try:
+            send_chunk(chunk({"role": "assistant", "content": ""}))
+            for token in split_tokens(completion):
+                send_chunk(chunk({"content": token}))
+                time.sleep(LOCAL_LLM_TOKEN_MS / 1000)
+            send_chunk(chunk({}, finish_reason="stop"))
+            if request.get("stream_options", {}).get("include_usage"):
+                usage_chunk = chunk({})
+                usage_chunk["choices"] = []
+                usage_chunk["usage"] = usage_for(messages, completion)
+                send_chunk(usage_chunk)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+
+def create_server(host=LOCAL_LLM_HOST, port=LOCAL_LLM_PORT):
+    return ThreadingHTTPServer((host, port), LocalLLMHandler)
+
+
+def serve(host=LOCAL_LLM_HOST, port=LOCAL_LLM_PORT):
+    server = create_server(host, port)
+    print(f"Local LLM stand-in listening on http://{host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,170 @@
+"""
+Answer prompt assembly without a template engine.
+
+The RAG prompt is a fixed header, one block per passage, the chat history and
+the question. The header and each passage block are rendered once and kept with
+their token counts; passage blocks are cached per document ID and
+`lastModifiedDateTime`. A prompt is then a list of ready segments joined once,
+so the passages are copied into the final string and nowhere else, and its token
+count is the sum of the segment counts.
+
+Produces the same text as `rag_template` / `rag_cached_template` rendered by Jinja.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+import os
+import sys
+import threading
+
+from templates import prompt
+from tokens import count_tokens
+
+# Rendered passage blocks kept in memory, bounded by count and by total characters
+PROMPT_PASSAGE_CACHE_SIZE = int(os.getenv("PROMPT_PASSAGE_CACHE_SIZE", "2048"))
+PROMPT_PASSAGE_CACHE_CHARS = int(os.getenv("PROMPT_PASSAGE_CACHE_CHARS", str(32 * 1024 * 1024)))
+# Larger blocks are rendered per prompt instead of cached
+PROMPT_PASSAGE_MAX_CACHED_CHARS = int(os.getenv("PROMPT_PASSAGE_MAX_CACHED_CHARS", str(256 * 1024)))
+
+
+class BuiltPrompt:
+    """
+    Prompt text with its token count.
+
+    Token counts are summed per segment, so they can differ by a few tokens from
+    encoding the joined text where a merge spans two segments.
+    """
+
+    __slots__ = ("text", "tokens", "segments")
+
+    def __init__(self, text: str, tokens: int, segments: int):
+        self.text = text
+        self.tokens = tokens
+        self.segments = segments
+
+    def __repr__(self) -> str:
+        return f"BuiltPrompt(tokens={self.tokens!r}, segments={self.segments!r}, chars={len(self.text)!r})"
+
+
+class PassageCache:
+    """
+    LRU cache of rendered passage blocks and their token counts.
+
+    Args:
+        max_size: Blocks kept at most
+        max_chars: Total characters kept at most
+        max_block_chars: Blocks longer than this are never cached
+    """
+
+    def __init__(
+        self,
+        max_size: int = PROMPT_PASSAGE_CACHE_SIZE,
+        max_chars: int = PROMPT_PASSAGE_CACHE_CHARS,
+        max_block_chars: int = PROMPT_PASSAGE_MAX_CACHED_CHARS,
+    ):
+        self.max_size = max_size
+        self.max_chars = max_chars
+        self.max_block_chars = min(max_block_chars, max_chars)
+        self._blocks = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(doc):
+        # Documents without a modification date are keyed by content instead
+        return doc.id, doc.updated_at or doc.content_hash
+
+    def get(self, doc):
+        """(block, tokens) for a hit, rendering and counting it on a miss."""
+        key = self.key(doc)
+        with self._lock:
+            entry = self._blocks.get(key)
+            if entry is not None:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        block = prompt.rag_passage.format(name=doc.name, page_content=doc.page_content)
+        entry = (block, count_tokens(block))
+        if len(block) > self.max_block_chars:
+            return entry
+        with self._lock:
+            previous = self._blocks.pop(key, None)
+            if previous is not None:
+                self._chars -= len(previous[0])
+            self._blocks[key] = entry
+            self._chars += len(block)
+            while len(self._blocks) > self.max_size or self._chars > self.max_chars:
+                _, (evicted, _) = self._blocks.popitem(last=False)
+                self._chars -= len(evicted)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self._chars = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._blocks),
+                "chars": self._chars,
+                # Memory held by the cached strings, which can be up to 4 bytes per character
+                "bytes": sum(sys.getsizeof(block) for block, _ in self._blocks.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+passage_cache = PassageCache()
+
+
+@lru_cache(maxsize=None)
+def _segment(text: str):
+    """Static segment with its token count, counted once."""
+    return text, count_tokens(text)
+
+
+def _turn(dialogue_turn) -> str:
+    if dialogue_turn.type == "human":
+        return f"Question: {dialogue_turn.content}\n"
+    if dialogue_turn.type == "ai":
+        return f"Response: {dialogue_turn.content}\n"
+    return "\n"
+
+
+def build_rag_prompt(question: str, docs, chat_history, cache_layout: bool = True, cache: PassageCache = None) -> BuiltPrompt:
+    """
+    Assemble the answer prompt.
+
+    Args:
+        question: The user's question
+        docs: Hits in the order they should appear
+        chat_history: Previous messages with `type` and `content`
+        cache_layout: Question last (rag_cached_template) instead of first (rag_template)
+        cache: Passage cache to use instead of the module-level one
+
+    Returns:
+        BuiltPrompt: Prompt text and token count
+    """
+    cache = passage_cache if cache is None else cache
+    segments = [_segment(prompt.rag_instructions)]
+    if not cache_layout:
+        user_question = f"User question: {question}\n\n"
+        segments.append((user_question, count_tokens(user_question)))
+    segments.append(_segment(prompt.rag_example))
+    segments.extend(cache.get(doc) for doc in docs)
+    segments.append(_segment(prompt.rag_history_header))
+    for dialogue_turn in chat_history:
+        turn = _turn(dialogue_turn)
+        segments.append((turn, count_tokens(turn)))
+    tail = f"Question: {question}\nResponse:"
+    segments.append((tail, count_tokens(tail)))
+
+    return BuiltPrompt(
+        "".join(text for text, _ in segments),
+        sum(tokens for _, tokens in segments),
+        len(segments),
+    )
@@ -0,0 +1,130 @@
+"""
+Routing of navigational queries around the LLM.
+
+Queries like "NDA template" ask for a document, not an answer. They are
+recognised from a cheap search over `name` and `Title` only: the query must be
+short and not phrased as a question, the best title must contain every query
+term, and its score must be strong and well clear of the rest (the same
+threshold and score-gap bands as the heuristic confidences). Matching documents
+are then returned as sources right away, without condensing, generation or
+summaries.
+"""
+import os
+import re
+import threading
+
+from elasticsearch_client import get_elasticsearch_client
+from extractive import terms
+from hits import Hit, HIT_SOURCE_FIELDS
+from scoring import heuristic_confidences
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+# Longer queries are always answered by the LLM
+NAVIGATIONAL_MAX_TERMS = int(os.getenv("NAVIGATIONAL_MAX_TERMS", "6"))
+# Share of query terms the title must contain
+NAVIGATIONAL_MIN_COVERAGE = float(os.getenv("NAVIGATIONAL_MIN_COVERAGE", "1.0"))
+# Heuristic confidence (percent) a title match needs to be returned
+NAVIGATIONAL_MIN_CONFIDENCE = int(os.getenv("NAVIGATIONAL_MIN_CONFIDENCE", "80"))
+NAVIGATIONAL_MAX_RESULTS = int(os.getenv("NAVIGATIONAL_MAX_RESULTS", "5"))
+
+_question_start = re.compile(
+    r"^(who|what|when|where|why|how|which|can|could|should|would|will|do|does|did|is|are|was|were|am|may|must|"
+    r"explain|describe|tell|summari[sz]e|compare|list)\b",
+    re.I,
+)
+
+_stats_lock = threading.Lock()
+_stats = {"checked": 0, "routed": 0}
+
+
+def looks_navigational(question: str) -> bool:
+    """Cheap pre-check before any search: a short lookup, not a question."""
+    question = question.strip()
+    if not question or "?" in question or _question_start.match(question):
+        return False
+    return 0 < len(terms(question)) <= NAVIGATIONAL_MAX_TERMS
+
+
+def title_query(question: str, size: int = None) -> dict:
+    """Search body matching only document names and titles."""
+    size = NAVIGATIONAL_MAX_RESULTS + 1 if size is None else size
+    return {
+        "size": size,
+        "_source": HIT_SOURCE_FIELDS,
+        "query": {
+            "bool": {
+                "should": [
+                    {"match_phrase": {"Title": {"query": question, "boost": 3.0}}},
+                    {"match_phrase": {"name": {"query": question, "boost": 3.0}}},
+                    {"match": {"Title": {"query": question, "operator": "and", "boost": 2.0}}},
+                    # Splits file names like NDA_Template-v2.docx into words
+                    {"match": {"name.delimiter": {"query": question, "operator": "and", "boost": 2.0}}},
+                    {"match": {"Title.prefix": {"query": question, "operator": "and"}}},
+                    {"match": {"name.prefix": {"query": question, "operator": "and"}}},
+                ],
+                "minimum_should_match": 1,
+            }
+        },
+    }
+
+
+def title_coverage(question: str, hit) -> float:
+    """Share of the query terms that appear in the hit's title or file name."""
+    query_terms = set(terms(question))
+    if not query_terms:
+        return 0.0
+    title_terms = set(terms(f"{hit.title or ''} {re.sub(r'[_.-]+', ' ', hit.name or '')}"))
+    return len(query_terms & title_terms) / len(query_terms)
+
+
+def navigational_hits(question: str, hits: list) -> list:
+    """
+    Hits to return directly for a navigational query.
+
+    Args:
+        question: The user's query
+        hits: Results of `title_query` in rank order
+
+    Returns:
+        list: Matching hits, or an empty list when the query should go to the LLM
+    """
+    if not hits:
+        return []
+    confidences = heuristic_confidences([hit.score for hit in hits])
+    matches = [
+        hit
+        for hit, confidence in zip(hits, confidences)
+        if confidence >= NAVIGATIONAL_MIN_CONFIDENCE and title_coverage(question, hit) >= NAVIGATIONAL_MIN_COVERAGE
+    ]
+    # The best title match must be the best hit, not a weaker title further down
+    if not matches or matches[0] is not hits[0]:
+        return []
+    return matches[:NAVIGATIONAL_MAX_RESULTS]
+
+
+def route_navigational(index: str, question: str) -> list:
+    """
+    Documents answering a navigational query, or an empty list to use the LLM.
+
+    Args:
+        index: Index or alias to search
+        question: The user's query, before condensing
+
+    Returns:
+        list: Hit objects to send as sources
+    """
+    if not INTENT_ROUTER_ENABLED or not looks_navigational(question):
+        return []
+    with _stats_lock:
+        _stats["checked"] += 1
+    response = get_elasticsearch_client().search(index=index, body=title_query(question))
+    matches = navigational_hits(question, [Hit.from_es_hit(hit) for hit in response["hits"]["hits"]])
+    if matches:
+        with _stats_lock:
+            _stats["routed"] += 1
+    return matches
+
+
+def router_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,356 @@
+"""
+Confidence scores for retrieved hits.
+
+Scores are computed for the whole batch of hits at once. Without a calibration
+file, the BM25 thresholds heuristic is used. A calibrator fitted offline from
+feedback (isotonic regression or Platt scaling) maps raw scores to the
+probability that a hit is useful, so low-confidence hits can be dropped before
+they cost a summary and prompt tokens.
+"""
+from functools import lru_cache
+import json
+import os
+
+import numpy as np
+
+# JSON written by `flask fit-confidence`; unset uses the heuristic below
+CONFIDENCE_CALIBRATION_FILE = os.getenv("CONFIDENCE_CALIBRATION_FILE")
+
+# Relevance thresholds based on typical Elasticsearch scores
+HIGH_RELEVANCE_THRESHOLD = 10.0   # Very relevant
+MED_RELEVANCE_THRESHOLD = 5.0     # Somewhat relevant
+LOW_RELEVANCE_THRESHOLD = 2.0     # Minimally relevant
+# Position decay per rank (less aggressive for already lower confidence)
+POSITION_DECAY = 0.08
+MIN_CONFIDENCE = 10
+MAX_CONFIDENCE = 100
+
+
+def heuristic_confidences(scores) -> np.ndarray:
+    """
+    Threshold-based confidences in percent for hits in rank order.
+
+    Absolute score picks a band (80-100, 50-80, 30-50 or 10-30), and the score
+    relative to the best hit, decayed by position, places the hit within it.
+
+    Args:
+        scores: Raw ES scores in rank order
+
+    Returns:
+        np.ndarray: Integer confidences between MIN_CONFIDENCE and MAX_CONFIDENCE
+    """
+    scores = np.asarray(scores, dtype=float)
+    if scores.size == 0:
+        return np.zeros(0, dtype=int)
+
+    bands = [
+        scores >= HIGH_RELEVANCE_THRESHOLD,
+        scores >= MED_RELEVANCE_THRESHOLD,
+        scores >= LOW_RELEVANCE_THRESHOLD,
+    ]
+    base = np.select(bands, [80, 50, 30], default=10)
+    width = np.select(bands, [20, 30, 20], default=20)
+
+    max_score = scores.max()
+    relative = np.zeros_like(scores)
+    if max_score > 0:
+        positive = scores > 0
+        relative[positive] = np.sqrt(scores[positive] / max_score)
+    position = 1.0 - np.arange(scores.size) * POSITION_DECAY
+
+    confidences = np.floor(base + relative * position * width).astype(int)
+    return np.clip(confidences, MIN_CONFIDENCE, MAX_CONFIDENCE)
+
+
+class PlattCalibrator:
+    """Logistic mapping `p = 1 / (1 + exp(-(a * score + b)))`."""
+
+    method = "platt"
+
+    def __init__(self, a: float, b: float):
+        self.a = a
+        self.b = b
+
+    @classmethod
+    def fit(cls, scores, labels, iterations: int = 100) -> "PlattCalibrator":
+        """
+        Fit with Newton's method on Platt's smoothed targets.
+
+        Args:
+            scores: Raw ES scores
+            labels: 1 for useful hits, 0 otherwise
+            iterations: Maximum Newton steps
+
+        Returns:
+            PlattCalibrator: Fitted calibrator
+        """
+        scores = np.asarray(scores, dtype=float)
+        labels = np.asarray(labels, dtype=float)
+        positives = labels.sum()
+        negatives = labels.size - positives
+        # Smoothed targets keep a perfectly separable sample from diverging
+        targets = np.where(labels > 0, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+        features = np.column_stack([scores, np.ones_like(scores)])
+        weights = np.array([0.0, np.log((positives + 1) / (negatives + 1))])
+        for _ in range(iterations):
+            probabilities = 1 / (1 + np.exp(-features @ weights))
+            gradient = features.T @ (probabilities - targets)
+            hessian = features.T @ (features * (probabilities * (1 - probabilities))[:, None])
+            step = np.linalg.solve(hessian + 1e-9 * np.eye(2), gradient)
+            weights -= step
+            if np.abs(step).max() < 1e-8:
+                break
+        return cls(float(weights[0]), float(weights[1]))
+
+    def predict(self, scores) -> np.ndarray:
+        scores = np.asarray(scores, dtype=float)
+        return 1 / (1 + np.exp(-(self.a * scores + self.b)))
+
+    def to_dict(self) -> dict:
+        return {"method": self.method, "a": self.a, "b": self.b}
+
+
+class IsotonicCalibrator:
+    """Monotone step mapping from score to probability, interpolated between steps."""
+
+    method = "isotonic"
+
+    def __init__(self, thresholds, values):
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+
+    @classmethod
+    def fit(cls, scores, labels) -> "IsotonicCalibrator":
+        """
+        Fit with pool-adjacent-violators.
+
+        Args:
+            scores: Raw ES scores
+            labels: 1 for useful hits, 0 otherwise
+
+        Returns:
+            IsotonicCalibrator: Fitted calibrator
+        """
+        order = np.argsort(scores, kind="mergesort")
+        scores = np.asarray(scores, dtype=float)[order]
+        labels = np.asarray(labels, dtype=float)[order]
+
+        # Each block holds (mean score, mean label, weight); merge while labels decrease
+        blocks = []
+        for score, label in zip(scores, labels):
+            blocks.append([score, label, 1.0])
+            while len(blocks) > 1 and blocks[-2][1] >= blocks[-1][1]:
+                score_b, label_b, weight_b = blocks.pop()
+                score_a, label_a, weight_a = blocks[-1]
+                weight = weight_a + weight_b
+                blocks[-1] = [
+                    (score_a * weight_a + score_b * weight_b) / weight,
+                    (label_a * weight_a + label_b * weight_b) / weight,
+                    weight,
+                ]
+        thresholds, values, _ = zip(*blocks) if blocks else ((), (), ())
+        return cls(thresholds, values)
+
+    def predict(self, scores) -> np.ndarray:
+        scores = np.asarray(scores, dtype=float)
+        if self.thresholds.size == 0:
+            return np.full(scores.shape, 0.5)
+        return np.interp(scores, self.thresholds, self.values)
+
+    def to_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "thresholds": self.thresholds.tolist(),
+            "values": self.values.tolist(),
+        }
+
+
+CALIBRATORS = {
+    PlattCalibrator.method: PlattCalibrator,
+    IsotonicCalibrator.method: IsotonicCalibrator,
+}
+
+
+def calibrator_from_dict(data: dict):
+    method = data.get("method")
+    if method == PlattCalibrator.method:
+        return PlattCalibrator(data["a"], data["b"])
+    if method == IsotonicCalibrator.method:
+        return IsotonicCalibrator(data["thresholds"], data["values"])
+    raise ValueError(f"Unknown calibration method: {method}")
+
+
+def fit_calibrator(scores, labels, method: str = "isotonic"):
+    """
+    Fit a calibrator from labelled hit scores.
+
+    Args:
+        scores: Raw ES scores
+        labels: 1 for useful hits, 0 otherwise
+        method: "isotonic" or "platt"
+
+    Returns:
+        Fitted calibrator
+    """
+    if method not in CALIBRATORS:
+        raise ValueError(f"Unknown calibration method: {method}")
+    if len(scores) == 0:
+        raise ValueError("No labelled scores to fit a calibrator from")
+    return CALIBRATORS[method].fit(scores, labels)
+
+
+def load_feedback_samples(path: str):
+    """
+    Read labelled scores from a JSONL feedback log.
+
+    Lines with a `score` and either a `label` (0/1) or a feedback `value`
+    (positive for 👍, negative for 👎) are used directly. The feedback log written
+    by the API is joined by trace id instead: every hit of a `retrieval` record
+    takes the label of the last `feedback` record for that trace.
+
+    Returns:
+        tuple: (scores, labels) arrays
+    """
+    scores, labels = [], []
+    retrievals, votes = {}, {}
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("type") == "retrieval":
+                retrievals[record.get("trace_id")] = record.get("hits") or []
+                continue
+            if record.get("type") == "feedback":
+                votes[record.get("trace_id")] = record.get("value")
+                continue
+            if record.get("score") is None:
+                continue
+            label = record.get("label")
+            if label is None:
+                if record.get("value") is None:
+                    continue
+                label = 1 if record["value"] > 0 else 0
+            scores.append(float(record["score"]))
+            labels.append(int(label))
+
+    for trace_id, value in votes.items():
+        if value is None:
+            continue
+        for hit in retrievals.get(trace_id, []):
+            scores.append(float(hit["score"]))
+            labels.append(1 if value > 0 else 0)
+    return np.array(scores), np.array(labels)
+
+
+class ConfidenceScorer:
+    """
+    Batch confidence scoring, calibrated when a calibrator is available.
+
+    Args:
+        calibrator: Fitted PlattCalibrator or IsotonicCalibrator, or None for the heuristic
+    """
+
+    def __init__(self, calibrator=None):
+        self.calibrator = calibrator
+
+    @classmethod
+    def from_file(cls, path=None) -> "ConfidenceScorer":
+        if not path:
+            return cls()
+        with open(path, encoding="utf-8") as handle:
+            return cls(calibrator_from_dict(json.load(handle)))
+
+    @property
+    def calibrated(self) -> bool:
+        return self.calibrator is not None
+
+    def probabilities(self, scores) -> np.ndarray:
+        """Probability in [0, 1] that each hit is useful."""
+        if self.calibrator is None:
+            return heuristic_confidences(scores) / 100.0
+        return np.clip(self.calibrator.predict(scores), 0.0, 1.0)
+
+    def confidences(self, scores) -> list:
+        """Confidences in percent, as sent with each source."""
+        if self.calibrator is None:
+            return heuristic_confidences(scores).tolist()
+        return np.rint(self.probabilities(scores) * 100).astype(int).tolist()
+
+
+@lru_cache(maxsize=None)
+def get_confidence_scorer() -> ConfidenceScorer:
+    """Scorer for CONFIDENCE_CALIBRATION_FILE, loaded on first use."""
+    return ConfidenceScorer.from_file(CONFIDENCE_CALIBRATION_FILE)
+
+
+PRUNE_ENABLED = os.getenv("PRUNE_ENABLED", "true").lower() == "true"
+# Hits scoring below this BM25 score are dropped
+PRUNE_MIN_SCORE = float(os.getenv("PRUNE_MIN_SCORE", str(LOW_RELEVANCE_THRESHOLD)))
+# Hits scoring below this fraction of the top score are dropped
+PRUNE_RELATIVE_SCORE = float(os.getenv("PRUNE_RELATIVE_SCORE", "0.2"))
+# Hits whose confidence probability is below this are dropped; 0 disables
+PRUNE_MIN_CONFIDENCE = float(os.getenv("PRUNE_MIN_CONFIDENCE", "0"))
+# Always keep at least this many hits (the best ones), and never more than the max
+PRUNE_MIN_DOCS = int(os.getenv("PRUNE_MIN_DOCS", "1"))
+PRUNE_MAX_DOCS = int(os.getenv("PRUNE_MAX_DOCS", "5"))
+
+
+def prune_hits(
+    hits,
+    probabilities=None,
+    min_score=None,
+    relative_score=None,
+    min_confidence=None,
+    min_docs=None,
+    max_docs=None,
+):
+    """
+    Drop weak hits before they are summarized and put into the prompt.
+
+    Args:
+        hits: Hit records in rank order
+        probabilities: Per-hit confidence probabilities, required for min_confidence
+        min_score: PRUNE_MIN_SCORE override
+        relative_score: PRUNE_RELATIVE_SCORE override
+        min_confidence: PRUNE_MIN_CONFIDENCE override
+        min_docs: PRUNE_MIN_DOCS override
+        max_docs: PRUNE_MAX_DOCS override
+
+    Returns:
+        tuple: (kept hits in rank order, list of (pruned hit, reason))
+    """
+    min_score = PRUNE_MIN_SCORE if min_score is None else min_score
+    relative_score = PRUNE_RELATIVE_SCORE if relative_score is None else relative_score
+    min_confidence = PRUNE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    min_docs = PRUNE_MIN_DOCS if min_docs is None else min_docs
+    max_docs = PRUNE_MAX_DOCS if max_docs is None else max_docs
+    if not hits:
+        return [], []
+
+    scores = np.array([hit.score for hit in hits], dtype=float)
+    reasons = np.full(len(hits), "", dtype=object)
+    if min_confidence > 0 and probabilities is not None:
+        reasons[np.asarray(probabilities) < min_confidence] = f"confidence < {min_confidence:g}"
+    cutoff = relative_score * scores.max()
+    reasons[scores < cutoff] = f"score < {relative_score:g} x top score"
+    reasons[scores < min_score] = f"score < {min_score:g}"
+
+    keep = reasons == ""
+    if keep.sum() < min_docs:
+        # Restore the best-scoring pruned hits so there is always something to answer from
+        for i in np.argsort(-scores, kind="mergesort"):
+            if keep.sum() >= min_docs:
+                break
+            if not keep[i]:
+                keep[i] = True
+                reasons[i] = ""
+    for i in np.flatnonzero(keep)[max_docs:]:
+        keep[i] = False
+        reasons[i] = f"over max {max_docs} docs"
+
+    kept = [hit for hit, kept_hit in zip(hits, keep) if kept_hit]
+    pruned = [(hit, reason) for hit, kept_hit, reason in zip(hits, keep, reasons) if not kept_hit]
+    return kept, pruned
@@ -0,0 +1,164 @@
+"""
+Document search without the LLM, for GET /api/search.
+
+Runs the chat retrieval query (`bm25_query`) with highlights and pages through
+the results with `search_after` inside a point in time, so later pages see the
+same index snapshot and no deep `from` offsets are needed. The PIT id and the
+last sort values travel in an opaque cursor. Each page fetches one extra hit to
+know whether another page exists; the PIT is closed as soon as one doesn't, or
+when the search that opened it fails.
+"""
+import base64
+import binascii
+import json
+import os
+
+from chat import INDEX, bm25_query
+from elasticsearch_client import get_elasticsearch_client
+from hits import Hit
+
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "10"))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "50"))
+# How long a point in time stays open between page requests
+SEARCH_PIT_KEEP_ALIVE = os.getenv("SEARCH_PIT_KEEP_ALIVE", "30s")
+
+# Listing fields only; passages come back as highlights instead of full bodies
+SEARCH_SOURCE_FIELDS = ["name", "Title", "webUrl", "category", "lastModifiedDateTime", "summary"]
+HIGHLIGHT_FIELDS = ["body", "summary", "Description", "CanvasContent1", "Title"]
+
+
+class CursorExpired(Exception):
+    """The point in time behind a cursor was closed or timed out."""
+
+
+def encode_cursor(pit_id: str, search_after: list) -> str:
+    payload = json.dumps({"pit": pit_id, "after": search_after}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """(pit_id, search_after) from a cursor; ValueError when it's malformed."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return payload["pit"], payload["after"]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid search cursor")
+
+
+def search_body(query: str, size: int, pit_id: str, search_after: list = None) -> dict:
+    """
+    Paginated search request built from the chat retrieval query.
+
+    The rescore phase is dropped: ES only allows it when sorting by score alone,
+    and `search_after` needs the `_shard_doc` tiebreaker.
+
+    Args:
+        query: Search text
+        size: Hits to fetch
+        pit_id: Point in time to search
+        search_after: Sort values of the previous page's last hit
+
+    Returns:
+        dict: ES search body
+    """
+    body = bm25_query(query)
+    body.pop("rescore", None)
+    body.update({
+        "size": size,
+        "_source": SEARCH_SOURCE_FIELDS,
+        "pit": {"id": pit_id, "keep_alive": SEARCH_PIT_KEEP_ALIVE},
+        "sort": [{"_score": "desc"}, {"_shard_doc": "asc"}],
+        # Totals only matter for the first page
+        "track_total_hits": 1000 if search_after is None else False,
+        "highlight": {
+            "fields": {field: {} for field in HIGHLIGHT_FIELDS},
+            "fragment_size": 160,
+            "number_of_fragments": 2,
+            "no_match_size": 160,
+            "pre_tags": ["<mark>"],
+            "post_tags": ["</mark>"],
+        },
+    })
+    if search_after is not None:
+        body["search_after"] = search_after
+    return body
+
+
+def format_result(hit: dict) -> dict:
+    doc = Hit.from_es_hit(hit)
+    highlight = hit.get("highlight", {})
+    return {
+        "id": doc.id,
+        "name": doc.display_name,
+        "url": doc.url,
+        "category": doc.category,
+        "updated_at": doc.updated_at,
+        "score": doc.score,
+        "summary": doc.summary,
+        # Body passages first, then whichever other field matched
+        "highlights": [fragment for field in HIGHLIGHT_FIELDS for fragment in highlight.get(field, [])][:3],
+    }
+
+
+def close_point_in_time(client, pit_id: str):
+    try:
+        client.close_point_in_time(id=pit_id)
+    except Exception:
+        pass  # Expires on its own after SEARCH_PIT_KEEP_ALIVE
+
+
+def search_documents(query: str, size: int = None, cursor: str = None) -> dict:
+    """
+    One page of search results.
+
+    Args:
+        query: Search text
+        size: Hits per page, capped at SEARCH_MAX_PAGE_SIZE
+        cursor: Cursor returned with the previous page, None for the first page
+
+    Returns:
+        dict: `results`, `cursor` for the next page (None on the last page),
+        `total` on the first page and ES `took` in milliseconds
+
+    Raises:
+        ValueError: Malformed cursor
+        CursorExpired: The cursor's point in time no longer exists
+    """
+    from elasticsearch import NotFoundError
+
+    size = min(max(1, size or SEARCH_PAGE_SIZE), SEARCH_MAX_PAGE_SIZE)
+    client = get_elasticsearch_client()
+    if cursor:
+        pit_id, search_after = decode_cursor(cursor)
+    else:
+        pit_id = client.open_point_in_time(index=INDEX, keep_alive=SEARCH_PIT_KEEP_ALIVE)["id"]
+        search_after = None
+
+    try:
+        response = client.search(body=search_body(query, size + 1, pit_id, search_after))
+    except Exception as e:
+        if cursor is None:
+            # Nobody else holds the PIT this call opened
+            close_point_in_time(client, pit_id)
+        elif isinstance(e, NotFoundError):
+            raise CursorExpired("Search cursor expired")
+        # A cursor's PIT stays open so the client can retry the page
+        raise
+
+    hits = response["hits"]["hits"][:size]
+    # ES may hand back a new PIT id; later pages must use it
+    pit_id = response.get("pit_id", pit_id)
+    next_cursor = None
+    if len(response["hits"]["hits"]) > size:
+        next_cursor = encode_cursor(pit_id, hits[-1]["sort"])
+    else:
+        close_point_in_time(client, pit_id)
+
+    page = {
+        "results": [format_result(hit) for hit in hits],
+        "cursor": next_cursor,
+        "took": response.get("took"),
+    }
+    if search_after is None:
+        page["total"] = response["hits"].get("total", {}).get("value")
+    return page
@@ -0,0 +1,35 @@
+"""
+Process lifecycle state shared by the production server hooks and the API.
+"""
+import logging
+import signal
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Set once the worker has finished warming up and can take traffic
+ready = threading.Event()
+# Set when SIGTERM arrives; readiness turns false while open streams finish
+draining = threading.Event()
+
+
+def begin_drain(*_):
+    if not draining.is_set():
+        logger.info("Draining: refusing new traffic and letting open streams finish")
+    draining.set()
+
+
+def install_drain_handler(sig=signal.SIGTERM):
+    """Mark the process as draining on `sig`, then run the existing handler."""
+    previous = signal.getsignal(sig)
+
+    def handler(signum, frame):
+        begin_drain()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(sig, handler)
+
+
+def is_ready():
+    return ready.is_set() and not draining.is_set()
@@ -0,0 +1,279 @@
+"""
+Typeahead suggestions over document names and titles, for GET /api/suggest.
+
+Suggestions are served from memory. Every word-start of every title and file
+name is a key in one sorted array, so a prefix lookup is a binary search plus a
+short scan with no cluster round trip. The array is filled in the background
+from Elasticsearch, then updated every SUGGEST_REFRESH_INTERVAL seconds from
+documents modified since the last update, and fully rebuilt every
+SUGGEST_REBUILD_INTERVAL seconds to drop deleted documents. Until the first load
+finishes, or when nothing in memory matches, the `.prefix` subfields of `name`
+and `Title` are queried instead.
+"""
+from bisect import bisect_left
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from elasticsearch_client import get_elasticsearch_client
+
+logger = logging.getLogger(__name__)
+
+INDEX = os.getenv("ES_INDEX", "ccc-db")
+SUGGEST_ENABLED = os.getenv("SUGGEST_ENABLED", "true").lower() == "true"
+SUGGEST_SIZE = int(os.getenv("SUGGEST_SIZE", "8"))
+SUGGEST_REFRESH_INTERVAL = float(os.getenv("SUGGEST_REFRESH_INTERVAL", "60"))
+SUGGEST_REBUILD_INTERVAL = float(os.getenv("SUGGEST_REBUILD_INTERVAL", "3600"))
+# Shortest prefix that is looked up
+SUGGEST_MIN_CHARS = int(os.getenv("SUGGEST_MIN_CHARS", "2"))
+SUGGEST_MAX_SIZE = 20
+# Prefixes up to this length match too many keys to rank per keystroke, so their
+# suggestions are ranked once when the index is built
+PRECOMPUTED_PREFIX_CHARS = 3
+SUGGEST_SOURCE_FIELDS = ["name", "Title", "webUrl", "lastModifiedDateTime"]
+
+_non_word = re.compile(r"[\W_]+")
+_extension = re.compile(r"\.[A-Za-z0-9]{1,5}$")
+
+
+def normalize(text: str) -> str:
+    """Lowercased, accent-free words separated by single spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _non_word.sub(" ", text.lower()).strip()
+
+
+def suggestion_entry(doc_id: str, source: dict) -> dict:
+    """Suggestion shown for a document: its Title, else its file name without extension."""
+    name = source.get("name") or ""
+    return {
+        "id": doc_id,
+        "text": source.get("Title") or _extension.sub("", name) or doc_id,
+        "name": name,
+        "url": source.get("webUrl", ""),
+        "updated_at": source.get("lastModifiedDateTime") or "",
+    }
+
+
+class SuggestionIndex:
+    """
+    Immutable prefix index over suggestion entries.
+
+    Keys are the normalized text from each word onwards ("nda template",
+    "template"), sorted, with a parallel array of (entry position, word offset).
+    Suggestions for prefixes of up to PRECOMPUTED_PREFIX_CHARS characters are
+    ranked at build time, like the per-node top results of a weighted FST.
+    """
+
+    def __init__(self, entries: dict):
+        self.entries = entries
+        texts = list(entries.values())
+        keyed = []
+        for position, entry in enumerate(texts):
+            for field in {normalize(entry["text"]), normalize(_extension.sub("", entry["name"]))}:
+                words = field.split(" ")
+                for offset in range(len(words)):
+                    if words[offset]:
+                        keyed.append((" ".join(words[offset:]), position, offset))
+        keyed.sort()
+        self._texts = texts
+        # Shorter, then more recently modified titles first
+        by_recency = sorted(range(len(texts)), key=lambda position: texts[position]["updated_at"], reverse=True)
+        by_rank = sorted(by_recency, key=lambda position: len(texts[position]["text"]))
+        self._rank_of = [0] * len(texts)
+        for rank, position in enumerate(by_rank):
+            self._rank_of[position] = rank
+        self._keys = [key for key, _, _ in keyed]
+        self._targets = [(position, offset) for _, position, offset in keyed]
+        short_prefixes = {key[:length] for key in self._keys for length in range(1, PRECOMPUTED_PREFIX_CHARS + 1)}
+        self._precomputed = {prefix: self._rank(prefix, SUGGEST_MAX_SIZE) for prefix in short_prefixes}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, prefix: str, size: int = None) -> list:
+        """
+        Entries with a word sequence starting with `prefix`.
+
+        Title starts rank before matches later in the title, then shorter and
+        more recently modified titles first.
+
+        Args:
+            prefix: Text typed so far
+            size: Maximum suggestions
+
+        Returns:
+            list: Suggestion entries
+        """
+        size = min(max(1, size or SUGGEST_SIZE), SUGGEST_MAX_SIZE)
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= PRECOMPUTED_PREFIX_CHARS:
+            return self._precomputed.get(prefix, [])[:size]
+        return self._rank(prefix, size)
+
+    def _rank(self, prefix: str, size: int) -> list:
+        rank_of = self._rank_of
+        candidates = set()
+        start = bisect_left(self._keys, prefix)
+        for index in range(start, len(self._keys)):
+            if not self._keys[index].startswith(prefix):
+                break
+            position, offset = self._targets[index]
+            candidates.add((offset > 0, rank_of[position], position))
+        # Room for entries dropped below as duplicates of a better one
+        ranked = heapq.nsmallest(size * 3, candidates)
+        suggestions = []
+        seen = set()
+        for _, _, position in ranked:
+            entry = self._texts[position]
+            if entry["text"].lower() in seen:
+                continue
+            seen.add(entry["text"].lower())
+            suggestions.append(entry)
+            if len(suggestions) >= size:
+                break
+        return suggestions
+
+
+class SuggestionService:
+    """
+    Keeps a SuggestionIndex loaded and refreshed by a background thread.
+
+    Args:
+        index: Index or alias to read documents from
+        client_factory: Returns the Elasticsearch client
+    """
+
+    def __init__(self, index=INDEX, client_factory=get_elasticsearch_client):
+        self.index = index
+        self.client_factory = client_factory
+        self.suggestions = None
+        self._watermark = None
+        self._last_rebuild = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._counts = {"memory": 0, "elasticsearch": 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._counts[name] += 1
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="suggest-refresh", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Suggestion refresh failed: %s", e)
+            time.sleep(SUGGEST_REFRESH_INTERVAL)
+
+    def _scan(self, query):
+        from elasticsearch import helpers
+
+        for hit in helpers.scan(
+            self.client_factory(), index=self.index, query={"query": query}, _source=SUGGEST_SOURCE_FIELDS
+        ):
+            yield hit["_id"], hit.get("_source", {})
+
+    def refresh(self, full: bool = None):
+        """
+        Load all documents, or only those modified since the last load.
+
+        Args:
+            full: Force (True) or skip (False) a full rebuild; by default one runs
+                on first load and every SUGGEST_REBUILD_INTERVAL seconds
+        """
+        if full is None:
+            full = self.suggestions is None or time.monotonic() - self._last_rebuild >= SUGGEST_REBUILD_INTERVAL
+        if full:
+            entries = {}
+            query = {"match_all": {}}
+        else:
+            entries = dict(self.suggestions.entries)
+            query = {"range": {"lastModifiedDateTime": {"gte": self._watermark}}} if self._watermark else {"match_all": {}}
+
+        watermark = self._watermark if not full else None
+        changed = 0
+        for doc_id, source in self._scan(query):
+            entry = suggestion_entry(doc_id, source)
+            # The watermark is inclusive, so the latest documents come back every time
+            if entries.get(doc_id) != entry:
+                entries[doc_id] = entry
+                changed += 1
+            modified = source.get("lastModifiedDateTime")
+            if modified and (watermark is None or modified > watermark):
+                watermark = modified
+
+        if full or changed:
+            # Swapped in whole, so lookups never see a partial update
+            self.suggestions = SuggestionIndex(entries)
+        self._watermark = watermark
+        if full:
+            self._last_rebuild = time.monotonic()
+        logger.debug("Suggestions %s: %s documents read, %s total", "rebuilt" if full else "updated", changed, len(entries))
+
+    def es_prefix_suggestions(self, prefix: str, size: int) -> list:
+        """Prefix match on the `.prefix` subfields, for when memory has nothing."""
+        response = self.client_factory().search(
+            index=self.index,
+            body={
+                "size": size,
+                "_source": SUGGEST_SOURCE_FIELDS,
+                "query": {
+                    "multi_match": {
+                        "query": prefix,
+                        "fields": ["Title.prefix^2", "name.prefix"],
+                        "operator": "and",
+                    }
+                },
+            },
+        )
+        return [suggestion_entry(hit["_id"], hit.get("_source", {})) for hit in response["hits"]["hits"]]
+
+    def suggest(self, prefix: str, size: int = None):
+        """
+        Suggestions for a typed prefix.
+
+        Args:
+            prefix: Text typed so far
+            size: Maximum suggestions, SUGGEST_SIZE by default and at most SUGGEST_MAX_SIZE
+
+        Returns:
+            tuple: (suggestion entries, "memory" or "elasticsearch")
+        """
+        size = min(max(1, size or SUGGEST_SIZE), SUGGEST_MAX_SIZE)
+        self._ensure_started()
+        if len(normalize(prefix)) < SUGGEST_MIN_CHARS:
+            return [], "memory"
+        suggestions = self.suggestions
+        if suggestions is not None:
+            matches = suggestions.lookup(prefix, size)
+            if matches:
+                self._count("memory")
+                return matches, "memory"
+        self._count("elasticsearch")
+        return self.es_prefix_suggestions(prefix, size), "elasticsearch"
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._counts)
+        stats["documents"] = len(self.suggestions) if self.suggestions is not None else None
+        stats["watermark"] = self._watermark
+        return stats
+
+
+suggestion_service = SuggestionService()
@@ -1,9 +1,11 @@
-rag_template = """Use the following context and chat history to answer the user's question.
+# Shared by the Jinja templates below and by prompt_builder, which assembles the
+# same text from these segments without a template engine
+rag_instructions = """Use the following context and chat history to answer the user's question.
 Each passage has a NAME which is the title of the document. After your answer, leave a blank line and then give the source name of the context you answered from. Put them in a comma separated list, prefixed with SOURCES:.
 
-User question: {{ question }}
+"""
 
-Example:
+rag_example = """Example:
 
 Question: What is the meaning of life?
 Response:
@@ -13,7 +15,21 @@ SOURCES: Hitchhiker's Guide to the Galaxy
 
 ----
 
-{% for doc in docs -%}
+"""
+
+rag_passage = """---
+NAME: {name}
+PASSAGE:
+{page_content}
+---
+
+"""
+
+rag_history_header = """----
+Chat history:
+"""
+
+_rag_body = """{% for doc in docs -%}
 ---
 NAME: {{ doc.metadata.name }}
 PASSAGE:
@@ -31,6 +47,13 @@ Question: {{ question }}
 Response:
 """
 
+rag_template = rag_instructions + "User question: {{ question }}\n\n" + rag_example + _rag_body
+
+# Same prompt ordered from most to least stable: instructions, passages (sorted by
+# the caller), chat history, then the question. Requests over the same documents
+# share a long prefix, so provider-side prompt caching applies.
+rag_cached_template = rag_instructions + rag_example + _rag_body
+
 condense_question_template = """
 Given the following conversation and a follow up question, rephrase the follow up question to be a standalone question, in its original language.
 
@@ -48,4 +71,34 @@ summary_template = """Create a concise and dense summary of the following docume
 {{ page_content }}
 
 Summary:
-"""
\ No newline at end of file
+"""
+
+continue_answer_template = """Your previous response was cut off. Continue it exactly where it stopped, without repeating any text already written and without any preamble. Keep the same format, including the SOURCES: line at the end.
+"""
+
+batch_summary_template = """Create a concise and dense summary of each of the following documents in 150 words.
+
+{% for doc in docs %}
+DOCUMENT ID: {{ doc.id }}
+{{ doc.page_content }}
+
+{% endfor %}
+Return only a JSON object that maps each DOCUMENT ID to its summary, with no other text.
+"""
+
+summary_chunk_template = """The following text is part {{ part }} of {{ parts }} of a longer document. Create a concise and dense summary of this part in 100 words, keeping names, dates, amounts and obligations:
+
+{{ page_content }}
+
+Summary:
+"""
+
+summary_reduce_template = """The following are summaries of consecutive parts of one document. Combine them into a concise and dense summary of the whole document in 150 words:
+
+{% for summary in summaries %}
+PART {{ loop.index }}:
+{{ summary }}
+
+{% endfor %}
+Summary:
+"""
@@ -0,0 +1,78 @@
+"""
+Token counting for prompt budgets.
+
+Uses tiktoken when its encoding can be loaded. tiktoken downloads encodings on
+first use, so air-gapped deployments without a cached copy (see
+TIKTOKEN_CACHE_DIR) fall back to a characters-per-token estimate instead of
+failing the request.
+"""
+from functools import lru_cache
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# gpt-4.1 models use o200k_base
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "o200k_base")
+# Rough average for English prose, used only when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding():
+    """tiktoken encoding for TOKEN_ENCODING, or None when it can't be loaded."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception as e:
+        logger.warning(f"tiktoken encoding {TOKEN_ENCODING} unavailable, estimating tokens: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """First `max_tokens` tokens of `text`."""
+    if not text or max_tokens <= 0:
+        return ""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def split_tokens(text: str, chunk_tokens: int, overlap_tokens: int = 0) -> list:
+    """
+    Split text into chunks of at most `chunk_tokens` tokens.
+
+    Args:
+        text: Text to split
+        chunk_tokens: Maximum tokens per chunk
+        overlap_tokens: Tokens repeated at the start of each following chunk
+
+    Returns:
+        list: Chunk texts in order
+    """
+    if not text:
+        return []
+    step = max(1, chunk_tokens - max(0, overlap_tokens))
+    encoding = get_encoding()
+    if encoding is None:
+        size, stride = chunk_tokens * CHARS_PER_TOKEN, step * CHARS_PER_TOKEN
+        return [text[start:start + size] for start in range(0, max(1, len(text) - size + stride), stride)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [
+        encoding.decode(tokens[start:start + chunk_tokens])
+        for start in range(0, max(1, len(tokens) - chunk_tokens + step), step)
+    ]
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Answer prompt assembly: Jinja rendering against prompt_builder.
+
+Renders the RAG prompt for synthetic hits and chat history with
+`NativeEnvironment` (how chat.py used to render `rag_template`), with a plain
+Jinja `Environment`, and with `build_rag_prompt` on a cold and a warm passage
+cache. Each run must produce the same text. The builder runs include token
+counting; pass --count-tokens to add it to the Jinja runs for a like-for-like
+comparison.
+
+    python benchmarks/bench_prompt_builder.py
+    python benchmarks/bench_prompt_builder.py --docs 5 --doc-chars 6000 --turns 6 --iterations 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from jinja2 import Environment  # noqa: E402
+from jinja2.nativetypes import NativeEnvironment  # noqa: E402
+
+from hits import Hit  # noqa: E402
+from prompt_builder import PassageCache, build_rag_prompt  # noqa: E402
+from templates import prompt  # noqa: E402
+from tokens import count_tokens  # noqa: E402
+
+
+class Turn:
+    def __init__(self, type, content):
+        self.type = type
+        self.content = content
+
+
+def synthetic_docs(count, chars):
+    sentence = "The tenant gave written notice of the broken stair on 3 May and the landlord did not repair it. "
+    body = (sentence * (chars // len(sentence) + 1))[:chars]
+    return [
+        Hit(id=f"doc-{i:03d}", score=10.0 - i, name=f"Document {i}", page_content=body,
+            updated_at="2024-05-01T00:00:00Z")
+        for i in range(count)
+    ]
+
+
+def synthetic_history(turns):
+    return [
+        Turn("human" if i % 2 == 0 else "ai", f"Turn {i}: what notice does a landlord need before repairs?")
+        for i in range(turns)
+    ]
+
+
+def timed(fn, iterations):
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    return (time.perf_counter() - started) / iterations, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=5)
+    parser.add_argument("--doc-chars", type=int, default=4000)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--count-tokens", action="store_true", help="Count tokens of the Jinja output too")
+    args = parser.parse_args()
+
+    docs = synthetic_docs(args.docs, args.doc_chars)
+    history = synthetic_history(args.turns)
+    question = "How much notice must a landlord get before a repair claim?"
+    context = {"question": question, "docs": docs, "chat_history": history}
+    native = NativeEnvironment().from_string(prompt.rag_cached_template)
+    plain = Environment().from_string(prompt.rag_cached_template)
+
+    def jinja(template):
+        def render():
+            text = template.render(**context)
+            if args.count_tokens:
+                count_tokens(text)
+            return text
+        return render
+
+    def cold():
+        return build_rag_prompt(question, docs, history, cache=PassageCache()).text
+
+    warm_cache = PassageCache()
+
+    def warm():
+        return build_rag_prompt(question, docs, history, cache=warm_cache).text
+
+    runs = [
+        ("NativeEnvironment", jinja(native)),
+        ("Environment", jinja(plain)),
+        ("builder, cold cache", cold),
+        ("builder, warm cache", warm),
+    ]
+    results = [(label, *timed(fn, args.iterations)) for label, fn in runs]
+    expected = results[0][2]
+    for label, _, text in results:
+        if text != expected:
+            raise SystemExit(f"{label} produced a different prompt")
+
+    print(f"{args.docs} passages of {args.doc_chars} chars, {args.turns} turns, {len(expected)} chars per prompt\n")
+    baseline = results[0][1]
+    for label, seconds, _ in results:
+        print(f"{label:22}{seconds * 1e6:>10.1f} µs{baseline / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
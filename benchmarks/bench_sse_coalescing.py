@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Per-stream cost of answer frames with and without coalescing.
+
+Streams a synthetic token-by-token answer over a local socket, once with one
+`data:` frame per chunk and once through the FrameCoalescer used by
+/api/chat. The server side counts socket writes and its CPU time. The client
+side parses SSE events and, like store/provider.tsx, appends each frame to the
+message and re-runs the SOURCES regex over the whole message. It counts reads,
+events and CPU time. Both runs must deliver the same text.
+
+    python benchmarks/bench_sse_coalescing.py
+    python benchmarks/bench_sse_coalescing.py --tokens 2000 --token-ms 1 --window-ms 30 --max-bytes 512
+"""
+import argparse
+import os
+import re
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from sse import FrameCoalescer, data_frame  # noqa: E402
+
+DONE_FRAME = "data: [DONE]\n\n"
+SOURCES = re.compile(r"SOURCES:(.+)*")
+
+
+def synthetic_tokens(count):
+    words = "the premises liability claim turns on notice of the dangerous condition".split()
+    for i in range(count):
+        yield ("\n" if i % 40 == 39 else " ") + words[i % len(words)]
+
+
+def serve(sock, tokens, token_ms, coalescer, stats):
+    start_cpu = time.thread_time()
+    writes = 0
+    for token in tokens:
+        if token_ms:
+            time.sleep(token_ms / 1000.0)
+        frame = coalescer.add(token) if coalescer else data_frame(token)
+        if frame:
+            sock.sendall(frame.encode("utf-8"))
+            writes += 1
+    if coalescer:
+        frame = coalescer.flush()
+        if frame:
+            sock.sendall(frame.encode("utf-8"))
+            writes += 1
+    sock.sendall(DONE_FRAME.encode("utf-8"))
+    writes += 1
+    stats.update(server_writes=writes, server_cpu=time.thread_time() - start_cpu)
+    sock.shutdown(socket.SHUT_WR)
+
+
+def consume(sock, stats):
+    start_cpu = time.thread_time()
+    reads = events = 0
+    buffer = ""
+    message = ""
+    rendered = ""
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            break
+        reads += 1
+        buffer += data.decode("utf-8")
+        while "\n\n" in buffer:
+            event, buffer = buffer.split("\n\n", 1)
+            payload = event[len("data: "):] if event.startswith("data: ") else event[len("data:"):]
+            events += 1
+            if payload == "[DONE]":
+                continue
+            # Same work the frontend does per answer frame
+            message += payload
+            rendered = SOURCES.sub("", message)
+    stats.update(client_reads=reads, client_events=events, client_cpu=time.thread_time() - start_cpu, text=rendered)
+
+
+def run(tokens, token_ms, coalescer):
+    server_sock, client_sock = socket.socketpair()
+    stats = {}
+    client = threading.Thread(target=consume, args=(client_sock, stats))
+    client.start()
+    started = time.perf_counter()
+    serve(server_sock, synthetic_tokens(tokens), token_ms, coalescer, stats)
+    client.join()
+    stats["wall"] = time.perf_counter() - started
+    server_sock.close()
+    client_sock.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--token-ms", type=float, default=1.0, help="Delay between LLM chunks")
+    parser.add_argument("--window-ms", type=float, default=30)
+    parser.add_argument("--max-bytes", type=int, default=512)
+    args = parser.parse_args()
+
+    baseline = run(args.tokens, args.token_ms, None)
+    coalesced = run(args.tokens, args.token_ms, FrameCoalescer(args.window_ms, args.max_bytes))
+    if baseline["text"] != coalesced["text"]:
+        raise SystemExit("Coalesced stream delivered different text")
+
+    print(f"{args.tokens} chunks, {args.token_ms}ms apart, window {args.window_ms}ms / {args.max_bytes} bytes\n")
+    print(f"{'':22}{'per chunk':>12}{'coalesced':>12}")
+    rows = [
+        ("server writes", "server_writes", "{:d}"),
+        ("server CPU (ms)", "server_cpu", "{:.1f}"),
+        ("client reads", "client_reads", "{:d}"),
+        ("client events", "client_events", "{:d}"),
+        ("client CPU (ms)", "client_cpu", "{:.1f}"),
+        ("wall time (s)", "wall", "{:.2f}"),
+    ]
+    for label, key, fmt in rows:
+        scale = 1000 if key.endswith("_cpu") else 1
+        print(f"{label:22}{fmt.format(baseline[key] * scale):>12}{fmt.format(coalesced[key] * scale):>12}")
+
+
+if __name__ == "__main__":
+    main()
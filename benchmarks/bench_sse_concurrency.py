@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+SSE concurrency benchmark for /api/chat.
+
+Opens N concurrent chat streams against a running API and reports time to first
+byte, time to [DONE], throughput and failures. Run it once against the Flask dev
+server and once against the gunicorn profile to compare, ideally with the local
+stand-in LLM so the gateway isn't the bottleneck:
+
+    # terminal 1: stand-in LLM
+    LOCAL_LLM_TOKEN_MS=20 flask local-llm
+    # terminal 2a: current setup
+    LLM_TYPE=local flask run --port 3001
+    # terminal 2b: production profile
+    cd api && LLM_TYPE=local PORT=4000 gunicorn -c gunicorn.conf.py app:app
+
+    python benchmarks/bench_sse_concurrency.py --url http://localhost:3001 --concurrency 50
+    python benchmarks/bench_sse_concurrency.py --url http://localhost:4000 --concurrency 50
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+DONE_TAG = "[DONE]"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_stream(url, question, timeout, results, lock):
+    parsed = urlparse(url)
+    connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+    start = time.perf_counter()
+    result = {"ok": False, "ttfb": None, "total": None, "frames": 0, "busy": False, "error": None}
+    try:
+        connection = connection_class(parsed.hostname, parsed.port, timeout=timeout)
+        connection.request(
+            "POST",
+            "/api/chat",
+            body=json.dumps({"question": question}),
+            headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+        )
+        response = connection.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+
+        while True:
+            line = response.fp.readline()
+            if not line:
+                break
+            if result["ttfb"] is None:
+                result["ttfb"] = time.perf_counter() - start
+            line = line.decode("utf-8").rstrip("\n")
+            if not line.startswith("data: "):
+                continue
+            result["frames"] += 1
+            data = line[len("data: "):]
+            if data.startswith("[BUSY]"):
+                result["busy"] = True
+            if data == DONE_TAG:
+                result["ok"] = not result["busy"]
+        result["total"] = time.perf_counter() - start
+        connection.close()
+    except Exception as e:
+        result["error"] = str(e)
+        result["total"] = time.perf_counter() - start
+    with lock:
+        results.append(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:3001")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--question", default="What is our NDA policy?")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    results = []
+    lock = threading.Lock()
+    wall_start = time.perf_counter()
+    for _ in range(args.rounds):
+        threads = [
+            threading.Thread(target=run_stream, args=(args.url, args.question, args.timeout, results, lock))
+            for _ in range(args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - wall_start
+
+    ok = [r for r in results if r["ok"]]
+    ttfb = [r["ttfb"] for r in ok if r["ttfb"] is not None]
+    totals = [r["total"] for r in ok]
+    errors = [r["error"] for r in results if r["error"]]
+
+    print(f"URL:           {args.url}")
+    print(f"Streams:       {len(results)} ({args.concurrency} concurrent x {args.rounds} rounds)")
+    print(f"Completed:     {len(ok)}")
+    print(f"Busy replies:  {sum(1 for r in results if r['busy'])}")
+    print(f"Errors:        {len(errors)}")
+    if ok:
+        print(f"TTFB p50/p95:  {statistics.median(ttfb) * 1000:.0f}ms / {percentile(ttfb, 95) * 1000:.0f}ms")
+        print(f"Total p50/p95: {statistics.median(totals) * 1000:.0f}ms / {percentile(totals, 95) * 1000:.0f}ms")
+        print(f"Frames/stream: {statistics.mean(r['frames'] for r in ok):.0f}")
+    print(f"Throughput:    {len(ok) / wall:.2f} streams/s over {wall:.1f}s")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    main()
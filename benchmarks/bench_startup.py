@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Import-time profile for the API process.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter from the
+api directory, then prints the wall time and the slowest imports by cumulative
+time. Heavy dependencies (langchain, portkey, elasticsearch, jinja) should not
+show up here since they're loaded on first use.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --module chat --top 15 --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+
+
+def profile_import(module):
+    env = dict(os.environ)
+    # Client creation is deferred, but keep config lookups from failing
+    env.setdefault("ELASTICSEARCH_URL", "http://localhost:9200")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=API_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented two spaces per level under their parent
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            imports.append((int(cumulative_us), depth, name.strip()))
+    raw_names = [
+        line.split("|")[-1] for line in result.stderr.splitlines()
+        if line.startswith("import time:") and "cumulative" not in line
+    ]
+    return wall, imports, raw_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    walls = []
+    for _ in range(args.runs):
+        wall, imports, raw_names = profile_import(args.module)
+        walls.append(wall)
+
+    heavy = {
+        "langchain_core", "langchain_openai", "langchain_elasticsearch", "portkey_ai",
+        "elasticsearch", "jinja2", "openai", "tiktoken",
+    }
+    loaded_heavy = sorted(heavy & {name.strip().split(".")[0] for name in raw_names})
+
+    print(f"Module:          {args.module}")
+    print(f"Wall time:       {statistics.median(walls) * 1000:.0f}ms median of {args.runs} runs (interpreter start included)")
+    top_level = [us for us, depth, _ in imports if depth == 0]
+    print(f"Import time:     {sum(top_level) / 1000:.0f}ms across {len(top_level)} top-level imports")
+    print(f"Heavy deps:      {', '.join(loaded_heavy) if loaded_heavy else 'none loaded at import'}")
+    print("\nSlowest imports (top-level and their direct imports):")
+    for cumulative_us, depth, name in sorted(imports, reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {'  ' * depth}{name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,630 @@
+"""
+Bulk indexing pipeline behind `flask create-index`.
+
+Streams documents from a local JSONL file, a directory, or a pluggable connector
+and writes them with `helpers.parallel_bulk`. While loading, refresh is turned
+off and replicas are set to 0, and both are restored afterwards.
+
+`ES_INDEX` is an alias. Every full load builds a new `{ES_INDEX}-v{n}` index,
+carries generated summaries over from the live one, warms it up and then swaps
+the alias atomically, so queries never see a half-built index.
+`flask rollback-index` points the alias back at the previous version.
+"""
+from datetime import datetime, timezone
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from content import content_hash, page_content, simhash
+from elasticsearch_client import (
+    get_elasticsearch_client,
+    ensure_index_template,
+    get_alias_indices,
+    is_concrete_index,
+    list_index_versions,
+    swap_alias,
+)
+
+INDEX = os.getenv("ES_INDEX", "ccc-db")
+INDEX_SOURCE = os.getenv(
+    "INDEX_SOURCE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "documents.jsonl"),
+)
+# "package.module:callable" returning an iterable of document dicts
+INDEX_CONNECTOR = os.getenv("INDEX_CONNECTOR")
+INDEX_CHUNK_SIZE = int(os.getenv("INDEX_CHUNK_SIZE", "500"))
+INDEX_THREAD_COUNT = int(os.getenv("INDEX_THREAD_COUNT", "4"))
+INDEX_QUEUE_SIZE = int(os.getenv("INDEX_QUEUE_SIZE", "4"))
+# Older versions kept around for rollback
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+INDEX_CHECKPOINT_FILE = os.getenv(
+    "INDEX_CHECKPOINT_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sync_checkpoint.json"),
+)
+# Comma separated queries run against a new index before it goes live
+INDEX_WARMUP_QUERIES = [
+    q.strip() for q in os.getenv("INDEX_WARMUP_QUERIES", "policy,agreement,template").split(",") if q.strip()
+]
+
+TEXT_EXTENSIONS = {".txt", ".md", ".html", ".htm"}
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️  Skipping invalid JSON at {path}:{line_number}: {e}")
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        yield from data
+    else:
+        yield data
+
+
+def _read_text(path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        body = f.read()
+    modified = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+    yield {
+        "id": hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest(),
+        "name": os.path.basename(path),
+        "body": body,
+        "webUrl": f"file://{os.path.abspath(path)}",
+        "category": "file",
+        "lastModifiedDateTime": modified.isoformat(),
+    }
+
+
+def read_path(path):
+    """Yield documents from a JSONL/JSON file, a text file, or a directory of them."""
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for filename in sorted(files):
+                yield from read_path(os.path.join(root, filename))
+        return
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".jsonl":
+        yield from _read_jsonl(path)
+    elif extension == ".json":
+        yield from _read_json(path)
+    elif extension in TEXT_EXTENSIONS:
+        yield from _read_text(path)
+
+
+def load_connector(spec):
+    """Resolve a "package.module:callable" connector spec."""
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"Connector must look like 'package.module:callable', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def iter_documents(source=None, connector=None):
+    if connector:
+        return iter(load_connector(connector)())
+    source = source or INDEX_SOURCE
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Document source not found: {source}")
+    return read_path(source)
+
+
+def document_id(doc):
+    doc_id = doc.pop("_id", None) or doc.get("id")
+    if doc_id:
+        return str(doc_id)
+    # Stable id from content so re-running the load doesn't duplicate documents
+    return hashlib.sha1(json.dumps(doc, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def simhash_hex(doc):
+    return format(simhash(page_content(doc)), "016x")
+
+
+def bulk_actions(index, documents):
+    for doc in documents:
+        doc.setdefault("content_hash", content_hash(doc))
+        doc.setdefault("simhash", simhash_hex(doc))
+        yield {
+            "_op_type": "index",
+            "_index": index,
+            "_id": document_id(doc),
+            "_source": doc,
+        }
+
+
+def _bulk_load_settings(es, index):
+    """Switch the index to bulk-load settings and return the values to restore."""
+    settings = es.indices.get_settings(index=index)[index]["settings"]["index"]
+    original = {
+        "refresh_interval": settings.get("refresh_interval", "1s"),
+        "number_of_replicas": settings.get("number_of_replicas", "1"),
+    }
+    es.indices.put_settings(
+        index=index,
+        body={"index": {"refresh_interval": "-1", "number_of_replicas": 0}},
+    )
+    return original
+
+
+def bulk_index(index, documents, chunk_size=None, thread_count=None, queue_size=None, create=True):
+    """
+    Write documents into `index` with parallel bulk requests.
+
+    Args:
+        index: Target index name
+        documents: Iterable of document dicts; `_id`/`id` is used as the document id
+        chunk_size: Documents per bulk request
+        thread_count: Parallel bulk worker threads
+        queue_size: Bulk requests buffered ahead of the workers
+        create: Create the index (from the index template) if it doesn't exist
+
+    Returns:
+        Dict with indexed/failed counts, elapsed seconds and docs_per_second
+    """
+    from elasticsearch import helpers
+
+    es = get_elasticsearch_client()
+    chunk_size = chunk_size or INDEX_CHUNK_SIZE
+    thread_count = thread_count or INDEX_THREAD_COUNT
+    queue_size = queue_size or INDEX_QUEUE_SIZE
+
+    if create and not es.indices.exists(index=index):
+        es.indices.create(index=index)
+        print(f"📦 Created index {index}")
+
+    original_settings = _bulk_load_settings(es, index)
+    print(f"⚙️  Bulk settings applied (was {original_settings})")
+
+    indexed = 0
+    failed = 0
+    start = time.perf_counter()
+    try:
+        for ok, info in helpers.parallel_bulk(
+            es,
+            bulk_actions(index, documents),
+            thread_count=thread_count,
+            chunk_size=chunk_size,
+            queue_size=queue_size,
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            if ok:
+                indexed += 1
+            else:
+                failed += 1
+                if failed <= 10:
+                    print(f"❌ Failed to index document: {info}")
+            if (indexed + failed) % (chunk_size * 10) == 0:
+                elapsed = time.perf_counter() - start
+                print(f"   {indexed + failed} documents processed ({indexed / elapsed:.0f} docs/s)")
+    finally:
+        es.indices.put_settings(index=index, body={"index": original_settings})
+        es.indices.refresh(index=index)
+        print(f"⚙️  Restored settings {original_settings}")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "indexed": indexed,
+        "failed": failed,
+        "elapsed": elapsed,
+        "docs_per_second": indexed / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def copy_summaries(source_index, target_index, chunk_size=None, thread_count=None):
+    """
+    Carry generated `summary` fields from the live index into a new one.
+
+    Returns:
+        Number of summaries copied; documents missing from the target or whose
+        content hash changed are skipped
+    """
+    from elasticsearch import helpers
+
+    es = get_elasticsearch_client()
+    hits = helpers.scan(
+        es,
+        index=source_index,
+        query={"query": {"exists": {"field": "summary"}}},
+        _source=["summary", "content_hash"],
+    )
+    # Only carry a summary over if the content it was generated from is unchanged
+    actions = (
+        {
+            "_op_type": "update",
+            "_index": target_index,
+            "_id": hit["_id"],
+            "script": {
+                "source": (
+                    "if (params.content_hash == null || ctx._source.content_hash == params.content_hash) "
+                    "{ ctx._source.summary = params.summary } else { ctx.op = 'noop' }"
+                ),
+                "lang": "painless",
+                "params": {
+                    "summary": hit["_source"]["summary"],
+                    "content_hash": hit["_source"].get("content_hash"),
+                },
+            },
+        }
+        for hit in hits
+    )
+
+    copied = 0
+    for ok, info in helpers.parallel_bulk(
+        es,
+        actions,
+        thread_count=thread_count or INDEX_THREAD_COUNT,
+        chunk_size=chunk_size or INDEX_CHUNK_SIZE,
+        raise_on_error=False,
+        raise_on_exception=False,
+    ):
+        if ok and info.get("update", {}).get("result") != "noop":
+            copied += 1
+    es.indices.refresh(index=target_index)
+    return copied
+
+
+def warm_up_index(index):
+    """Run a few representative queries so caches are loaded before the alias swap."""
+    es = get_elasticsearch_client()
+    es.search(index=index, body={"query": {"match_all": {}}, "size": 1})
+    for query in INDEX_WARMUP_QUERIES:
+        es.search(
+            index=index,
+            body={
+                "query": {"multi_match": {"query": query, "fields": ["name^2", "Title^3", "body", "summary"]}},
+                "size": 5,
+            },
+        )
+
+
+def prune_old_versions(alias, keep=None):
+    """Delete versioned indices beyond the newest `keep` not currently behind the alias."""
+    keep = INDEX_KEEP_VERSIONS if keep is None else keep
+    live = set(get_alias_indices(alias))
+    old = [name for _, name in list_index_versions(alias) if name not in live]
+    for name in old[:max(0, len(old) - keep)]:
+        print(f"🗑️  Deleting old index version {name}")
+        get_elasticsearch_client().indices.delete(index=name)
+
+
+def rebuild_index(alias, documents, chunk_size=None, thread_count=None, replace_concrete=False,
+                  checkpoint_path=None):
+    """
+    Build a new `{alias}-v{n}` index from `documents` and swap the alias onto it.
+
+    Args:
+        alias: Alias the application queries (ES_INDEX)
+        documents: Iterable of document dicts
+        chunk_size: Documents per bulk request
+        thread_count: Parallel bulk worker threads
+        replace_concrete: If a plain index already uses the alias name, delete it
+            in the same atomic step as the swap (it can't be rolled back to)
+        checkpoint_path: Sync checkpoint file, INDEX_CHECKPOINT_FILE by default
+
+    Returns:
+        Bulk stats plus the new index name and the number of summaries carried over
+    """
+    es = get_elasticsearch_client()
+
+    concrete = is_concrete_index(alias)
+    if concrete and not replace_concrete:
+        raise RuntimeError(
+            f"{alias} is a plain index, not an alias. Re-run with --replace-concrete-index "
+            f"to migrate it to versioned indices (summaries are carried over)."
+        )
+
+    versions = list_index_versions(alias)
+    new_index = f"{alias}-v{versions[-1][0] + 1 if versions else 1}"
+    live_indices = [alias] if concrete else get_alias_indices(alias)
+
+    print(f"📦 Building {new_index}")
+    es.indices.create(index=new_index)
+    stats = bulk_index(new_index, documents, chunk_size=chunk_size, thread_count=thread_count, create=False)
+
+    summaries = 0
+    for live_index in live_indices:
+        summaries += copy_summaries(live_index, new_index, chunk_size=chunk_size, thread_count=thread_count)
+    print(f"📝 Carried over {summaries} summaries")
+
+    warm_up_index(new_index)
+    print(f"🔥 Warmed up {new_index}")
+
+    if not swap_alias(alias, new_index, remove_index=alias if concrete else None):
+        raise RuntimeError(f"Alias swap failed; {alias} still points to {live_indices}")
+    reset_checkpoint(new_index, checkpoint_path)
+
+    prune_old_versions(alias)
+    return dict(stats, index=new_index, summaries=summaries)
+
+
+def rollback_index(alias=None, checkpoint_path=None):
+    """
+    Point the alias back at the newest version older than the live one.
+
+    Syncs made since that version was live only reached the newer index, so its
+    checkpoint is reset and the next sync compares every document.
+    """
+    alias = alias or INDEX
+    live = get_alias_indices(alias)
+    versions = list_index_versions(alias)
+    live_versions = [version for version, name in versions if name in live]
+    if not live_versions:
+        raise RuntimeError(f"{alias} doesn't point to a versioned index")
+
+    previous = [name for version, name in versions if version < min(live_versions)]
+    if not previous:
+        raise RuntimeError(f"No older version of {alias} to roll back to")
+
+    if not swap_alias(alias, previous[-1]):
+        raise RuntimeError(f"Rollback of {alias} failed")
+    reset_checkpoint(previous[-1], checkpoint_path)
+    print(f"↩️  Rolled {alias} back from {', '.join(live)} to {previous[-1]}")
+    return previous[-1]
+
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 lastModifiedDateTime (with or without a trailing Z)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _read_checkpoints(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        # Checkpoints from before they were keyed by index describe no index in
+        # particular, so they are ignored and the next sync compares everything
+        return json.load(f).get("indices", {})
+
+
+def _write_checkpoints(checkpoints, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"indices": checkpoints}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(index, path=None):
+    """Sync checkpoint of a concrete index, empty if it was never synced."""
+    return _read_checkpoints(path or INDEX_CHECKPOINT_FILE).get(index, {})
+
+
+def save_checkpoint(index, checkpoint, path=None):
+    path = path or INDEX_CHECKPOINT_FILE
+    checkpoints = _read_checkpoints(path)
+    checkpoints[index] = checkpoint
+    _write_checkpoints(checkpoints, path)
+
+
+def reset_checkpoint(index, path=None):
+    """Forget the watermark of an index the alias was just pointed at."""
+    path = path or INDEX_CHECKPOINT_FILE
+    checkpoints = _read_checkpoints(path)
+    if checkpoints.pop(index, None) is not None:
+        _write_checkpoints(checkpoints, path)
+
+
+def live_index(alias):
+    """Concrete index behind an alias (the alias itself when it's a plain index)."""
+    indices = get_alias_indices(alias)
+    return indices[-1] if indices else alias
+
+
+def _existing_versions(es, index, doc_ids, chunk_size):
+    """Map doc id -> (content_hash, lastModifiedDateTime) as currently indexed."""
+    versions = {}
+    for i in range(0, len(doc_ids), chunk_size):
+        response = es.mget(
+            index=index,
+            body={"ids": doc_ids[i:i + chunk_size]},
+            _source=["content_hash", "lastModifiedDateTime"],
+        )
+        for doc in response["docs"]:
+            if doc.get("found"):
+                source = doc["_source"]
+                versions[doc["_id"]] = (source.get("content_hash"), source.get("lastModifiedDateTime"))
+    return versions
+
+
+def _indexed_ids(es, index):
+    from elasticsearch import helpers
+
+    return {
+        hit["_id"]
+        for hit in helpers.scan(es, index=index, query={"query": {"match_all": {}}}, _source=False)
+    }
+
+
+def plan_sync(documents, watermark, existing_versions_for):
+    """
+    Decide which source documents need writing.
+
+    Args:
+        documents: Iterable of source document dicts
+        watermark: datetime of the last successful sync, or None for everything
+        existing_versions_for: Callable taking a list of ids and returning
+            {id: (content_hash, lastModifiedDateTime)} for the ones already indexed
+
+    Returns:
+        Dict with `actions` (bulk actions), `seen_ids`, `new_watermark` and per-kind counts
+    """
+    seen_ids = set()
+    candidates = []
+    new_watermark = watermark
+    for doc in documents:
+        doc_id = document_id(doc)
+        seen_ids.add(doc_id)
+        modified = parse_timestamp(doc.get("lastModifiedDateTime"))
+        if modified and (new_watermark is None or modified > new_watermark):
+            new_watermark = modified
+        # Documents without a timestamp are always re-checked against their hash
+        if watermark and modified and modified <= watermark:
+            continue
+        doc["content_hash"] = content_hash(doc)
+        candidates.append((doc_id, doc))
+
+    stored = existing_versions_for([doc_id for doc_id, _ in candidates]) if candidates else {}
+    counts = {"added": 0, "changed": 0, "metadata_only": 0, "unchanged": 0}
+    actions = []
+    for doc_id, doc in candidates:
+        if doc_id not in stored:
+            counts["added"] += 1
+            op = "index"
+        elif stored[doc_id][0] != doc["content_hash"]:
+            # Content changed: a full replace drops the stale summary
+            counts["changed"] += 1
+            op = "index"
+        elif stored[doc_id][1] != doc.get("lastModifiedDateTime"):
+            # Same content, new metadata: partial update keeps the stored summary
+            counts["metadata_only"] += 1
+            op = "update"
+        else:
+            counts["unchanged"] += 1
+            continue
+
+        if op == "index":
+            doc["simhash"] = simhash_hex(doc)
+            actions.append({"_op_type": "index", "_id": doc_id, "_source": doc})
+        else:
+            actions.append({"_op_type": "update", "_id": doc_id, "doc": doc})
+
+    return dict(counts, actions=actions, seen_ids=seen_ids, new_watermark=new_watermark)
+
+
+def sync_index(alias=None, documents=None, delete_missing=True, chunk_size=None, thread_count=None,
+               checkpoint_path=None):
+    """
+    Incrementally sync the live index with the source.
+
+    Only documents modified after the checkpoint's high-watermark are compared, by
+    content hash, with what's indexed. Changed content is fully re-indexed (dropping
+    its summary), metadata-only changes are applied as partial updates (keeping the
+    summary), and documents no longer in the source are deleted. Deletion detection
+    needs a source that lists every document; pass delete_missing=False otherwise.
+
+    The checkpoint belongs to the concrete index behind the alias, so the first
+    sync after a rebuild or rollback compares every document.
+
+    Returns:
+        Dict with added/changed/metadata_only/unchanged/deleted/failed counts
+    """
+    from elasticsearch import helpers
+
+    alias = alias or INDEX
+    es = get_elasticsearch_client()
+    chunk_size = chunk_size or INDEX_CHUNK_SIZE
+    target = live_index(alias)
+    checkpoint = load_checkpoint(target, checkpoint_path)
+    watermark = parse_timestamp(checkpoint.get("watermark"))
+    print(f"🔖 Syncing {alias} ({target}) from watermark {checkpoint.get('watermark', 'none (full compare)')}")
+
+    start = time.perf_counter()
+    plan = plan_sync(
+        documents if documents is not None else iter_documents(connector=INDEX_CONNECTOR),
+        watermark,
+        lambda ids: _existing_versions(es, alias, ids, chunk_size),
+    )
+
+    actions = [dict(action, _index=alias) for action in plan["actions"]]
+    deleted_ids = []
+    if delete_missing:
+        deleted_ids = sorted(_indexed_ids(es, alias) - plan["seen_ids"])
+        actions.extend({"_op_type": "delete", "_index": alias, "_id": doc_id} for doc_id in deleted_ids)
+
+    failed = 0
+    for ok, info in helpers.parallel_bulk(
+        es,
+        actions,
+        thread_count=thread_count or INDEX_THREAD_COUNT,
+        chunk_size=chunk_size,
+        raise_on_error=False,
+        raise_on_exception=False,
+    ):
+        if not ok:
+            failed += 1
+            if failed <= 10:
+                print(f"❌ Failed to sync document: {info}")
+    es.indices.refresh(index=alias)
+
+    # Only advance the watermark when every change made it in, so failures are retried
+    if not failed and plan["new_watermark"]:
+        save_checkpoint(target, {
+            "watermark": plan["new_watermark"].isoformat(),
+            "synced_at": datetime.now(timezone.utc).isoformat(),
+        }, checkpoint_path)
+
+    stats = {
+        "added": plan["added"],
+        "changed": plan["changed"],
+        "metadata_only": plan["metadata_only"],
+        "unchanged": plan["unchanged"],
+        "deleted": len(deleted_ids),
+        "failed": failed,
+        "elapsed": time.perf_counter() - start,
+    }
+    print(
+        f"✅ Sync done in {stats['elapsed']:.1f}s: {stats['added']} added, {stats['changed']} changed, "
+        f"{stats['metadata_only']} metadata-only, {stats['unchanged']} unchanged, "
+        f"{stats['deleted']} deleted, {stats['failed']} failed"
+    )
+    return stats
+
+
+def sync_main(source=None, connector=None, delete_missing=True, chunk_size=None, thread_count=None):
+    documents = iter_documents(source=source, connector=connector or INDEX_CONNECTOR)
+    return sync_index(
+        INDEX,
+        documents,
+        delete_missing=delete_missing,
+        chunk_size=chunk_size,
+        thread_count=thread_count,
+    )
+
+
+def main(source=None, connector=None, chunk_size=None, thread_count=None, replace_concrete=False):
+    connector = connector or INDEX_CONNECTOR
+
+    if not ensure_index_template(INDEX):
+        raise RuntimeError(f"Could not create index template for {INDEX}")
+    print(f"🗺️  Index template ready for {INDEX}")
+
+    documents = iter_documents(source=source, connector=connector)
+    stats = rebuild_index(
+        INDEX,
+        documents,
+        chunk_size=chunk_size,
+        thread_count=thread_count,
+        replace_concrete=replace_concrete,
+    )
+
+    print(
+        f"\n✅ Indexed {stats['indexed']} documents into {stats['index']} "
+        f"in {stats['elapsed']:.1f}s ({stats['docs_per_second']:.0f} docs/s), "
+        f"{stats['failed']} failed; {INDEX} now points to {stats['index']}"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    main(source=sys.argv[1] if len(sys.argv) > 1 else None)
@@ -87,9 +87,11 @@ const App = () => {
   }
   const handleToggleSource = (name: string) => {
     dispatch(actions.sourceToggle({ name }))
+    dispatch(thunkActions.loadSummary(name))
   }
   const handleSourceClick = (name: string) => {
     dispatch(actions.sourceToggle({ name, expanded: true }))
+    dispatch(thunkActions.loadSummary(name))
 
     setTimeout(() => {
       document
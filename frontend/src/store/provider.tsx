@@ -24,6 +24,8 @@ enum STREAMING_EVENTS {
   SOURCE = '[SOURCE]',
   DONE = '[DONE]',
   TRACE_ID = '[TRACE_ID]',
+  RESUMED = '[RESUMED]',
+  BUSY = '[BUSY]',
 }
 
 const GLOBAL_STATE: GlobalStateType = {
@@ -57,8 +59,8 @@ const globalSlice = createSlice({
             if (!currentSummary.some(s => s !== "Loading summary...")) {
               rootSource.summary = "Loading summary..."
             }
-          } else if (source.enhanced) {
-            // For enhanced sources, replace the summary completely (single final summary)
+          } else if (source.enhanced || rootSource.extractive) {
+            // Enhanced summaries are final and replace an extractive snippet completely
             rootSource.summary = source.summary
           } else {
             // For non-enhanced sources, handle as array (legacy behavior)
@@ -76,6 +78,9 @@ const globalSlice = createSlice({
         
         // Update other fields if they exist
         if (source.url) rootSource.url = source.url
+        if (source.id) rootSource.id = source.id
+        if (source.summary_url) rootSource.summary_url = source.summary_url
+        if (source.extractive !== undefined) rootSource.extractive = source.extractive
         if (source.confidence !== undefined) rootSource.confidence = source.confidence
         if (source.updated_at !== undefined) rootSource.updated_at = source.updated_at
       } else {
@@ -85,6 +90,7 @@ const globalSlice = createSlice({
           summary: source.summary,
           loading: source.loading ?? false,
           enhanced: source.enhanced ?? false,
+          extractive: source.extractive ?? false,
           error: source.error ?? false
         })
       }
@@ -235,6 +241,13 @@ export const thunkActions = {
                   traceId: traceId,
                 })
               )
+            } else if (event.data.startsWith(STREAMING_EVENTS.RESUMED)) {
+              // The server is continuing a dropped stream; text already received
+              // stays as-is and only the missing rest follows
+              console.debug('Answer stream resumed at offset', event.data.split(' ')[1])
+            } else if (event.data.startsWith(STREAMING_EVENTS.BUSY)) {
+              // Server is at capacity; the message that follows explains it
+              console.warn('Server busy, retry after', event.data.split(' ')[1], 's')
             } else if (event.data.startsWith(STREAMING_EVENTS.SOURCE)) {
               const source = event.data.replace(
                 `${STREAMING_EVENTS.SOURCE} `,
@@ -244,6 +257,7 @@ export const thunkActions = {
               try {
                 if (source) {
                   const parsedSource: {
+                    id?: string
                     name: string
                     page_content: string
                     summary?: string
@@ -253,13 +267,18 @@ export const thunkActions = {
                     confidence?: number
                     loading?: boolean
                     enhanced?: boolean
+                    extractive?: boolean
                     error?: boolean
+                    summary_url?: string
                   } = JSON.parse(source.replaceAll('\n', ''))
 
-                  if ((parsedSource.page_content || parsedSource.summary) && parsedSource.name) {
+                  // Sources without a stored summary carry a summary_url to fetch it on demand
+                  if ((parsedSource.page_content || parsedSource.summary || parsedSource.summary_url) && parsedSource.name) {
                     dispatch(
                       actions.addSource({
                         source: {
+                          id: parsedSource.id,
+                          summary_url: parsedSource.summary_url,
                           name: parsedSource.name,
                           url: parsedSource.url,
                           summary: parsedSource.summary || parsedSource.page_content,
@@ -269,6 +288,7 @@ export const thunkActions = {
                           confidence: parsedSource.confidence,
                           loading: parsedSource.loading,
                           enhanced: parsedSource.enhanced,
+                          extractive: parsedSource.extractive,
                           error: parsedSource.error,
                         },
                       })
@@ -348,6 +368,46 @@ export const thunkActions = {
       )
     }
   },
+  loadSummary: (name: string) => {
+    return async function (dispatch, getState) {
+      const source = getState().sources.find((s) => s.name === name)
+      const summaries = Array.isArray(source?.summary) ? source?.summary : [source?.summary]
+      // An extractive snippet is shown until the LLM summary is fetched
+      const hasSummary = !source?.extractive && summaries.some((s) => s && s !== 'Loading summary...')
+
+      if (!source || !source.summary_url || hasSummary || source.loading) {
+        return
+      }
+
+      dispatch(
+        actions.addSource({
+          source: { name, summary: 'Loading summary...', loading: true },
+        })
+      )
+      try {
+        // summary_url is already encoded by the server and rooted at its origin
+        const response = await fetch(
+          new URL(source.summary_url, new URL(API_HOST, window.location.href)).toString()
+        )
+        if (!response.ok) {
+          throw new Error(`Summary request failed with ${response.status}`)
+        }
+        const { summary } = await response.json()
+        dispatch(
+          actions.addSource({
+            source: { name, summary, loading: false, enhanced: true, extractive: false },
+          })
+        )
+      } catch (e) {
+        console.error(e)
+        dispatch(
+          actions.addSource({
+            source: { name, loading: false, error: true },
+          })
+        )
+      }
+    }
+  },
   abortRequest: () => {
     return function (dispatch, getState) {
       const messages = getState().conversation
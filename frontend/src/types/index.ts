@@ -23,6 +23,7 @@ export interface Result {
 }
 
 export type SourceType = {
+  id?: string
   name: string
   summary: string[] | string
   url: string
@@ -32,8 +33,11 @@ export type SourceType = {
   confidence?: number
   loading?: boolean
   enhanced?: boolean
+  // Summary is a local extractive snippet, not the LLM summary
+  extractive?: boolean
   error?: boolean
   page_content?: string
+  summary_url?: string
 }
 
 export type ChatMessageType = {
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for chat and summary admission control
+"""
+import os
+import sys
+import threading
+import time
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from admission import AdmissionController
+
+
+def test_admission_caps_and_queues():
+    """Test that excess callers queue for a bounded time and are then rejected"""
+    print("🧪 Testing admission control...")
+
+    controller = AdmissionController("test", max_concurrent=2, max_queue=1, max_wait=0.2)
+
+    assert controller.acquire()
+    assert controller.acquire()
+    print("✅ Admitted up to max_concurrent")
+
+    # Queue is free, so this caller waits and then times out
+    start = time.perf_counter()
+    assert not controller.acquire()
+    waited = time.perf_counter() - start
+    assert 0.15 <= waited < 1.0, waited
+    print(f"✅ Queued caller timed out after {waited * 1000:.0f}ms")
+
+    # A queued caller is admitted once a slot is released
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(controller.acquire(timeout=2)))
+    waiter.start()
+    time.sleep(0.05)
+    assert controller.stats()["waiting"] == 1
+
+    # Queue is full now, so this caller is rejected without waiting
+    start = time.perf_counter()
+    assert not controller.acquire()
+    assert time.perf_counter() - start < 0.05
+    print("✅ Full queue rejected immediately")
+
+    controller.release()
+    waiter.join(timeout=2)
+    assert admitted == [True]
+    print("✅ Queued caller admitted after release")
+
+    stats = controller.stats()
+    assert stats["in_flight"] == 2
+    assert stats["admitted"] == 3
+    assert stats["rejected"] == 2
+    assert stats["timed_out"] == 1
+    print(f"📊 Stats: {stats}")
+
+
+def test_no_queue_rejects_fast():
+    """Test that a controller without a queue never blocks"""
+    print("🧪 Testing queueless controller...")
+
+    controller = AdmissionController("summary", max_concurrent=1)
+    with controller.slot() as first:
+        assert first
+        with controller.slot() as second:
+            assert not second
+    assert controller.stats()["in_flight"] == 0
+    print("✅ Slots released and excess rejected")
+
+
+if __name__ == "__main__":
+    test_admission_caps_and_queues()
+    test_no_queue_rejects_fast()
+    print("\n🎉 All admission control tests passed!")
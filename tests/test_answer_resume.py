@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for resuming an answer stream after a dropped connection
+"""
+import os
+import sys
+from unittest import mock
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from flask import Flask
+
+import chat
+from sse import FrameCoalescer
+
+
+class Chunk:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = None
+
+
+class DroppingLLM:
+    """Answer model stand-in whose streams fail after the given chunks"""
+
+    def __init__(self, attempts, invoke_result=None):
+        # One (chunks, error) pair per stream call; error None means the stream completes
+        self.attempts = list(attempts)
+        self.invoke_result = invoke_result
+        self.inputs = []
+
+    def stream(self, llm_input):
+        self.inputs.append(llm_input)
+        chunks, error = self.attempts.pop(0)
+        for text in chunks:
+            yield Chunk(text)
+        if error:
+            raise error
+
+    def invoke(self, llm_input):
+        self.inputs.append(llm_input)
+        if isinstance(self.invoke_result, Exception):
+            raise self.invoke_result
+        return Chunk(self.invoke_result)
+
+
+def run(llm):
+    """Frames sent and the answer returned by stream_answer"""
+    frames = []
+    with Flask(__name__).app_context(), \
+            mock.patch.object(chat, "HEDGE_ENABLED", False), \
+            mock.patch.object(chat.time, "sleep"):
+        stream = chat.stream_answer(llm, "PROMPT", FrameCoalescer(window_ms=0))
+        while True:
+            try:
+                frames.append(next(stream))
+            except StopIteration as stop:
+                return frames, stop.value
+
+
+def client_text(frames):
+    """What the client shows: frame payloads that aren't tags, concatenated"""
+    payloads = [frame[len("data: "):-2] for frame in frames]
+    return "".join(payload for payload in payloads if not payload.startswith(chat.RESUMED_TAG))
+
+
+def resumed_offsets(frames):
+    """(frame position, offset) of every [RESUMED] frame"""
+    return [
+        (position, int(frame.split()[2]))
+        for position, frame in enumerate(frames)
+        if frame.startswith(f"data: {chat.RESUMED_TAG}")
+    ]
+
+
+def test_resume_after_connection_error():
+    """Test that a dropped stream continues from the partial answer without duplicating text"""
+    print("🧪 Testing resume after a connection error...")
+
+    llm = DroppingLLM([
+        (["Hello", "\nwor"], ConnectionError("Connection reset by peer")),
+        (["ld."], None),
+    ])
+    frames, answer = run(llm)
+
+    assert answer == "Hello\nworld."
+    assert client_text(frames) == "Hello  world."
+    assert llm.inputs[0] == "PROMPT"
+    # The continuation replays exactly what was delivered as the assistant turn
+    assert [message.content for message in llm.inputs[1][:2]] == ["PROMPT", "Hello\nwor"]
+
+    [(position, offset)] = resumed_offsets(frames)
+    sent_before = client_text(frames[:position])
+    assert sent_before == "Hello  wor"
+    # The offset counts characters as the client holds them, newlines already replaced
+    assert offset == len(sent_before)
+    assert client_text(frames[position + 1:]) == "ld."
+    print(f"✅ Resumed at client offset {offset}")
+
+
+def test_fallback_after_retries():
+    """Test that the non-streaming fallback is announced and only adds the missing text"""
+    print("🧪 Testing non-streaming fallback...")
+
+    llm = DroppingLLM([(["Part one."], ValueError("bad response"))], invoke_result=" Part two.")
+    frames, answer = run(llm)
+
+    assert answer == "Part one. Part two."
+    assert client_text(frames) == answer
+    [(position, offset)] = resumed_offsets(frames)
+    assert offset == len("Part one.")
+    assert client_text(frames[position + 1:]) == " Part two."
+    assert llm.inputs[1][1].content == "Part one."
+    print("✅ Fallback resumed after the partial answer")
+
+
+def test_failed_fallback_keeps_partial_answer():
+    """Test that the answer stored in history matches what the client was shown"""
+    print("🧪 Testing failed fallback...")
+
+    llm = DroppingLLM([(["Line one\n"], ValueError("bad response"))], invoke_result=RuntimeError("down"))
+    frames, answer = run(llm)
+
+    assert answer.startswith("Line one\n") and "connection issues" in answer
+    assert client_text(frames) == answer.replace("\n", "  ")
+
+    llm = DroppingLLM([([], ValueError("bad response"))], invoke_result=RuntimeError("down"))
+    frames, answer = run(llm)
+    assert answer.startswith("I'm sorry") and client_text(frames) == answer
+    assert not resumed_offsets(frames)
+    print("✅ Partial answer kept with the error")
+
+
+if __name__ == "__main__":
+    test_resume_after_connection_error()
+    test_fallback_after_retries()
+    test_failed_fallback_keeps_partial_answer()
+    print("\n🎉 All answer resume tests passed!")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for batched document summarization
+"""
+import asyncio
+import json
+import os
+import sys
+from unittest import mock
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+import chat
+from hits import Hit
+from tokens import count_tokens, truncate_tokens
+
+
+class FakeSummaryLLM:
+    """Answers batch prompts with a canned response and single prompts with a fixed summary"""
+
+    def __init__(self, batch_response):
+        self.batch_response = batch_response
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        content = self.batch_response if "DOCUMENT ID:" in prompt else "Single summary"
+        return type("Message", (), {"content": content})()
+
+
+def run_batch(batch_response, docs):
+    llm = FakeSummaryLLM(batch_response)
+    with mock.patch.object(chat, "get_llm", lambda **kwargs: llm):
+        return asyncio.run(chat.generate_batch_summaries(docs, "trace")), llm
+
+
+def test_batch_summaries():
+    """Test one call for all documents, with per-document fallback on bad or partial output"""
+    print("🧪 Testing generate_batch_summaries...")
+
+    docs = [Hit(id=f"doc-{i}", score=1.0, name=f"{i}.pdf", page_content="word " * 5000) for i in range(3)]
+    full = json.dumps({doc.id: f"Summary {doc.id}" for doc in docs})
+
+    summaries, llm = run_batch(f"```json\n{full}\n```", docs)
+    assert summaries == {doc.id: f"Summary {doc.id}" for doc in docs}
+    assert len(llm.prompts) == 1
+    # Each document is capped before it goes into the batch prompt
+    assert count_tokens(llm.prompts[0]) < 3 * chat.SUMMARY_BATCH_DOC_TOKENS + 200
+
+    summaries, llm = run_batch(json.dumps({"doc-0": "Summary doc-0"}), docs)
+    assert summaries == {"doc-0": "Summary doc-0", "doc-1": "Single summary", "doc-2": "Single summary"}
+    assert len(llm.prompts) == 3
+
+    summaries, llm = run_batch("Sorry, here are the summaries: ...", docs)
+    assert set(summaries.values()) == {"Single summary"} and len(llm.prompts) == 4
+    print("✅ Batch summaries with fallback")
+
+
+def test_parse_batch_summaries():
+    """Test that only requested IDs with text summaries are accepted"""
+    print("🧪 Testing parse_batch_summaries...")
+
+    text = 'Here you go: {"a": " A ", "b": "", "c": "C", "x": "not asked"}'
+    assert chat.parse_batch_summaries(text, ["a", "b", "c"]) == {"a": "A", "c": "C"}
+    assert chat.parse_batch_summaries("[1, 2]", ["a"]) == {}
+    assert chat.parse_batch_summaries("", ["a"]) == {}
+    assert truncate_tokens("short", 100) == "short"
+    print("✅ Batch responses parsed")
+
+
+if __name__ == "__main__":
+    test_batch_summaries()
+    test_parse_batch_summaries()
+    print("\n🎉 All batch summary tests passed!")
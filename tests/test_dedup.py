@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for near-duplicate collapsing of retrieval results
+"""
+import os
+import sys
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from content import hamming_distance, simhash
+from dedup import apply_search_options, collapse_near_duplicates, mmr_select, select_hits
+from hits import Hit
+
+POLICY = "Employees must submit expense reports within thirty days of travel. " * 40
+MEMO = "The premises liability memo covers negligence claims and insurer notice. " * 40
+
+
+def indexed_hit(doc_id, score, name, text):
+    """Hit as returned from the index, with its stored SimHash"""
+    return Hit(id=doc_id, score=score, name=name, page_content=text, simhash=simhash(text))
+
+
+def test_simhash_distance():
+    """Test that small edits keep signatures close and different text far apart"""
+    print("🧪 Testing SimHash distances...")
+
+    base = simhash(POLICY)
+    assert hamming_distance(base, simhash(POLICY.upper() + " Revised 2024.")) <= 3
+    assert hamming_distance(base, simhash(MEMO)) > 10
+    assert simhash("") == 0
+    print("✅ SimHash separates near copies from different documents")
+
+
+def test_collapse_near_duplicates():
+    """Test that exact and near copies collapse to the best-scoring hit"""
+    print("🧪 Testing collapse_near_duplicates...")
+
+    hits = [
+        indexed_hit("a", 9.0, "Policy.docx", POLICY),
+        indexed_hit("b", 8.9, "Policy (1).docx", POLICY),
+        indexed_hit("c", 8.5, "Policy v2.docx", POLICY + " Footer: internal."),
+        indexed_hit("d", 4.0, "Memo.pdf", MEMO),
+    ]
+    kept = collapse_near_duplicates(hits)
+    assert [hit.id for hit in kept] == ["a", "d"], kept
+    assert [hit.id for hit in collapse_near_duplicates(hits, max_distance=-1)] == ["a", "c", "d"]
+    assert [hit.id for hit in select_hits(hits, size=5, mode="off")] == ["a", "b", "c", "d"]
+
+    # Without indexed signatures only exact copies collapse; nothing is hashed at query time
+    unsigned = [Hit(id=hit.id, score=hit.score, name=hit.name, page_content=hit.page_content) for hit in hits]
+    assert [hit.id for hit in collapse_near_duplicates(unsigned)] == ["a", "c", "d"]
+    assert not any(hit.has_simhash for hit in unsigned)
+    print("✅ Duplicates collapsed")
+
+
+def test_mmr_select():
+    """Test that MMR trades a little relevance for a different document"""
+    print("🧪 Testing mmr_select...")
+
+    hits = [
+        indexed_hit("a", 9.0, "Policy.docx", POLICY),
+        indexed_hit("c", 8.5, "Policy v2.docx", POLICY + " Appendix A lists rates."),
+        indexed_hit("d", 6.0, "Memo.pdf", MEMO),
+    ]
+    assert [hit.id for hit in mmr_select(hits, 2, 0.5)] == ["a", "d"]
+    assert [hit.id for hit in mmr_select(hits, 2, 1.0)] == ["a", "c"]
+    print("✅ MMR prefers diverse results")
+
+
+def test_apply_search_options():
+    """Test that collapse mode drops rescore, which ES can't combine with collapse"""
+    print("🧪 Testing apply_search_options...")
+
+    body = apply_search_options({"query": {}, "size": 5, "rescore": {"window_size": 10}}, mode="collapse")
+    assert body["collapse"] == {"field": "content_hash"}
+    assert "rescore" not in body
+    assert body["size"] >= 5
+
+    body = apply_search_options({"query": {}, "size": 5, "rescore": {"window_size": 10}}, mode="client")
+    assert "collapse" not in body
+    assert body["rescore"]["window_size"] >= body["size"]
+    print("✅ Search body sized for collapsing")
+
+
+if __name__ == "__main__":
+    test_simhash_distance()
+    test_collapse_near_duplicates()
+    test_mmr_select()
+    test_apply_search_options()
+    print("\n🎉 All dedup tests passed!")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for extractive source snippets
+"""
+import os
+import sys
+import time
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from extractive import MAX_INPUT_CHARS, MAX_SENTENCES, extractive_summary, sentence_scores, split_sentences
+
+DOCUMENT = """
+<h1>Premises liability</h1>
+<p>A landlord must keep the common areas of a building reasonably safe for tenants and visitors.
+Liability for an injury on the premises usually depends on notice of the dangerous condition.
+The court in this case reviewed the notice the landlord received about the broken stair.
+Weather in the city was mild during the week of the hearing.
+Damages for premises liability can include medical costs and lost wages.
+The clerk's office is open on weekdays.</p>
+<p>Page 1 of 2 - Community Law Centre archive.</p>
+<p>Page 1 of 2 - Community Law Centre archive.</p>
+"""
+
+
+def test_split_sentences():
+    """Test that HTML, short fragments and repeated boilerplate are dropped"""
+    print("🧪 Testing sentence splitting...")
+
+    sentences = split_sentences(DOCUMENT)
+    assert sentences[0].startswith("A landlord must keep")
+    assert all("<" not in sentence for sentence in sentences)
+    assert "Premises liability" not in sentences
+    assert sum("Community Law Centre" in sentence for sentence in sentences) == 1
+    assert split_sentences("") == [] and split_sentences(None) == []
+    print(f"✅ {len(sentences)} sentences")
+
+
+def test_snippet_favours_query_terms():
+    """Test that query overlap picks the relevant sentences, kept in document order"""
+    print("🧪 Testing query-focused snippets...")
+
+    snippet = extractive_summary(DOCUMENT, "what damages for premises liability", max_sentences=2)
+    assert "Damages for premises liability" in snippet
+    assert "Weather" not in snippet and "clerk" not in snippet
+    sentences = split_sentences(DOCUMENT)
+    positions = [sentences.index(sentence) for sentence in sentences if sentence in snippet]
+    assert len(positions) == 2 and positions == sorted(positions)
+
+    scores = sentence_scores(sentences, "notice")
+    assert scores.shape == (len(sentences),)
+    assert scores[2] > scores[3], "the notice sentence should outrank the weather"
+    print(f"✅ Snippet: {snippet}")
+
+
+def test_snippet_limits():
+    """Test character cap, short documents and documents without sentences"""
+    print("🧪 Testing snippet limits...")
+
+    snippet = extractive_summary(DOCUMENT, max_sentences=3, max_chars=120)
+    assert 0 < len(snippet) <= 123
+    short = "Only one sentence is long enough to keep here."
+    assert extractive_summary(short) == short
+    assert extractive_summary("Too short.") == ""
+    print("✅ Limits respected")
+
+
+def test_long_document_time():
+    """Test that a long document costs about as much as its first MAX_INPUT_CHARS characters"""
+    print("🧪 Testing long document cost...")
+
+    paragraph = "<p>The tenant reported the broken stair to the landlord in writing. Repairs were delayed for weeks.</p>\n"
+    document = paragraph * 4000 + "<p>Unreachable closing remark about the final hearing date.</p>"
+    assert len(document) > 5 * MAX_INPUT_CHARS
+    assert "Unreachable" not in " ".join(split_sentences(document))
+    assert len(split_sentences(document)) <= MAX_SENTENCES
+
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        extractive_summary(document, "broken stair repairs")
+        best = min(best, time.perf_counter() - started)
+    # Up to five of these run before the first answer token
+    assert best < 0.03, f"{best * 1000:.1f}ms"
+    print(f"✅ {len(document) // 1000}KB document in {best * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    test_split_sentences()
+    test_snippet_favours_query_terms()
+    test_snippet_limits()
+    test_long_document_time()
+    print("\n🎉 All extractive snippet tests passed!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for the background feedback pipeline
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from feedback import FeedbackPipeline, append_to_log
+from hits import Hit
+from scoring import load_feedback_samples
+
+
+class SlowGateway:
+    """Session stand-in that answers after a delay, failing the first few calls"""
+
+    def __init__(self, delay=0.0, failures=0, reject_lists=False):
+        self.delay = delay
+        self.failures = failures
+        self.reject_lists = reject_lists
+        self.posted = []
+        self.lock = threading.Lock()
+
+    def post(self, url, json=None, timeout=None):
+        time.sleep(self.delay)
+        with self.lock:
+            self.posted.append(json)
+            status = 503 if len(self.posted) <= self.failures else 200
+            if self.reject_lists and isinstance(json, list):
+                status = 422
+        return type("Response", (), {"status_code": status, "text": ""})()
+
+
+def test_submit_does_not_wait_for_gateway():
+    """Test that a slow gateway doesn't block submit, and batches are stored then forwarded"""
+    print("🧪 Testing non-blocking submit...")
+
+    stored = []
+    gateway = SlowGateway(delay=0.2)
+    pipeline = FeedbackPipeline(
+        store=lambda records: stored.append(list(records)) or True,
+        forward=True,
+        batch_size=10,
+        flush_interval=0.05,
+        session_factory=lambda: gateway,
+    )
+
+    start = time.perf_counter()
+    for i in range(3):
+        assert pipeline.submit({"type": "feedback", "trace_id": f"t{i}", "value": 1})
+    pipeline.submit({"type": "retrieval", "trace_id": "t0", "hits": []})
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.05, f"submit blocked for {elapsed:.3f}s"
+
+    assert pipeline.flush(timeout=5)
+    assert sum(len(batch) for batch in stored) == 4
+    # One request for the whole batch, retrieval records aren't forwarded
+    assert [[body["trace_id"] for body in bodies] for bodies in gateway.posted] == [["t0", "t1", "t2"]]
+    stats = pipeline.stats()
+    assert stats["stored"] == 4 and stats["forwarded"] == 3 and stats["pending"] == 0
+    print(f"✅ 4 submits took {elapsed * 1000:.1f}ms with a 200ms gateway")
+
+
+def test_failures_and_full_queue():
+    """Test that gateway failures are counted and a full queue drops instead of blocking"""
+    print("🧪 Testing failures and backpressure...")
+
+    gateway = SlowGateway(failures=1)
+    pipeline = FeedbackPipeline(forward=True, flush_interval=0.01, session_factory=lambda: gateway, retry_interval=0.05)
+    pipeline.submit({"type": "feedback", "trace_id": "a", "value": -1})
+    pipeline.submit({"type": "feedback", "trace_id": "b", "value": 1})
+    assert pipeline.flush(timeout=5)
+    # The failed batch is kept and sent again without any new feedback arriving
+    deadline = time.monotonic() + 5
+    while pipeline.stats()["forwarded"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = pipeline.stats()
+    assert stats["forward_failed"] == 2 and stats["forwarded"] == 2 and stats["unsent"] == 0, stats
+    assert gateway.posted[0] == gateway.posted[1]
+
+    blocked = threading.Event()
+    pipeline = FeedbackPipeline(store=lambda records: blocked.wait(5), queue_size=1, batch_size=1, flush_interval=0)
+    pipeline.submit({"type": "feedback", "trace_id": "1", "value": 1})
+    time.sleep(0.05)  # forwarder is now stuck storing the first record
+    assert pipeline.submit({"type": "feedback", "trace_id": "2", "value": 1})
+    assert not pipeline.submit({"type": "feedback", "trace_id": "3", "value": 1})
+    assert pipeline.stats()["dropped"] == 1
+    blocked.set()
+    assert pipeline.flush(timeout=5)
+    print("✅ Failures counted and overflow dropped")
+
+
+def test_single_event_fallback():
+    """Test that a gateway rejecting lists gets one event per request, and bad events aren't retried"""
+    print("🧪 Testing per-event fallback...")
+
+    gateway = SlowGateway(reject_lists=True)
+    pipeline = FeedbackPipeline(forward=True, batch_size=10, flush_interval=0.05, session_factory=lambda: gateway)
+    for trace_id in ("a", "b"):
+        pipeline.submit({"type": "feedback", "trace_id": trace_id, "value": 1})
+    assert pipeline.flush(timeout=5)
+    assert [body["trace_id"] for body in gateway.posted[1:]] == ["a", "b"]
+    assert pipeline.stats()["forwarded"] == 2
+
+    # Later batches skip the list request altogether
+    posted = len(gateway.posted)
+    for trace_id in ("c", "d"):
+        pipeline.submit({"type": "feedback", "trace_id": trace_id, "value": 1})
+    assert pipeline.flush(timeout=5)
+    assert gateway.posted[posted:] == [{"trace_id": "c", "value": 1}, {"trace_id": "d", "value": 1}]
+    print("✅ Events sent one by one")
+
+
+def test_log_joins_into_calibration_samples():
+    """Test that the JSONL log joins feedback to retrieval scores for calibration"""
+    print("🧪 Testing feedback log -> calibration samples...")
+
+    hits = [Hit(id="a", score=12.0, name="a", page_content=""), Hit(id="b", score=3.0, name="b", page_content="")]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "feedback.jsonl")
+        append_to_log(path, [
+            {"type": "retrieval", "trace_id": "t1", "hits": [{"id": h.id, "score": h.score} for h in hits]},
+            {"type": "retrieval", "trace_id": "t2", "hits": [{"id": "c", "score": 1.0}]},
+            {"type": "feedback", "trace_id": "t1", "value": 1},
+        ])
+        append_to_log(path, [{"type": "feedback", "trace_id": "t2", "value": -1}])
+        with open(path) as handle:
+            assert len([json.loads(line) for line in handle]) == 4
+        scores, labels = load_feedback_samples(path)
+
+    assert sorted(zip(scores.tolist(), labels.tolist())) == [(1.0, 0), (3.0, 1), (12.0, 1)]
+    print("✅ Feedback joined to hit scores")
+
+
+if __name__ == "__main__":
+    test_submit_does_not_wait_for_gateway()
+    test_failures_and_full_queue()
+    test_single_event_fallback()
+    test_log_joins_into_calibration_samples()
+    print("\n🎉 All feedback tests passed!")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for hedged LLM streaming
+"""
+import os
+import sys
+import threading
+import time
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from hedging import hedged_stream, HedgeBudget, TTFTTracker
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+
+def make_streams(first_delay):
+    """Stream factory where the first stream waits `first_delay` seconds before its first token"""
+    calls = []
+
+    def make_stream():
+        attempt = len(calls)
+        calls.append(attempt)
+
+        def stream():
+            yield FakeChunk("")  # role chunk, no content
+            if attempt == 0:
+                time.sleep(first_delay)
+            for token in ["one ", "two ", "three"]:
+                yield FakeChunk(f"{token}")
+            yield FakeChunk(str(attempt))
+
+        return stream()
+
+    return make_stream, calls
+
+
+def test_hedge_wins_on_slow_primary():
+    """Test that a hedged stream takes over when the primary is slow"""
+    print("🧪 Testing hedge on slow first token...")
+
+    make_stream, calls = make_streams(first_delay=1.0)
+    budget = HedgeBudget(100)
+    tracker = TTFTTracker()
+
+    start = time.perf_counter()
+    content = "".join(c.content for c in hedged_stream(make_stream, 0.05, budget, tracker))
+    elapsed = time.perf_counter() - start
+
+    assert content == "one two three1", content
+    assert calls == [0, 1]
+    assert elapsed < 0.5, f"Hedge did not cut latency ({elapsed:.2f}s)"
+    assert budget.stats()["hedges"] == 1
+    assert len(tracker) == 1
+    # The sample is the primary's wait, not the faster hedge's own first token
+    assert tracker.percentile(50) >= 0.05
+    print(f"✅ Hedged stream won in {elapsed * 1000:.0f}ms")
+
+
+class BlockingStream:
+    """Stream object that blocks for its first chunk until it is closed, like an HTTP response"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed.wait(timeout=5):
+            raise StopIteration
+        return FakeChunk("too late")
+
+    def close(self):
+        self.closed.set()
+
+
+def test_losing_stream_closed():
+    """Test that the losing stream is closed when the hedge wins, not when it next produces a chunk"""
+    print("🧪 Testing cancellation of the losing stream...")
+
+    primary = BlockingStream()
+    streams = [primary, iter([FakeChunk("fast")])]
+    content = "".join(c.content for c in hedged_stream(lambda: streams.pop(0), 0.05, HedgeBudget(100), TTFTTracker()))
+
+    assert content == "fast", content
+    assert primary.closed.wait(timeout=0.5), "Losing stream still open"
+    print("✅ Losing stream closed")
+
+
+def test_hedge_budget_exhausted():
+    """Test that no hedge is started once the budget is spent"""
+    print("🧪 Testing hedge budget...")
+
+    make_stream, calls = make_streams(first_delay=0.2)
+    budget = HedgeBudget(0, min_tokens=0)
+
+    content = "".join(c.content for c in hedged_stream(make_stream, 0.05, budget, TTFTTracker()))
+
+    assert content == "one two three0", content
+    assert calls == [0]
+    assert budget.stats()["hedge_rate"] == 0.0
+    print("✅ Primary stream used without hedging")
+
+
+def test_errors_propagate():
+    """Test that a failure before the first token reaches the caller's retry logic"""
+    print("🧪 Testing error propagation...")
+
+    def make_stream():
+        def stream():
+            raise ConnectionError("connection reset")
+            yield
+
+        return stream()
+
+    try:
+        list(hedged_stream(make_stream, 0.05, HedgeBudget(100), TTFTTracker()))
+    except ConnectionError:
+        print("✅ Connection error propagated")
+        return
+    raise AssertionError("Expected ConnectionError")
+
+
+if __name__ == "__main__":
+    test_hedge_wins_on_slow_primary()
+    test_losing_stream_closed()
+    test_hedge_budget_exhausted()
+    test_errors_propagate()
+    print("\n🎉 All hedging tests passed!")
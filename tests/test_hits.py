@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for the compact hit record used by retrieval
+"""
+import os
+import sys
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from hits import Hit, HIT_SOURCE_FIELDS
+from jinja2 import Environment
+from templates import prompt
+
+
+def test_hit_from_es_hit():
+    """Test that a raw ES hit is reduced to the fields downstream code uses"""
+    print("🧪 Testing Hit.from_es_hit...")
+
+    raw = {
+        "_id": "doc-1",
+        "_score": 12.5,
+        "_source": {
+            "name": "NDA Template.docx",
+            "Title": "NDA Template",
+            "body": "This agreement is made between...",
+            "webUrl": "https://example.sharepoint.com/nda",
+            "lastModifiedDateTime": "2024-01-01T00:00:00Z",
+            "parentReference": {"path": "/drives/legal"},
+        },
+    }
+    hit = Hit.from_es_hit(raw)
+
+    assert hit.id == "doc-1"
+    assert hit.score == 12.5
+    assert hit.display_name == "NDA Template"
+    assert hit.page_content == "This agreement is made between..."
+    assert hit.category == "sharepoint"
+    assert hit.summary is None
+    assert not hasattr(hit, "__dict__"), "Hit should not carry a per-instance dict"
+    assert hit.content_hash == Hit.from_es_hit(dict(raw, _id="copy")).content_hash, \
+        "Identical content should share a content hash"
+    assert "body" in HIT_SOURCE_FIELDS and "summary" in HIT_SOURCE_FIELDS
+
+    # Content falls back through the same field order as before
+    fallback = Hit.from_es_hit({"_id": "doc-2", "_score": 1.0, "_source": {"Description": "desc"}})
+    assert fallback.page_content == "desc"
+    assert fallback.display_name == "Unknown Document"
+    print("✅ Hit fields extracted correctly")
+
+
+def test_hit_renders_in_rag_template():
+    """Test that prompt templates still render with Hit records"""
+    print("🧪 Testing rag_template rendering with Hit records...")
+
+    hit = Hit(id="doc-1", score=3.0, name="Policy.pdf", page_content="Passage text")
+    rendered = Environment().from_string(prompt.rag_template).render(
+        question="What is the policy?", docs=[hit], chat_history=[]
+    )
+
+    assert "NAME: Policy.pdf" in rendered
+    assert "Passage text" in rendered
+    print("✅ Template rendered correctly")
+
+
+if __name__ == "__main__":
+    test_hit_from_es_hit()
+    test_hit_renders_in_rag_template()
+    print("\n🎉 All hit record tests passed!")
@@ -10,6 +10,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
 
 from elasticsearch_client import elasticsearch_client
 from chat import bm25_query
+from scoring import heuristic_confidences
 import json
 
 INDEX = os.getenv("ES_INDEX", "ccc-db")
@@ -46,35 +47,11 @@ def test_improved_search():
             # Test confidence scoring logic
             if hits:
                 print("🎯 Confidence scores:")
+                confidences = heuristic_confidences([hit.get('_score', 0) for hit in hits])
                 for i, hit in enumerate(hits[:3]):  # Show top 3
                     score = hit.get('_score', 0)
                     doc_name = hit['_source'].get('name', 'Unknown')
-                    
-                    # Apply same confidence logic as in chat.py
-                    HIGH_RELEVANCE_THRESHOLD = 10.0
-                    MED_RELEVANCE_THRESHOLD = 5.0
-                    LOW_RELEVANCE_THRESHOLD = 2.0
-                    
-                    if score >= HIGH_RELEVANCE_THRESHOLD:
-                        base_confidence = 0.8
-                        confidence_range = 20
-                    elif score >= MED_RELEVANCE_THRESHOLD:
-                        base_confidence = 0.5
-                        confidence_range = 30
-                    elif score >= LOW_RELEVANCE_THRESHOLD:
-                        base_confidence = 0.3
-                        confidence_range = 20
-                    else:
-                        base_confidence = 0.1
-                        confidence_range = 20
-                    
-                    max_score = hits[0].get('_score', 1)
-                    relative_score = (score / max_score) ** 0.5 if max_score > 0 else 0
-                    position_factor = 1.0 - (i * 0.08)
-                    
-                    confidence = int(base_confidence * 100 + 
-                                   relative_score * position_factor * confidence_range)
-                    confidence = min(100, max(10, confidence))
+                    confidence = confidences[i]
                     
                     print(f"   {i+1}. {doc_name[:50]}... (Score: {score:.2f}, Confidence: {confidence}%)")
             
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Test script for the bulk indexing document sources
+"""
+import os
+import sys
+import json
+import tempfile
+from unittest import mock
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+import elasticsearch_client
+from data import index_data
+from data.index_data import read_path, bulk_actions, plan_sync, parse_timestamp
+from content import content_hash
+
+
+class FakeES:
+    """Versioned indices held in memory: {index: {doc_id: source}}, read through aliases"""
+
+    def __init__(self, indices, aliases):
+        self.data = indices
+        self.aliases = aliases
+        self.indices = mock.MagicMock()
+
+    def mget(self, index, body, _source=None):
+        docs = self.data[self.aliases.get(index, [index])[-1]]
+        return {"docs": [
+            {"_id": doc_id, "found": True, "_source": docs[doc_id]} if doc_id in docs else {"_id": doc_id, "found": False}
+            for doc_id in body["ids"]
+        ]}
+
+
+def fake_parallel_bulk(written):
+    def parallel_bulk(es, actions, **kwargs):
+        for action in actions:
+            written.append(action)
+            yield True, {}
+    return parallel_bulk
+
+
+def test_read_directory_source():
+    """Test that JSONL, JSON and text files in a directory are all streamed"""
+    print("🧪 Testing directory document source...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "docs.jsonl"), "w") as f:
+            f.write(json.dumps({"id": "a", "name": "A.docx", "body": "alpha"}) + "\n")
+            f.write("\n")
+            f.write(json.dumps({"_id": "b", "name": "B.docx", "body": "beta"}) + "\n")
+        with open(os.path.join(tmp, "more.json"), "w") as f:
+            json.dump([{"name": "C.pdf", "body": "gamma"}], f)
+        with open(os.path.join(tmp, "notes.txt"), "w") as f:
+            f.write("plain text notes")
+        with open(os.path.join(tmp, "image.png"), "wb") as f:
+            f.write(b"\x89PNG")
+
+        docs = list(read_path(tmp))
+
+    names = sorted(doc["name"] for doc in docs)
+    assert names == ["A.docx", "B.docx", "C.pdf", "notes.txt"], names
+    text_doc = next(doc for doc in docs if doc["name"] == "notes.txt")
+    assert text_doc["body"] == "plain text notes"
+    assert text_doc["lastModifiedDateTime"]
+    print(f"✅ Read {len(docs)} documents, skipped unsupported files")
+
+    actions = list(bulk_actions("ccc-db", docs))
+    ids = [action["_id"] for action in actions]
+    assert "a" in ids and "b" in ids
+    assert all("_id" not in action["_source"] for action in actions)
+
+    # Documents without an id get a stable content hash so reloads don't duplicate
+    again = list(bulk_actions("ccc-db", [{"name": "C.pdf", "body": "gamma"}]))
+    c_action = next(action for action in actions if action["_source"]["name"] == "C.pdf")
+    assert again[0]["_id"] == c_action["_id"]
+    print("✅ Bulk actions carry stable document ids")
+
+
+def test_plan_sync():
+    """Test that only new or changed documents are written and summaries survive metadata edits"""
+    print("🧪 Testing incremental sync planning...")
+
+    unchanged = {"id": "same", "name": "Same.docx", "body": "same body", "lastModifiedDateTime": "2024-01-01T00:00:00Z"}
+    touched = {"id": "meta", "name": "Renamed.docx", "body": "meta body", "lastModifiedDateTime": "2024-03-01T00:00:00Z"}
+    edited = {"id": "edit", "name": "Edit.docx", "body": "new body", "lastModifiedDateTime": "2024-03-02T00:00:00Z"}
+    created = {"id": "new", "name": "New.docx", "body": "fresh", "lastModifiedDateTime": "2024-03-03T00:00:00Z"}
+
+    stored = {
+        "same": (content_hash(unchanged), unchanged["lastModifiedDateTime"]),
+        "meta": (content_hash(touched), "2024-01-15T00:00:00Z"),
+        "edit": (content_hash({"body": "old body"}), "2024-01-15T00:00:00Z"),
+    }
+    requested = []
+
+    def existing_versions_for(ids):
+        requested.extend(ids)
+        return {doc_id: stored[doc_id] for doc_id in ids if doc_id in stored}
+
+    plan = plan_sync(
+        [dict(unchanged), dict(touched), dict(edited), dict(created)],
+        parse_timestamp("2024-02-01T00:00:00Z"),
+        existing_versions_for,
+    )
+
+    assert sorted(requested) == ["edit", "meta", "new"], "Documents before the watermark should be skipped"
+    assert (plan["added"], plan["changed"], plan["metadata_only"]) == (1, 1, 1)
+    ops = {action["_id"]: action["_op_type"] for action in plan["actions"]}
+    assert ops == {"meta": "update", "edit": "index", "new": "index"}, ops
+    assert plan["seen_ids"] == {"same", "meta", "edit", "new"}
+    assert plan["new_watermark"] == parse_timestamp("2024-03-03T00:00:00Z")
+    print("✅ Sync plan writes only the delta")
+
+    # Whitespace-only edits hash the same and don't invalidate the summary
+    assert content_hash({"body": "Same  body\n"}) == content_hash({"body": "same body"})
+    print("✅ Content hash ignores formatting-only changes")
+
+
+def test_sync_after_rollback():
+    """Test that the watermark of one index version isn't applied to another after a rollback"""
+    print("🧪 Testing sync after rollback...")
+
+    old = {"name": "A.docx", "body": "old body", "lastModifiedDateTime": "2024-01-01T00:00:00Z"}
+    old["content_hash"] = content_hash(old)
+    alias = {"ccc-db": ["ccc-db-v2"]}
+    es = FakeES({"ccc-db-v1": {"a": dict(old)}, "ccc-db-v2": {"a": dict(old)}}, alias)
+    edited = {"id": "a", "name": "A.docx", "body": "new body", "lastModifiedDateTime": "2024-03-01T00:00:00Z"}
+    written = []
+
+    def swap(name, new_index, remove_index=None):
+        alias[name] = [new_index]
+        return True
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch.object(index_data, "get_elasticsearch_client", return_value=es), \
+            mock.patch.object(index_data, "get_alias_indices", side_effect=lambda name: alias[name]), \
+            mock.patch.object(index_data, "list_index_versions",
+                              return_value=[(1, "ccc-db-v1"), (2, "ccc-db-v2")]), \
+            mock.patch.object(index_data, "swap_alias", side_effect=swap), \
+            mock.patch("elasticsearch.helpers.parallel_bulk", fake_parallel_bulk(written)):
+        path = os.path.join(tmp, "checkpoint.json")
+
+        stats = index_data.sync_index("ccc-db", [dict(edited)], delete_missing=False, checkpoint_path=path)
+        assert stats["changed"] == 1
+        es.data["ccc-db-v2"]["a"] = written[-1]["_source"]
+        assert index_data.load_checkpoint("ccc-db-v2", path)["watermark"].startswith("2024-03-01")
+
+        # A second sync of v2 skips the document, it's behind the watermark
+        stats = index_data.sync_index("ccc-db", [dict(edited)], delete_missing=False, checkpoint_path=path)
+        assert (stats["changed"], stats["unchanged"]) == (0, 0)
+
+        assert index_data.rollback_index("ccc-db", checkpoint_path=path) == "ccc-db-v1"
+        assert index_data.load_checkpoint("ccc-db-v1", path) == {}
+
+        # v1 never got the edit, so the sync must compare it again instead of skipping it
+        written.clear()
+        stats = index_data.sync_index("ccc-db", [dict(edited)], delete_missing=False, checkpoint_path=path)
+        assert stats["changed"] == 1, stats
+        assert [(action["_index"], action["_id"]) for action in written] == [("ccc-db", "a")]
+        assert index_data.load_checkpoint("ccc-db-v1", path)["watermark"].startswith("2024-03-01")
+    print("✅ Rolled-back index synced from a full compare")
+
+
+def test_swap_alias_actions():
+    """Test that the alias moves in one update_aliases call, dropping a plain index when asked"""
+    print("🧪 Testing atomic alias swap...")
+
+    es = mock.MagicMock()
+    es.indices.exists_alias.return_value = True
+    es.indices.get_alias.return_value = {"ccc-db-v2": {}, "ccc-db-v1": {}}
+    with mock.patch.object(elasticsearch_client, "get_elasticsearch_client", return_value=es):
+        assert elasticsearch_client.swap_alias("ccc-db", "ccc-db-v3")
+        actions = es.indices.update_aliases.call_args.kwargs["body"]["actions"]
+        assert actions == [
+            {"remove": {"index": "ccc-db-v1", "alias": "ccc-db"}},
+            {"remove": {"index": "ccc-db-v2", "alias": "ccc-db"}},
+            {"add": {"index": "ccc-db-v3", "alias": "ccc-db", "is_write_index": True}},
+        ], actions
+
+        # Replacing a plain index that has the alias's name
+        es.indices.exists_alias.return_value = False
+        assert elasticsearch_client.swap_alias("ccc-db", "ccc-db-v1", remove_index="ccc-db")
+        actions = es.indices.update_aliases.call_args.kwargs["body"]["actions"]
+        assert actions == [
+            {"remove_index": {"index": "ccc-db"}},
+            {"add": {"index": "ccc-db-v1", "alias": "ccc-db", "is_write_index": True}},
+        ], actions
+
+        es.indices.update_aliases.side_effect = RuntimeError("conflict")
+        assert not elasticsearch_client.swap_alias("ccc-db", "ccc-db-v4")
+    print("✅ Alias swapped in one request")
+
+
+def test_rollback_without_previous_version():
+    """Test that rollback refuses to move the alias when there's nothing older"""
+    print("🧪 Testing rollback with a single version...")
+
+    swap = mock.MagicMock(return_value=True)
+    with mock.patch.object(index_data, "get_alias_indices", return_value=["ccc-db-v1"]), \
+            mock.patch.object(index_data, "list_index_versions", return_value=[(1, "ccc-db-v1")]), \
+            mock.patch.object(index_data, "swap_alias", swap):
+        try:
+            index_data.rollback_index("ccc-db")
+            assert False, "rollback without an older version"
+        except RuntimeError as e:
+            assert "No older version" in str(e)
+    with mock.patch.object(index_data, "get_alias_indices", return_value=["ccc-db"]), \
+            mock.patch.object(index_data, "list_index_versions", return_value=[]), \
+            mock.patch.object(index_data, "swap_alias", swap):
+        try:
+            index_data.rollback_index("ccc-db")
+            assert False, "rollback of an unversioned index"
+        except RuntimeError as e:
+            assert "doesn't point to a versioned index" in str(e)
+    assert not swap.called
+    print("✅ Rollback refused")
+
+
+def test_prune_keeps_live_and_previous():
+    """Test that pruning deletes only versions older than the live one and the ones kept"""
+    print("🧪 Testing old version pruning...")
+
+    es = mock.MagicMock()
+    versions = [(version, f"ccc-db-v{version}") for version in range(1, 6)]
+    with mock.patch.object(index_data, "get_elasticsearch_client", return_value=es), \
+            mock.patch.object(index_data, "get_alias_indices", return_value=["ccc-db-v5"]), \
+            mock.patch.object(index_data, "list_index_versions", return_value=versions):
+        index_data.prune_old_versions("ccc-db", keep=1)
+        deleted = [call.kwargs["index"] for call in es.indices.delete.call_args_list]
+        assert deleted == ["ccc-db-v1", "ccc-db-v2", "ccc-db-v3"], deleted
+
+        # After a rollback the live index is older than the newest, which is kept too
+        es.reset_mock()
+        with mock.patch.object(index_data, "get_alias_indices", return_value=["ccc-db-v4"]):
+            index_data.prune_old_versions("ccc-db", keep=2)
+        deleted = [call.kwargs["index"] for call in es.indices.delete.call_args_list]
+        assert deleted == ["ccc-db-v1", "ccc-db-v2"], deleted
+    print("✅ Live and previous versions kept")
+
+
+def test_copy_summaries_content_hash_guard():
+    """Test that summaries are copied only onto documents with the same content hash"""
+    print("🧪 Testing summary carry-over...")
+
+    hits = [
+        {"_id": "a", "_source": {"summary": "Summary A", "content_hash": "hash-a"}},
+        {"_id": "b", "_source": {"summary": "Summary B"}},
+    ]
+    written = []
+
+    def parallel_bulk(es, actions, **kwargs):
+        for action in actions:
+            written.append(action)
+            # Target document "a" has changed content, so the script is a noop
+            yield True, {"update": {"result": "noop" if action["_id"] == "a" else "updated"}}
+
+    with mock.patch.object(index_data, "get_elasticsearch_client", return_value=mock.MagicMock()), \
+            mock.patch("elasticsearch.helpers.scan", return_value=iter(hits)), \
+            mock.patch("elasticsearch.helpers.parallel_bulk", parallel_bulk):
+        copied = index_data.copy_summaries("ccc-db-v1", "ccc-db-v2")
+
+    assert copied == 1
+    assert [action["_index"] for action in written] == ["ccc-db-v2", "ccc-db-v2"]
+    script = written[0]["script"]
+    assert "ctx._source.content_hash == params.content_hash" in script["source"]
+    assert "ctx.op = 'noop'" in script["source"]
+    assert script["params"] == {"summary": "Summary A", "content_hash": "hash-a"}
+    # Documents indexed before content hashes existed keep their summary
+    assert written[1]["script"]["params"]["content_hash"] is None
+    print("✅ Summaries copied only for unchanged content")
+
+
+if __name__ == "__main__":
+    test_read_directory_source()
+    test_plan_sync()
+    test_sync_after_rollback()
+    test_swap_alias_actions()
+    test_rollback_without_previous_version()
+    test_prune_keeps_live_and_previous()
+    test_copy_summaries_content_hash_guard()
+    print("\n🎉 All index data tests passed!")
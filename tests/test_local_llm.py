@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the OpenAI-compatible local stand-in LLM server
+"""
+import os
+import sys
+import json
+import threading
+import urllib.request
+from unittest import mock
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+import llm_integrations
+from local_llm import create_server, LOCAL_LLM_RESPONSE
+
+
+class FakeChatModel:
+    """Chat model stand-in with an OpenAI-style root client"""
+
+    def __init__(self, calls):
+        self.calls = calls
+        self.root_client = mock.MagicMock()
+        self.root_client.models.list.side_effect = lambda: calls.append("models")
+
+    def invoke(self, prompt):
+        self.calls.append("completion")
+
+
+def _post(url, payload):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    return urllib.request.urlopen(request, timeout=5)
+
+
+def test_local_llm_server():
+    """Test non-streaming and streaming chat completions"""
+    print("🧪 Testing local stand-in LLM server...")
+
+    server = create_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    try:
+        messages = [{"role": "user", "content": "hello there"}]
+
+        with _post(f"{base_url}/chat/completions", {"model": "local", "messages": messages}) as response:
+            body = json.loads(response.read())
+        assert body["choices"][0]["message"]["content"] == LOCAL_LLM_RESPONSE
+        assert body["usage"]["prompt_tokens"] == 2
+        print("✅ Non-streaming completion returned")
+
+        payload = {
+            "model": "local",
+            "messages": messages,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        with _post(f"{base_url}/chat/completions", payload) as response:
+            lines = [line.decode("utf-8").strip() for line in response if line.strip()]
+
+        assert lines[-1] == "data: [DONE]"
+        chunks = [json.loads(line[len("data: "):]) for line in lines[:-1]]
+        content = "".join(
+            choice["delta"].get("content", "")
+            for chunk in chunks
+            for choice in chunk["choices"]
+        )
+        assert content == LOCAL_LLM_RESPONSE
+        assert "usage" in chunks[-1]
+        print(f"✅ Streaming completion returned {len(chunks)} chunks")
+
+        with urllib.request.urlopen(f"{base_url}/models", timeout=5) as response:
+            assert json.loads(response.read())["data"][0]["id"] == "local"
+        print("✅ Models endpoint available for health checks")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_llm_health_check():
+    """Test that health checks list models instead of paying for completions, and are cached"""
+    print("🧪 Testing LLM health checks...")
+
+    calls = []
+    roles = {role: dict(settings, type="fake") for role, settings in llm_integrations.LLM_ROLES.items()}
+    with mock.patch.dict(llm_integrations.LLM_ROLES, roles), \
+            mock.patch.dict(llm_integrations.MAP_LLM_TYPE_TO_CHAT_MODEL, {"fake": lambda **kwargs: FakeChatModel(calls)}), \
+            mock.patch.dict(llm_integrations._llm_cache, clear=True), \
+            mock.patch.dict(llm_integrations._health_cache, clear=True):
+        results = llm_integrations.check_llm_health()
+        assert all(result["ok"] for result in results.values()), results
+        assert calls == ["models"] * len(roles), calls
+
+        # Repeated hits within the TTL don't reach the provider
+        assert llm_integrations.check_llm_health() == results
+        assert len(calls) == len(roles)
+
+        # Warm-up always opens connections, still without a completion
+        llm_integrations.warm_up_llms()
+        assert calls == ["models"] * 2 * len(roles), calls
+    print("✅ Health checks cost no tokens")
+
+
+if __name__ == "__main__":
+    test_local_llm_server()
+    test_llm_health_check()
+    print("\n🎉 All local LLM tests passed!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for map-reduce summarization of long documents
+"""
+import asyncio
+import os
+import sys
+import time
+from unittest import mock
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+import chat
+from tokens import count_tokens
+
+
+class CountingLLM:
+    """Summary model stand-in that tracks concurrency and reports token usage"""
+
+    def __init__(self, fail_parts=(), slow_parts=()):
+        self.fail_parts = fail_parts
+        self.slow_parts = slow_parts
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        slow = any(f"part {part} of" in prompt for part in self.slow_parts)
+        await asyncio.sleep(5 if slow else 0.01)
+        self.active -= 1
+        if any(f"part {part} of" in prompt for part in self.fail_parts):
+            raise TimeoutError("chunk timed out")
+        content = "Combined summary" if "PART 1:" in prompt else "Chunk summary"
+        return type("Message", (), {"content": content, "usage_metadata": {"input_tokens": 10, "output_tokens": 2}})()
+
+
+def summarize(text, llm):
+    usage = chat.new_summary_usage()
+    with mock.patch.object(chat, "get_llm", lambda **kwargs: llm):
+        return asyncio.run(chat.generate_doc_summary(text, "trace", usage)), usage
+
+
+def test_short_document_single_call():
+    """Test that documents under the threshold still take one call"""
+    print("🧪 Testing short document path...")
+
+    llm = CountingLLM()
+    summary, usage = summarize("A short memo. " * 50, llm)
+    assert summary == "Chunk summary" and len(llm.prompts) == 1
+    assert usage == {"calls": 1, "input_tokens": 10, "output_tokens": 2}
+    print("✅ Single call")
+
+
+def test_long_document_map_reduce():
+    """Test chunking, the chunk cap, bounded concurrency and failed chunks"""
+    print("🧪 Testing map-reduce path...")
+
+    text = "The lease requires notice of default within thirty days. " * 8000
+    assert count_tokens(text) > chat.SUMMARY_MAX_INPUT_TOKENS
+
+    llm = CountingLLM()
+    summary, usage = summarize(text, llm)
+    map_calls = len(llm.prompts) - 1
+    assert summary == "Combined summary"
+    assert map_calls == chat.SUMMARY_MAX_CHUNKS, map_calls
+    assert llm.peak <= chat.SUMMARY_MAP_CONCURRENCY
+    assert usage["calls"] == map_calls + 1 and usage["input_tokens"] == 10 * usage["calls"]
+
+    llm = CountingLLM(fail_parts=(1, 2))
+    summary, _ = summarize(text, llm)
+    assert summary == "Combined summary"
+    assert llm.prompts[-1].count("PART ") == chat.SUMMARY_MAX_CHUNKS - 2
+    print(f"✅ {map_calls} chunk calls, peak concurrency {llm.peak}")
+
+
+def test_map_reduce_deadline():
+    """Test that slow chunks can't hold a summary past SUMMARY_DEADLINE"""
+    print("🧪 Testing map-reduce deadline...")
+
+    text = "The lease requires notice of default within thirty days. " * 8000
+    with mock.patch.object(chat, "SUMMARY_DEADLINE", 0.3):
+        llm = CountingLLM(slow_parts=(2, 3))
+        start = time.perf_counter()
+        summary, _ = summarize(text, llm)
+        elapsed = time.perf_counter() - start
+        assert summary == "Combined summary"
+        assert llm.prompts[-1].count("PART ") == chat.SUMMARY_MAX_CHUNKS - 2
+        assert elapsed < 1.0, elapsed
+
+        llm = CountingLLM(slow_parts=range(1, chat.SUMMARY_MAX_CHUNKS + 1))
+        start = time.perf_counter()
+        try:
+            summarize(text, llm)
+            assert False, "expected the summary to fail"
+        except RuntimeError as e:
+            assert "deadline" in str(e)
+        assert time.perf_counter() - start < 1.0
+    print(f"✅ Slow chunks cut off after {elapsed:.2f}s")
+
+
+def test_select_chunks():
+    """Test that capped chunk selection spans the whole document"""
+    print("🧪 Testing select_chunks...")
+
+    chunks = list(range(20))
+    assert chat.select_chunks(chunks, 4) == [0, 5, 10, 15]
+    assert chat.select_chunks(chunks[:3], 4) == [0, 1, 2]
+    print("✅ Chunks spread across the document")
+
+
+if __name__ == "__main__":
+    test_short_document_single_call()
+    test_long_document_map_reduce()
+    test_map_reduce_deadline()
+    test_select_chunks()
+    print("\n🎉 All long summary tests passed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled answer prompt builder
+"""
+import os
+import sys
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from jinja2 import Environment
+
+from hits import Hit
+from prompt_builder import PassageCache, build_rag_prompt
+from templates import prompt
+from tokens import count_tokens
+
+
+class Turn:
+    def __init__(self, type, content):
+        self.type = type
+        self.content = content
+
+
+DOCS = [
+    Hit(id="doc-1", score=3.0, name="Evictions", page_content="Notice must be given in writing.",
+        updated_at="2024-05-01T00:00:00Z"),
+    # Looks like a Python literal, which NativeEnvironment would have evaluated
+    Hit(id="doc-2", score=2.0, name="Rent table", page_content="[1, 2, 3]"),
+]
+HISTORY = [Turn("human", "Can I be evicted?"), Turn("ai", "Only with notice."), Turn("system", "ignored")]
+
+
+def test_matches_jinja_templates():
+    """Test that the builder produces exactly what the Jinja templates render"""
+    print("🧪 Testing builder output...")
+
+    for cache_layout, name in ((True, "rag_cached_template"), (False, "rag_template")):
+        expected = Environment().from_string(getattr(prompt, name)).render(
+            question="How much notice?", docs=DOCS, chat_history=HISTORY
+        )
+        built = build_rag_prompt("How much notice?", DOCS, HISTORY, cache_layout, cache=PassageCache())
+        assert built.text == expected, name
+        assert abs(built.tokens - count_tokens(expected)) <= built.segments
+    assert build_rag_prompt("Q", [], [], cache=PassageCache()).text.endswith("Chat history:\nQuestion: Q\nResponse:")
+    print("✅ Same text as rag_template and rag_cached_template")
+
+
+def test_passage_cache():
+    """Test that passage blocks are reused until the document's modification date changes"""
+    print("🧪 Testing passage cache...")
+
+    cache = PassageCache(max_size=2)
+    build_rag_prompt("First?", DOCS, [], cache=cache)
+    build_rag_prompt("Second?", DOCS, HISTORY, cache=cache)
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"]) == (2, 2, 2)
+    assert stats["chars"] == sum(len(block) for block, _ in (cache.get(doc) for doc in DOCS))
+    assert stats["bytes"] >= stats["chars"]
+
+    edited = Hit(id="doc-1", score=3.0, name="Evictions", page_content="Notice must be given 30 days ahead.",
+                 updated_at="2024-06-01T00:00:00Z")
+    built = build_rag_prompt("Third?", [edited], [], cache=cache)
+    assert "30 days ahead" in built.text
+    assert cache.stats()["misses"] == 3 and cache.stats()["size"] == 2
+    print("✅ Blocks cached per document version")
+
+
+def test_passage_cache_memory_bound():
+    """Test that total cached characters stay bounded and huge blocks are not cached"""
+    print("🧪 Testing passage cache size limits...")
+
+    cache = PassageCache(max_size=100, max_chars=3000, max_block_chars=2000)
+    docs = [Hit(id=f"doc-{i}", score=1.0, name=f"Doc {i}", page_content="x" * 900) for i in range(5)]
+    for doc in docs:
+        cache.get(doc)
+    assert cache.stats()["chars"] <= 3000 and cache.stats()["size"] == 3
+
+    huge = Hit(id="huge", score=1.0, name="Huge", page_content="y" * 5000)
+    block, tokens = cache.get(huge)
+    assert "y" * 5000 in block and tokens > 0
+    assert cache.stats()["size"] == 3 and cache.stats()["chars"] <= 3000
+    print("✅ Cache bounded by size")
+
+
+if __name__ == "__main__":
+    test_matches_jinja_templates()
+    test_passage_cache()
+    test_passage_cache_memory_bound()
+    print("\n🎉 All prompt builder tests passed!")
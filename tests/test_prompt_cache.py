@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the cache-friendly answer prompt layout
+"""
+import os
+import sys
+from unittest import mock
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+import chat
+from hits import Hit
+
+
+def make_hit(doc_id, name):
+    return Hit.from_es_hit({
+        "_id": doc_id,
+        "_score": 1.0,
+        "_source": {"name": name, "body": f"Passage text of {name}.", "url": f"https://example.org/{doc_id}"},
+    })
+
+
+class Turn:
+    def __init__(self, type, content):
+        self.type = type
+        self.content = content
+
+
+def common_prefix(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def test_cache_layout_shares_prefix():
+    """Test that the question goes last and passages are ordered by ID, not rank"""
+    print("🧪 Testing cache-friendly prompt layout...")
+
+    docs = [make_hit("doc-b", "Tenancy"), make_hit("doc-a", "Evictions")]
+    history = [Turn("human", "Can I be evicted?"), Turn("ai", "Only with notice.")]
+    with mock.patch.object(chat, "PROMPT_CACHE_LAYOUT", True):
+        first = chat.render_qa_prompt("How much notice?", docs, history).text
+        follow_up = chat.render_qa_prompt("What if I pay late?", list(reversed(docs)), history).text
+
+    assert first.index("NAME: Evictions") < first.index("NAME: Tenancy")
+    assert first.index("Chat history:") < first.rindex("Question: How much notice?")
+    assert "How much notice?" not in first[:first.index("Chat history:")]
+    # Everything up to the new question is shared
+    assert common_prefix(first, follow_up) >= first.rindex("Question: How much notice?")
+
+    with mock.patch.object(chat, "PROMPT_CACHE_LAYOUT", False):
+        legacy = chat.render_qa_prompt("How much notice?", docs, history).text
+    assert legacy.index("User question: How much notice?") < legacy.index("NAME: Tenancy") < legacy.index("NAME: Evictions")
+    print("✅ Stable prefix")
+
+
+def test_answer_usage():
+    """Test that cached prompt tokens from stream_usage metadata are counted"""
+    print("🧪 Testing answer usage counts...")
+
+    before = chat.answer_usage_stats()
+    call = chat.record_answer_usage({
+        "input_tokens": 2000,
+        "output_tokens": 150,
+        "input_token_details": {"cache_read": 1792},
+    })
+    assert call == {"calls": 1, "input_tokens": 2000, "cached_tokens": 1792, "output_tokens": 150}
+    assert chat.record_answer_usage({"input_tokens": 10})["cached_tokens"] == 0
+    after = chat.answer_usage_stats()
+    assert after["calls"] - before["calls"] == 2
+    assert after["cached_tokens"] - before["cached_tokens"] == 1792
+    print("✅ Cached tokens counted")
+
+
+if __name__ == "__main__":
+    test_cache_layout_shares_prefix()
+    test_answer_usage()
+    print("\n🎉 All prompt cache tests passed!")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for routing navigational queries around the LLM
+"""
+import json
+import os
+import sys
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from hits import Hit
+from router import looks_navigational, navigational_hits, title_coverage, title_query
+import chat
+
+
+def make_hit(doc_id, score, name, title=None):
+    return Hit(id=doc_id, score=score, name=name, title=title, page_content=f"Body of {name}.",
+               url=f"https://example.org/{doc_id}")
+
+
+class FakeHistory:
+    def __init__(self):
+        self.messages = []
+
+    def add_user_message(self, text):
+        self.messages.append(("human", text))
+
+    def add_ai_message(self, text):
+        self.messages.append(("ai", text))
+
+
+def test_pre_check():
+    """Test that only short lookups reach the title search"""
+    print("🧪 Testing navigational pre-check...")
+
+    assert looks_navigational("NDA template")
+    assert looks_navigational("  employee handbook 2024 ")
+    assert not looks_navigational("How do I sign an NDA?")
+    assert not looks_navigational("what is the NDA template")
+    assert not looks_navigational("NDA template for contractors working abroad in the EU region")
+    assert not looks_navigational("the")
+    assert title_query("NDA template")["size"] == 6
+    print("✅ Pre-check")
+
+
+def test_navigational_hits():
+    """Test title coverage and score bands decide between routing and the LLM"""
+    print("🧪 Testing navigational matches...")
+
+    nda = make_hit("1", 18.0, "NDA_Template-v2.docx")
+    nda_short = make_hit("2", 15.0, "Short form NDA template.docx")
+    policy = make_hit("3", 12.0, "Privacy policy.pdf", title="Privacy policy")
+    assert title_coverage("NDA template", nda) == 1.0
+    assert title_coverage("NDA template", policy) == 0.0
+
+    assert navigational_hits("NDA template", [nda, nda_short, policy]) == [nda, nda_short]
+    # Weak title scores fall out of the high band
+    assert navigational_hits("NDA template", [make_hit("4", 4.0, "NDA template.docx")]) == []
+    # A body-only best hit means the title match isn't what the user wants
+    assert navigational_hits("NDA template", [policy, nda]) == []
+    assert navigational_hits("NDA template", []) == []
+    print("✅ Matches")
+
+
+def test_navigational_response():
+    """Test that the reply uses the chat SSE protocol and is stored in history"""
+    print("🧪 Testing navigational response...")
+
+    docs = [make_hit("1", 18.0, "NDA_Template-v2.docx", title="NDA template")]
+    history = FakeHistory()
+    events = list(chat.navigational_response("NDA template", docs, history))
+
+    source = json.loads(events[0][len(f"data: {chat.SOURCE_TAG} "):])
+    assert source["id"] == "1" and source["name"] == "NDA template" and source["summary_url"]
+    assert events[1].startswith("data: These documents match") and "SOURCES: NDA template" in events[1]
+    assert events[-1] == f"data: {chat.DONE_TAG}\n\n"
+    assert history.messages[0] == ("human", "NDA template")
+    assert history.messages[1][1].endswith("SOURCES: NDA template")
+    print("✅ Response")
+
+
+if __name__ == "__main__":
+    test_pre_check()
+    test_navigational_hits()
+    test_navigational_response()
+    print("\n🎉 All router tests passed!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for batch confidence scoring and calibration
+"""
+import json
+import os
+import sys
+import tempfile
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+import numpy as np
+from scoring import (
+    ConfidenceScorer,
+    IsotonicCalibrator,
+    PlattCalibrator,
+    fit_calibrator,
+    heuristic_confidences,
+    load_feedback_samples,
+    prune_hits,
+)
+from hits import Hit
+
+
+def reference_confidence(scores):
+    """The per-hit loop the API used before batch scoring"""
+    confidences = []
+    max_score = scores[0] if scores else 1
+    for i, raw_score in enumerate(scores):
+        if raw_score >= 10.0:
+            base_confidence, confidence_range = 0.8, 20
+        elif raw_score >= 5.0:
+            base_confidence, confidence_range = 0.5, 30
+        elif raw_score >= 2.0:
+            base_confidence, confidence_range = 0.3, 20
+        else:
+            base_confidence, confidence_range = 0.1, 20
+        relative_score = (raw_score / max_score) ** 0.5 if max_score > 0 and raw_score > 0 else 0
+        position_factor = 1.0 - (i * 0.08)
+        confidence = int(base_confidence * 100 + relative_score * position_factor * confidence_range)
+        confidences.append(min(100, max(10, confidence)))
+    return confidences
+
+
+def test_heuristic_matches_reference():
+    """Test that the vectorized heuristic gives the same confidences as the old loop"""
+    print("🧪 Testing heuristic_confidences...")
+
+    for scores in ([14.2, 11.0, 6.3, 2.5, 0.4], [4.0, 3.9, 1.0], [0.0, 0.0], [25.0]):
+        assert heuristic_confidences(scores).tolist() == reference_confidence(scores), scores
+    assert heuristic_confidences([]).tolist() == []
+    assert ConfidenceScorer().confidences([14.2, 6.3]) == reference_confidence([14.2, 6.3])
+    print("✅ Heuristic matches the previous scoring")
+
+
+def test_calibrators():
+    """Test that fitted calibrators are monotone and separate good from bad scores"""
+    print("🧪 Testing Platt and isotonic calibration...")
+
+    rng = np.random.default_rng(7)
+    scores = np.concatenate([rng.normal(12, 3, 300), rng.normal(4, 2, 300)])
+    labels = np.concatenate([np.ones(300), np.zeros(300)])
+
+    for method in ("platt", "isotonic"):
+        calibrator = fit_calibrator(scores, labels, method)
+        probabilities = calibrator.predict([1.0, 5.0, 8.0, 12.0, 20.0])
+        assert np.all(np.diff(probabilities) >= 0), (method, probabilities)
+        assert probabilities[0] < 0.2 and probabilities[-1] > 0.8, (method, probabilities)
+
+        restored = ConfidenceScorer.from_file(None)
+        assert not restored.calibrated
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as handle:
+            json.dump(calibrator.to_dict(), handle)
+        restored = ConfidenceScorer.from_file(handle.name)
+        os.unlink(handle.name)
+        assert restored.calibrated
+        assert np.allclose(restored.probabilities([3.0, 15.0]), calibrator.predict([3.0, 15.0]))
+
+    assert isinstance(fit_calibrator([1, 2], [0, 1], "platt"), PlattCalibrator)
+    assert isinstance(fit_calibrator([1, 2], [0, 1], "isotonic"), IsotonicCalibrator)
+    print("✅ Calibrators fitted and restored")
+
+
+def test_load_feedback_samples():
+    """Test that feedback values and explicit labels both become 0/1 labels"""
+    print("🧪 Testing load_feedback_samples...")
+
+    lines = [
+        {"score": 12.0, "value": 1},
+        {"score": 3.0, "value": -1},
+        {"score": 7.5, "label": 1},
+        {"trace_id": "no-score", "value": 1},
+    ]
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as handle:
+        handle.write("\n".join(json.dumps(line) for line in lines))
+    scores, labels = load_feedback_samples(handle.name)
+    os.unlink(handle.name)
+
+    assert scores.tolist() == [12.0, 3.0, 7.5]
+    assert labels.tolist() == [1, 0, 1]
+    print("✅ Feedback samples loaded")
+
+
+def test_prune_hits():
+    """Test absolute and relative cutoffs and the min/max doc counts"""
+    print("🧪 Testing prune_hits...")
+
+    hits = [
+        Hit(id=str(i), score=score, name=f"doc{i}", page_content="text")
+        for i, score in enumerate([20.0, 12.0, 3.5, 1.5, 0.8])
+    ]
+    kept, pruned = prune_hits(hits, min_score=2.0, relative_score=0.2, min_docs=1, max_docs=5)
+    assert [hit.id for hit in kept] == ["0", "1"]
+    assert dict((hit.id, reason) for hit, reason in pruned) == {
+        "2": "score < 0.2 x top score",
+        "3": "score < 2",
+        "4": "score < 2",
+    }
+
+    kept, _ = prune_hits(hits, min_score=2.0, relative_score=0.0, min_docs=1, max_docs=2)
+    assert [hit.id for hit in kept] == ["0", "1"]
+
+    # A low-quality query still keeps its best hits up to min_docs
+    weak = hits[3:]
+    kept, pruned = prune_hits(weak, min_score=2.0, relative_score=0.2, min_docs=1, max_docs=5)
+    assert [hit.id for hit in kept] == ["3"] and len(pruned) == 1
+
+    kept, pruned = prune_hits(
+        hits, probabilities=[0.9, 0.2, 0.6, 0.5, 0.1], min_score=0, relative_score=0,
+        min_confidence=0.5, min_docs=1, max_docs=5,
+    )
+    assert [hit.id for hit in kept] == ["0", "2", "3"]
+    assert prune_hits([], min_docs=1) == ([], [])
+    print("✅ Weak hits pruned")
+
+
+if __name__ == "__main__":
+    test_heuristic_matches_reference()
+    test_calibrators()
+    test_load_feedback_samples()
+    test_prune_hits()
+    print("\n🎉 All scoring tests passed!")
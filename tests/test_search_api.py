@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for the paginated search API
+"""
+import os
+import subprocess
+import sys
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from elasticsearch import NotFoundError
+
+import search
+
+
+class FakeClient:
+    """Point-in-time search over a fixed list of hits, sorted by score then position"""
+
+    def __init__(self, count, fail=False):
+        self.fail = fail
+        self.hits = [
+            {
+                "_id": f"doc-{i}",
+                "_score": 10.0 - i,
+                "_source": {"name": f"Document {i}.docx", "webUrl": f"https://example.org/{i}"},
+                "highlight": {"body": [f"the <mark>lease</mark> in {i}"], "Title": ["<mark>Lease</mark>"]},
+                "sort": [10.0 - i, i],
+            }
+            for i in range(count)
+        ]
+        self.open_pits = set()
+        self.bodies = []
+
+    def open_point_in_time(self, index, keep_alive):
+        self.open_pits.add("pit-1")
+        return {"id": "pit-1"}
+
+    def close_point_in_time(self, id):
+        self.open_pits.discard(id)
+
+    def search(self, body):
+        self.bodies.append(body)
+        if self.fail:
+            raise ConnectionError("cluster unavailable")
+        if body["pit"]["id"] not in self.open_pits:
+            raise NotFoundError("search_context_missing_exception", None, {})
+        after = body.get("search_after")
+        start = 0 if after is None else next(i for i, hit in enumerate(self.hits) if hit["sort"] == after) + 1
+        page = self.hits[start:start + body["size"]]
+        return {"took": 3, "pit_id": "pit-1", "hits": {"total": {"value": len(self.hits)}, "hits": page}}
+
+
+def test_pages_through_point_in_time():
+    """Test that cursors walk every hit once and the PIT is closed after the last page"""
+    print("🧪 Testing search_after pagination...")
+
+    client = FakeClient(5)
+    search.get_elasticsearch_client = lambda: client
+    first = search.search_documents("lease", size=2)
+    assert first["total"] == 5 and first["took"] == 3
+    assert [r["id"] for r in first["results"]] == ["doc-0", "doc-1"]
+    assert first["results"][0]["highlights"] == ["the <mark>lease</mark> in 0", "<mark>Lease</mark>"]
+
+    body = client.bodies[0]
+    assert "rescore" not in body and "search_after" not in body
+    assert body["sort"][-1] == {"_shard_doc": "asc"} and body["_source"] == search.SEARCH_SOURCE_FIELDS
+
+    ids, cursor = [r["id"] for r in first["results"]], first["cursor"]
+    while cursor:
+        page = search.search_documents("lease", size=2, cursor=cursor)
+        assert "total" not in page
+        ids += [r["id"] for r in page["results"]]
+        cursor = page["cursor"]
+    assert ids == [f"doc-{i}" for i in range(5)]
+    assert not client.open_pits
+    assert len(client.bodies) == 3, "the last full page must not need an extra request"
+    assert all(body["size"] == 3 for body in client.bodies)
+
+    # A single page never leaves a PIT open
+    client = FakeClient(4)
+    search.get_elasticsearch_client = lambda: client
+    page = search.search_documents("lease", size=4)
+    assert page["cursor"] is None and len(page["results"]) == 4 and not client.open_pits
+    print("✅ All pages served once")
+
+
+def test_bad_cursors():
+    """Test malformed and expired cursors"""
+    print("🧪 Testing cursor errors...")
+
+    client = FakeClient(3)
+    search.get_elasticsearch_client = lambda: client
+    for cursor in ("not a cursor", search.encode_cursor("pit-1", [1.0, 1])[:-4]):
+        try:
+            search.search_documents("lease", cursor=cursor)
+            assert False, "malformed cursor accepted"
+        except ValueError:
+            pass
+    try:
+        search.search_documents("lease", cursor=search.encode_cursor("gone", [9.0, 0]))
+        assert False, "expired cursor accepted"
+    except search.CursorExpired:
+        pass
+    assert search.search_documents("lease", size=500)["cursor"] is None
+    assert client.bodies[-1]["size"] == search.SEARCH_MAX_PAGE_SIZE + 1
+
+    failing = FakeClient(3, fail=True)
+    search.get_elasticsearch_client = lambda: failing
+    try:
+        search.search_documents("lease")
+        assert False, "search error swallowed"
+    except ConnectionError:
+        pass
+    assert not failing.open_pits, "PIT opened by a failed search must be closed"
+    print("✅ Cursor errors")
+
+
+def test_import_stays_lazy():
+    """Test that importing the search module doesn't load the Elasticsearch client"""
+    print("🧪 Testing lazy imports...")
+
+    api_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+    loaded = subprocess.run(
+        [sys.executable, "-c", "import sys, search; print('elasticsearch' in sys.modules)"],
+        cwd=api_dir, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    assert loaded == "False", loaded
+    print("✅ elasticsearch not imported")
+
+
+if __name__ == "__main__":
+    test_pages_through_point_in_time()
+    test_bad_cursors()
+    test_import_stays_lazy()
+    print("\n🎉 All search API tests passed!")
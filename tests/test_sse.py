@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for SSE frame coalescing
+"""
+import os
+import sys
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from sse import FrameCoalescer, data_frame
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def payloads(frames):
+    return [frame[len("data: "):-2] for frame in frames]
+
+
+def test_coalescer_windows():
+    """Test that chunks are sent first immediately, then per time window or byte threshold"""
+    print("🧪 Testing FrameCoalescer windows...")
+
+    clock = FakeClock()
+    coalescer = FrameCoalescer(window_ms=30, max_bytes=10, clock=clock)
+    frames = []
+    for step, text in [(0, "Hi"), (5, " the"), (5, "re"), (25, "\nYes"), (1, "0123456789"), (1, "!")]:
+        clock.now += step / 1000.0
+        frame = coalescer.add(text)
+        if frame:
+            frames.append(frame)
+    assert coalescer.add("") is None
+    frames.append(coalescer.flush())
+    assert coalescer.flush() is None
+
+    # First chunk alone, then the 30ms window, then the byte threshold, then the tail
+    assert payloads(frames) == ["Hi", " there  Yes", "0123456789", "!"], payloads(frames)
+    assert coalescer.chunks == 6 and coalescer.frames == 4
+    print("✅ Frames coalesced")
+
+
+def test_same_text_as_per_chunk_frames():
+    """Test that the client reassembles exactly the text it got with one frame per chunk"""
+    print("🧪 Testing payload equivalence...")
+
+    chunks = ["Line one", "\n", "- item", " two\n\n", "end"]
+    per_chunk = "".join(payloads([data_frame(chunk) for chunk in chunks]))
+
+    coalescer = FrameCoalescer(window_ms=1000, max_bytes=1 << 20)
+    frames = [frame for frame in (coalescer.add(chunk) for chunk in chunks) if frame]
+    frames.append(coalescer.flush())
+    assert "".join(payloads(frames)) == per_chunk
+    assert all("\n" not in payload for payload in payloads(frames))
+
+    disabled = FrameCoalescer(window_ms=0)
+    assert all(disabled.add(chunk) for chunk in chunks)
+    print("✅ Same text delivered")
+
+
+if __name__ == "__main__":
+    test_coalescer_windows()
+    test_same_text_as_per_chunk_frames()
+    print("\n🎉 All SSE tests passed!")
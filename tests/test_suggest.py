@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for typeahead suggestions
+"""
+import os
+import sys
+import time
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from suggest import SUGGEST_MAX_SIZE, SuggestionIndex, SuggestionService, normalize, suggestion_entry
+
+
+class FakeClient:
+    """Documents for helpers.scan and a canned prefix search response"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.searches = []
+
+    def search(self, index, body):
+        self.searches.append(body)
+        return {"hits": {"hits": [{"_id": "es-1", "_source": {"name": "Résumé guide.pdf"}}]}}
+
+
+def fake_scan(service, client):
+    def scan(query):
+        modified_after = query.get("range", {}).get("lastModifiedDateTime", {}).get("gte")
+        for doc_id, source in client.docs.items():
+            if modified_after is None or source.get("lastModifiedDateTime", "") >= modified_after:
+                yield doc_id, source
+    service._scan = scan
+    service._ensure_started = lambda: None
+
+
+DOCS = {
+    "1": {"name": "NDA_Template-v2.docx", "Title": None, "lastModifiedDateTime": "2024-01-01T00:00:00Z"},
+    "2": {"name": "mutual.docx", "Title": "Mutual NDA template", "lastModifiedDateTime": "2024-03-01T00:00:00Z"},
+    "3": {"name": "handbook.pdf", "Title": "Employee Handbook", "lastModifiedDateTime": "2024-02-01T00:00:00Z"},
+}
+
+
+def test_lookup():
+    """Test word-start prefix matching and ranking"""
+    print("🧪 Testing prefix lookup...")
+
+    assert normalize("  Über_NDA-Template ") == "uber nda template"
+    index = SuggestionIndex({doc_id: suggestion_entry(doc_id, source) for doc_id, source in DOCS.items()})
+    assert [entry["id"] for entry in index.lookup("nda")] == ["1", "2"]
+    assert [entry["id"] for entry in index.lookup("templ")] == ["1", "2"]
+    assert [entry["id"] for entry in index.lookup("mutual nda t")] == ["2"]
+    assert [entry["id"] for entry in index.lookup("EMPL")] == ["3"]
+    assert index.lookup("docx") == [] and index.lookup("") == []
+    assert index.lookup("nda", size=1)[0]["text"] == "NDA_Template-v2"
+    print("✅ Lookup")
+
+
+def test_incremental_refresh_and_fallback():
+    """Test that refreshes pick up modified documents and misses go to the prefix subfields"""
+    print("🧪 Testing refresh and fallback...")
+
+    client = FakeClient(dict(DOCS))
+    service = SuggestionService(client_factory=lambda: client)
+    fake_scan(service, client)
+
+    suggestions, source = service.suggest("res")
+    assert source == "elasticsearch" and suggestions[0]["text"] == "Résumé guide"
+    assert client.searches[0]["query"]["multi_match"]["fields"] == ["Title.prefix^2", "name.prefix"]
+
+    service.refresh()
+    assert len(service.suggestions) == 3 and service.stats()["watermark"] == "2024-03-01T00:00:00Z"
+    client.docs["4"] = {"name": "lease.docx", "Title": "Lease renewal", "lastModifiedDateTime": "2024-04-01T00:00:00Z"}
+    before = service.suggestions
+    service.refresh(full=False)
+    assert service.suggestions is not before and len(service.suggestions) == 4
+    unchanged = service.suggestions
+    service.refresh(full=False)
+    assert service.suggestions is unchanged, "nothing modified, nothing rebuilt"
+
+    suggestions, source = service.suggest("lease r")
+    assert source == "memory" and suggestions[0]["id"] == "4"
+    assert service.suggest("l") == ([], "memory")
+
+    # Out-of-range sizes are clamped instead of slicing from the end or reaching ES
+    assert len(service.suggest("nda", size=-3)[0]) == 1
+    assert service.suggest("lease r", size=-3) == (service.suggest("lease r", size=1)[0], "memory")
+    client.searches.clear()
+    service.suggest("zzzz", size=-3)
+    assert client.searches[0]["size"] == 1
+    service.suggest("zzzz", size=1000)
+    assert client.searches[1]["size"] == SUGGEST_MAX_SIZE
+    print("✅ Refresh and fallback")
+
+
+def test_lookup_latency():
+    """Test lookups stay far below a keystroke budget on a large title set"""
+    print("🧪 Testing lookup latency...")
+
+    words = "lease tenant notice policy template contract employee handbook claim repair agreement form".split()
+    entries = {
+        str(i): suggestion_entry(str(i), {"name": f"{words[i % 12]} {words[(i // 12) % 12]} {words[(i // 144) % 12]} {i}.docx"})
+        for i in range(20000)
+    }
+    index = SuggestionIndex(entries)
+    timings = []
+    for prefix in ["le", "lea", "lease t", "te", "no", "polic", "ag", "contract e"] * 25:
+        started = time.perf_counter()
+        index.lookup(prefix)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+    assert p99 < 50, p99
+    print(f"✅ p99 {p99:.2f}ms over {len(entries)} titles")
+
+
+if __name__ == "__main__":
+    test_lookup()
+    test_incremental_refresh_and_fallback()
+    test_lookup_latency()
+    print("\n🎉 All suggestion tests passed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for on-demand summaries via GET /api/summary/<doc_id>
+"""
+import os
+import sys
+import threading
+import time
+from unittest import mock
+# Add parent directory to path to access api folder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+import chat
+from app import app
+
+DOCS = {
+    "stored": {"_id": "stored", "_source": {"name": "a.docx", "body": "Alpha text", "summary": "Stored summary"}},
+    "cached": {"_id": "cached", "_source": {"name": "b.docx", "body": "Beta text"}},
+    "new": {"_id": "new", "_source": {"name": "c.docx", "body": "Gamma text"}},
+}
+
+
+def install_fakes(generated):
+    """Patch the Elasticsearch and LLM calls chat uses with in-memory versions until the block exits"""
+    cache = {chat.Hit.from_es_hit(DOCS["cached"]).content_hash: "Cached summary"}
+
+    def fake_generate(doc, trace_id):
+        time.sleep(0.1)
+        generated.append(doc.id)
+        return f"Generated summary of {doc.name}"
+
+    return mock.patch.multiple(
+        chat,
+        get_document=lambda index, doc_id, fields=None: DOCS.get(doc_id),
+        get_cached_summaries=lambda index, hashes: {h: cache[h] for h in hashes if h in cache},
+        update_document_summary=lambda index, doc_id, summary: True,
+        generate_and_store_summary=fake_generate,
+    )
+
+
+def test_summary_endpoint():
+    """Test stored, cached and generated summaries plus ETag revalidation"""
+    print("🧪 Testing GET /api/summary...")
+
+    generated = []
+    with install_fakes(generated):
+        client = app.test_client()
+
+        response = client.get("/api/summary/stored")
+        assert response.status_code == 200
+        assert response.get_json() == {"id": "stored", "summary": "Stored summary", "source": "document"}
+        assert "max-age" in response.headers["Cache-Control"]
+        etag = response.headers["ETag"]
+        assert client.get("/api/summary/stored", headers={"If-None-Match": etag}).status_code == 304
+
+        assert client.get("/api/summary/cached").get_json()["source"] == "cache"
+        assert client.get("/api/summary/missing").status_code == 404
+
+        # Concurrent requests for a new document share one generation job
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.get("/api/summary/new").get_json()))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert generated == ["new"], generated
+        assert all(result["summary"] == "Generated summary of c.docx" for result in results)
+    print("✅ Summaries served on demand")
+
+
+def test_lazy_source_event():
+    """Test that sources sent before the answer point at the summary endpoint"""
+    print("🧪 Testing lazy source events...")
+
+    doc = chat.Hit.from_es_hit({"_id": "a/b c", "_source": {"name": "x.pdf", "body": "text"}})
+    source = chat.lazy_source(doc, None, 72)
+    assert source["summary_url"] == "/api/summary/a%2Fb%20c"
+    assert source["summary"] is None and not source["enhanced"] and source["confidence"] == 72
+    assert chat.lazy_source(doc, "Known", 72)["enhanced"]
+    print("✅ Source events carry a summary URL")
+
+
+if __name__ == "__main__":
+    test_summary_endpoint()
+    test_lazy_source_event()
+    print("\n🎉 All summary endpoint tests passed!")